@@ -0,0 +1,163 @@
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+
+from flask import g, jsonify, request
+
+# Bucket slot: key hash (0 = empty), tokens left, last update (epoch seconds)
+_SLOT = struct.Struct('<Qdd')
+# Slots per set; a key can only live in the set its hash selects
+WAYS = 8
+
+
+class SharedBuckets:
+    """Token buckets shared by every worker process on the host.
+
+    A memory-mapped table (under /dev/shm by default) of 8-way sets: a key is
+    stored in one of the 8 slots its hash selects, and a new key takes the
+    set's least recently used slot. take() locks only that set, with a thread
+    lock plus an fcntl range lock, so workers rarely wait on each other.
+    """
+
+    def __init__(self, path, slots):
+        self.path = path
+        self.sets = max(1, slots // WAYS)
+        self._fd = None
+        self._map = None
+        self._open_lock = threading.Lock()
+        self._set_locks = [threading.Lock() for _ in range(64)]
+
+    def _open(self):
+        with self._open_lock:
+            if self._map is None:
+                size = self.sets * WAYS * _SLOT.size
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    if os.fstat(fd).st_size < size:
+                        os.ftruncate(fd, size)
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                self._map = mmap.mmap(fd, size)
+                self._fd = fd
+        return self._map
+
+    def take(self, key, rate, burst):
+        """Take one token from `key`'s bucket (refilled at `rate`/s up to `burst`).
+
+        Returns 0 when a token was taken, else seconds until one is available.
+        """
+        digest = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+        index = digest % self.sets
+        start = index * WAYS * _SLOT.size
+        end = start + WAYS * _SLOT.size
+        shared = self._map or self._open()
+        with self._set_locks[index % len(self._set_locks)]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, WAYS * _SLOT.size, start)
+            try:
+                now = time.time()
+                victim, oldest = start, None
+                for slot in range(start, end, _SLOT.size):
+                    stored, tokens, updated = _SLOT.unpack_from(shared, slot)
+                    if stored == digest:
+                        tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+                        break
+                    if oldest is None or updated < oldest:
+                        victim, oldest = slot, updated
+                else:
+                    slot, tokens = victim, burst
+
+                if tokens >= 1:
+                    tokens -= 1
+                    wait = 0.0
+                else:
+                    wait = (1 - tokens) / rate
+                _SLOT.pack_into(shared, slot, digest, tokens, now)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, WAYS * _SLOT.size, start)
+        return wait
+
+
+class AdmissionControl:
+    """Rate limits and read shedding for the endpoints listed in RATE_LIMITS.
+
+    A policy may set a per-client and a global (rate, burst) token bucket,
+    shared by all workers through RATE_LIMIT_FILE. An empty client bucket is
+    answered with 429 and an empty global bucket with 503, both with
+    Retry-After. Read endpoints also need one of READ_MAX_IN_FLIGHT slots in
+    the worker, so a read surge is shed before it takes the threads that
+    submissions need. Clients are told apart by remote_addr, which is only
+    the real client behind a proxy when TRUSTED_PROXIES is set.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.policies = {}
+        self.buckets = None
+        self._read_slots = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config['RATE_LIMIT_ENABLED']
+        self.policies = app.config['RATE_LIMITS']
+        self.buckets = SharedBuckets(app.config['RATE_LIMIT_FILE'], app.config['RATE_LIMIT_SLOTS'])
+        self._read_slots = threading.BoundedSemaphore(app.config['READ_MAX_IN_FLIGHT'])
+        if self.enabled:
+            if not app.config['TRUSTED_PROXIES']:
+                app.logger.warning('Rate limits are on with TRUSTED_PROXIES unset; behind a proxy '
+                                   'all clients share one per-client bucket')
+            app.before_request(self._admit)
+            app.after_request(self._hand_off)
+            app.teardown_request(self._release)
+
+    def _admit(self):
+        policy = self.policies.get(request.endpoint)
+        if policy is None or request.method == 'OPTIONS':
+            return None
+        if policy.get('priority') == 'read':
+            if not self._read_slots.acquire(blocking=False):
+                return self._reject(503, 1)
+            g.admission_read_slot = True
+
+        client = policy.get('client')
+        if client:
+            wait = self.buckets.take(f'{request.endpoint}|{request.remote_addr}', *client)
+            if wait:
+                return self._reject(429, wait)
+        limit = policy.get('global')
+        if limit:
+            wait = self.buckets.take(request.endpoint, *limit)
+            if wait:
+                return self._reject(503, wait)
+        return None
+
+    def _hand_off(self, response):
+        # Teardown runs before a streamed body is sent; hold the slot until the
+        # server closes the response
+        if g.pop('admission_read_slot', False):
+            response.call_on_close(self._read_slots.release)
+        return response
+
+    def _release(self, error=None):
+        # Only reached with the slot still held when no response was made
+        if g.pop('admission_read_slot', False):
+            self._read_slots.release()
+
+    def _reject(self, status, wait):
+        if status == 429:
+            message = '요청이 너무 잦습니다. 잠시 후 다시 시도해주세요'
+        else:
+            message = '요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해주세요'
+        response = jsonify({'error': message})
+        response.status_code = status
+        response.headers['Retry-After'] = str(max(1, math.ceil(wait)))
+        return response
+
+
+admission_control = AdmissionControl()
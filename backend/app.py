@@ -1,38 +1,195 @@
 import os
-from datetime import datetime, timedelta
-from flask import Flask, request, jsonify, send_from_directory
+import functools
+import hmac
+import mimetypes
+import queue
+import uuid
+import click
+from datetime import datetime, date, timedelta
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, send_from_directory, g, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.utils import secure_filename
+from werkzeug.wsgi import get_input_stream
 from config import config
-from models import db, User, Song, Verification, kst_now
-
-app = Flask(__name__)
-
-# Load configuration
-env = os.environ.get('FLASK_ENV', 'development')
-app.config.from_object(config[env])
-
-# Initialize extensions
-db.init_app(app)
-CORS(app, origins=app.config['CORS_ORIGINS'])
+from sqlalchemy.orm import joinedload, selectinload
+from models import db, User, Song, Verification, SiteCounter, ProofFile, IngestTicket, kst_now, \
+    init_caches, song_cache, user_cache
+from cache import response_cache
+from counters import reconcile_counters
+from images import proof_images, derivative_name, PROOF_SIZES
+from storage import proof_storage, is_immutable
+from submissions import resolve_user, upsert_verification, verification_from_row, SongNotFound, MAX_STREAM_COUNT
+from leaderboard import leaderboard_index, query_page, query_rank, backfill_daily_streams
+from ingest import ingest_queue, Submission
+from moderation import bulk_moderate, MODERATION_STATUSES, TooManyRows
+from bulk_io import import_verifications, export_csv, export_ndjson, ImportFormatError
+from live import live_broker
+from events import ensure_partitions, detach_partitions
+from snapshots import rank_snapshotter, rank_as_of, rank_history
+from search import search_usernames
+from replicas import ReadRouter, read_router
+from metrics import request_metrics
+from admission import admission_control
+from serializers import FastJSONProvider, serialize_verification, profile_verification_fields
+
+api = Blueprint('api', __name__, cli_group=None)
+
+
+def create_app(config_name=None):
+    """Application factory; config_name defaults to FLASK_ENV"""
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+
+    # Load configuration
+    app.config.from_object(config[config_name or os.environ.get('FLASK_ENV', 'development')])
+    if app.config['TRUSTED_PROXIES']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
+
+    # Initialize extensions
+    db.init_app(app)
+    request_metrics.init_app(app)
+    # After metrics so rejected requests are still counted
+    admission_control.init_app(app)
+    init_caches(app)
+    response_cache.init_app(app)
+    proof_images.init_app(app)
+    proof_storage.init_app(app)
+    read_router.init_app(app)
+    rank_snapshotter.init_app(app)
+    ingest_queue.init_app(app, on_commit=ingest_committed, on_rejected=ingest_rejected)
+    live_broker.init_app(app, compute=live_board, stats=live_stats, refresh=refresh_live_index)
+    # Cross-origin clients read the sticky-read deadline from a header, not a cookie
+    CORS(app, origins=app.config['CORS_ORIGINS'], expose_headers=[ReadRouter.HEADER])
+    app.register_blueprint(api)
+
+    # Create upload folder if it doesn't exist
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+    # Seed the in-process leaderboard index (falls back to lazy load on first read)
+    with app.app_context():
+        try:
+            leaderboard_index.load(response_cache.generation())
+        except Exception:
+            app.logger.exception('Failed to seed leaderboard index')
+            db.session.rollback()
 
-# Create upload folder if it doesn't exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    return app
 
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
-
-
-@app.route('/api/health', methods=['GET'])
+           filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+
+def sync_leaderboard_index():
+    """Load the index on first use; other workers' writes are applied by the live
+    listener (refresh_live_index), never by a read"""
+    if not leaderboard_index.sync(response_cache.generation()) or leaderboard_index.windows_stale():
+        # Writes from other workers are still being applied, or the windows
+        # still end yesterday; don't pin this response in the cache, and make
+        # sure a round runs to settle (or reload) the index
+        g.skip_response_cache = True
+        live_broker.publish()
+
+
+def verifications_changed(*changes):
+    """Apply committed (verification, username, song_title, written_at) changes and
+    invalidate caches; written_at may be None when the write order needs no guard"""
+    for verification, username, song_title, written_at in changes:
+        leaderboard_index.apply(verification, username, song_title, written_at)
+    # The triggers moved today's daily_streams bucket of each pair
+    leaderboard_index.reload_buckets({(verification.user_id, verification.song_id)
+                                      for verification, _, _, _ in changes})
+    leaderboard_index.advance(response_cache.invalidate())
+
+
+def ingest_committed(batch, results):
+    """Publish a committed ingest batch: one index update and cache bump per batch"""
+    changes = []
+    for submission in batch:
+        _, row, _ = results[submission.ticket_id]
+        if row is None:
+            continue
+        changes.append((verification_from_row(row), submission.username, row.song_title, row.written_at))
+        if submission.process_image:
+            proof_images.submit(submission.proof_image)
+    if changes:
+        verifications_changed(*changes)
+
+
+def release_proof(filename):
+    """Remove a proof file stored for a failed submission unless something references it"""
+    proof_file = db.session.get(ProofFile, filename)
+    if proof_file is None or proof_file.refcount <= 0:
+        proof_storage.delete(filename)
+
+
+def ingest_rejected(submission):
+    """Release the proof file stored for a submission that failed in the batch writer"""
+    if submission.stored:
+        release_proof(submission.proof_image)
+
+
+
+def live_board(key, fresh=False):
+    """(entries, total) for a live board key (song_id, filter, from, to, limit)"""
+    song_id, time_filter, date_from, date_to, limit = key
+    if date_from or date_to:
+        return query_page((date_from, date_to), song_id, 0, limit)
+    if not fresh:
+        sync_leaderboard_index()
+    if song_id:
+        return leaderboard_index.song_page(song_id, 0, limit, time_filter)
+    return leaderboard_index.overall_page(0, limit, time_filter)
+
+
+def live_stats():
+    counters = db.session.get(SiteCounter, 1)
+    return counters.to_dict() if counters else SiteCounter(
+        total_verifications=0, total_streams=0, active_users=0, total_songs=0).to_dict()
+
+
+def refresh_live_index(changed, last_generation):
+    """Apply the verifications notified since the last live round; returns the
+    generation read at the start of this round.
+
+    The index reloads only when the changed ids are unknown or too many, or
+    when the KST day changed and the today/week/month windows must move. The
+    generation read a round earlier is settled: its writes committed before
+    it was bumped, so their notifications arrived during the coalesce wait.
+    """
+    generation = response_cache.generation()
+    if changed is None or len(changed) > current_app.config['LEADERBOARD_MAX_APPLY'] \
+            or not leaderboard_index.loaded or leaderboard_index.windows_stale():
+        leaderboard_index.load(generation)
+        return generation
+    if changed:
+        leaderboard_index.reload_rows(changed)
+    if last_generation is not None:
+        leaderboard_index.settle(last_generation)
+    if leaderboard_index.generation != generation:
+        # One more round settles this generation once writes stop
+        live_broker.publish()
+    return generation
+
+
+
+@api.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({'status': 'healthy', 'timestamp': kst_now().isoformat()})
 
 
-@app.route('/api/auth/login', methods=['POST'])
+@api.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics; keep it off the public proxy"""
+    return request_metrics.render()
+
+
+@api.route('/api/auth/login', methods=['POST'])
 def login():
     """Verify username and PIN for login"""
     try:
@@ -48,18 +205,18 @@ def login():
             return jsonify({'error': 'PIN은 정확히 4자리 숫자여야 합니다'}), 400
 
         # Check if user exists
-        user = User.query.filter_by(username=username).first()
-        if not user:
+        credentials = User.credentials(username)
+        if not credentials:
             return jsonify({'error': '등록되지 않은 닉네임입니다. 먼저 스트리밍 인증을 제출해주세요.'}), 404
 
         # Verify PIN
-        if not user.verify_pin(pin):
+        if credentials[1] != User.hash_pin(pin):
             return jsonify({'error': 'PIN이 일치하지 않습니다'}), 401
 
         # Login successful
         return jsonify({
             'success': True,
-            'username': user.username,
+            'username': username,
             'message': '로그인 성공!'
         })
 
@@ -67,117 +224,262 @@ def login():
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/songs', methods=['GET'])
+def song_exists(song_id):
+    """Check the cached catalog, reloading it once for songs added since it was cached"""
+    if song_id in Song.catalog():
+        return True
+    song_cache.invalidate()
+    return song_id in Song.catalog()
+
+
+@api.route('/api/songs', methods=['GET'])
+@response_cache.cached
+@read_router.replica
 def get_songs():
     """Get all songs"""
     try:
-        songs = Song.query.order_by(Song.total_stream_count.desc()).all()
-        return jsonify([song.to_dict() for song in songs])
+        sync_leaderboard_index()
+        totals = leaderboard_index.song_totals()
+        songs = [{**song, 'streamCount': totals.get(song_id, 0)}
+                 for song_id, song in Song.catalog().items()]
+        songs.sort(key=lambda song: song['streamCount'], reverse=True)
+        return jsonify(songs)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/songs/<int:song_id>', methods=['GET'])
+@api.route('/api/songs/<int:song_id>', methods=['GET'])
+@response_cache.cached
+@read_router.replica
 def get_song(song_id):
     """Get a specific song"""
     try:
-        song = Song.query.get_or_404(song_id)
-        return jsonify(song.to_dict())
+        if not song_exists(song_id):
+            return jsonify({'error': '해당 곡을 찾을 수 없습니다'}), 404
+        sync_leaderboard_index()
+        song = Song.catalog()[song_id]
+        return jsonify({**song, 'streamCount': leaderboard_index.song_totals().get(song_id, 0)})
     except Exception as e:
         return jsonify({'error': str(e)}), 404
 
 
-@app.route('/api/leaderboard', methods=['GET'])
+@api.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters of the in-process model caches, plus read replica state"""
+    pin_hashes = User.hash_pin.cache_info()
+    return jsonify({
+        'songs': song_cache.stats(),
+        'users': user_cache.stats(),
+        'pinHashes': {
+            'size': pin_hashes.currsize,
+            'maxEntries': pin_hashes.maxsize,
+            'hits': pin_hashes.hits,
+            'misses': pin_hashes.misses
+        },
+        'replica': read_router.stats()
+    })
+
+
+def parse_page_args():
+    """Parse limit/cursor pagination args; cursor is the last rank already returned"""
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    limit = int(limit) if limit else current_app.config['LEADERBOARD_DEFAULT_LIMIT']
+    offset = int(cursor) if cursor else 0
+    if not 0 < limit <= current_app.config['LEADERBOARD_MAX_LIMIT'] or offset < 0:
+        raise ValueError()
+    return offset, limit
+
+
+def parse_window_args():
+    """Resolve filter (all, today, week, month) or from/to dates to (filter, date range);
+    the range is None unless from or to is given"""
+    date_from = request.args.get('from')
+    date_to = request.args.get('to')
+    if not date_from and not date_to:
+        return request.args.get('filter', 'all'), None
+    return None, (date.fromisoformat(date_from) if date_from else None,
+                  date.fromisoformat(date_to) if date_to else None)
+
+
+@api.route('/api/leaderboard', methods=['GET'])
+@response_cache.cached
+@read_router.replica
 def get_leaderboard():
-    """Get leaderboard with optional time and song filters"""
+    """Get leaderboard with optional time and song filters.
+
+    `filter` is one of all, today, week, month; `from`/`to` (YYYY-MM-DD, inclusive)
+    select an arbitrary date range instead. The response is a page of `limit`
+    entries (LEADERBOARD_DEFAULT_LIMIT when omitted): {entries, total, nextCursor};
+    pass nextCursor back as `cursor`.
+    """
     try:
-        time_filter = request.args.get('filter', 'all')  # all, today, week, month
         song_id = request.args.get('songId')  # optional song filter
+        try:
+            song_id = int(song_id) if song_id else None
+            time_filter, window = parse_window_args()
+            offset, limit = parse_page_args()
+        except ValueError:
+            return jsonify({'error': '잘못된 요청입니다'}), 400
+
+        if window is None:
+            # All-time and today/week/month boards are served from the in-process index
+            sync_leaderboard_index()
+            if song_id:
+                entries, total = leaderboard_index.song_page(song_id, offset, limit, time_filter)
+            else:
+                entries, total = leaderboard_index.overall_page(offset, limit, time_filter)
+        else:
+            entries, total = query_page(window, song_id, offset, limit)
+
+        next_offset = offset + len(entries)
+        return jsonify({
+            'entries': entries,
+            'total': total,
+            'nextCursor': str(next_offset) if next_offset < total else None
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/api/leaderboard/rank', methods=['GET'])
+@response_cache.cached
+@read_router.replica
+def get_leaderboard_rank():
+    """Get one user's rank and the entries around it"""
+    try:
+        username = request.args.get('username')
+        song_id = request.args.get('songId')
+        if not username:
+            return jsonify({'error': '닉네임을 입력해주세요'}), 400
+        try:
+            song_id = int(song_id) if song_id else None
+            time_filter, window = parse_window_args()
+            around = int(request.args.get('around', 0))
+            if not 0 <= around <= current_app.config['LEADERBOARD_MAX_AROUND']:
+                raise ValueError()
+        except ValueError:
+            return jsonify({'error': '잘못된 요청입니다'}), 400
+
+        if window is None:
+            sync_leaderboard_index()
+            if song_id:
+                result = leaderboard_index.song_rank(song_id, username, around, time_filter)
+            else:
+                result = leaderboard_index.overall_rank(username, around, time_filter)
+        else:
+            result = query_rank(window, song_id, username, around)
+
+        if result is None:
+            return jsonify({'error': '순위에 등록되지 않은 닉네임입니다'}), 404
+
+        rank, entries, total = result
+        return jsonify({
+            'rank': rank,
+            'total': total,
+            'entry': next(entry for entry in entries if entry['rank'] == rank),
+            'entries': entries
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/api/leaderboard/changes', methods=['GET'])
+@response_cache.cached
+@read_router.replica
+def get_leaderboard_changes():
+    """Current all-time ranks against the snapshot `hours` ago (default 24).
 
-        # Apply time filter condition
-        now = kst_now()
-        time_condition = Verification.status == 'approved'
-        if time_filter == 'today':
-            time_condition = db.and_(time_condition, db.func.date(Verification.created_at) == now.date())
-        elif time_filter == 'week':
-            week_ago = now - timedelta(days=7)
-            time_condition = db.and_(time_condition, Verification.created_at >= week_ago)
-        elif time_filter == 'month':
-            month_ago = now - timedelta(days=30)
-            time_condition = db.and_(time_condition, Verification.created_at >= month_ago)
-
-        if song_id:
-            # Specific song selected - show individual verifications
-            query = db.session.query(
-                Verification.id,
-                User.username,
-                Song.title.label('song_title'),
-                Song.id.label('song_id'),
-                Verification.stream_count,
-                Verification.verified_at,
-                Verification.created_at
-            ).join(User, Verification.user_id == User.id) \
-             .join(Song, Verification.song_id == Song.id) \
-             .filter(time_condition) \
-             .filter(Song.id == int(song_id))
-
-            # Order by stream count and creation date
-            results = query.order_by(
-                Verification.stream_count.desc(),
-                Verification.created_at.asc()
-            ).all()
-
-            # Add rank
-            leaderboard = []
-            for rank, result in enumerate(results, start=1):
-                leaderboard.append({
-                    'id': result.id,
-                    'rank': rank,
-                    'username': result.username,
-                    'songTitle': result.song_title,
-                    'songId': result.song_id,
-                    'streamCount': result.stream_count,
-                    'verifiedAt': result.verified_at.isoformat() if result.verified_at else None,
-                    'createdAt': result.created_at.isoformat() if result.created_at else None
-                })
+    Returns the top `limit` of the board, or only `username` when given.
+    change is how many places an entry moved up; previousRank is null when
+    it was outside the snapshotted top N.
+    """
+    try:
+        try:
+            song_id = request.args.get('songId')
+            song_id = int(song_id) if song_id else None
+            hours = float(request.args.get('hours', 24))
+            limit = int(request.args.get('limit', current_app.config['SNAPSHOT_TOP_N']))
+            if not 0 < hours <= current_app.config['SNAPSHOT_HISTORY_MAX_DAYS'] * 24 \
+                    or not 0 < limit <= current_app.config['LEADERBOARD_MAX_LIMIT']:
+                raise ValueError()
+        except ValueError:
+            return jsonify({'error': '잘못된 요청입니다'}), 400
+
+        sync_leaderboard_index()
+        username = request.args.get('username')
+        if username:
+            result = leaderboard_index.song_rank(song_id, username) if song_id \
+                else leaderboard_index.overall_rank(username)
+            if result is None:
+                return jsonify({'error': '순위에 등록되지 않은 닉네임입니다'}), 404
+            rank, entries, _ = result
+            positions = [(leaderboard_index.user_id(username), username, rank, entries[0]['streamCount'])]
         else:
-            # All Songs - aggregate by user
-            query = db.session.query(
-                User.id.label('user_id'),
-                User.username,
-                db.func.sum(Verification.stream_count).label('total_stream_count'),
-                db.func.max(Verification.verified_at).label('latest_verified_at'),
-                db.func.max(Verification.created_at).label('latest_created_at')
-            ).join(Verification, User.id == Verification.user_id) \
-             .filter(time_condition) \
-             .group_by(User.id, User.username)
-
-            # Order by total stream count
-            results = query.order_by(
-                db.desc('total_stream_count'),
-                db.desc('latest_created_at')
-            ).all()
-
-            # Add rank
-            leaderboard = []
-            for rank, result in enumerate(results, start=1):
-                leaderboard.append({
-                    'id': result.user_id,  # Use user_id as identifier for All Songs
-                    'rank': rank,
-                    'username': result.username,
-                    'songTitle': 'All Songs',
-                    'songId': None,
-                    'streamCount': result.total_stream_count,
-                    'verifiedAt': result.latest_verified_at.isoformat() if result.latest_verified_at else None,
-                    'createdAt': result.latest_created_at.isoformat() if result.latest_created_at else None
-                })
-
-        return jsonify(leaderboard)
+            positions = leaderboard_index.positions(song_id, limit)
+
+        since = kst_now() - timedelta(hours=hours)
+        previous = rank_as_of(song_id, [user_id for user_id, _, _, _ in positions], since)
+        entries = []
+        for user_id, name, rank, stream_count in positions:
+            previous_rank, previous_streams = previous.get(user_id, (None, None))
+            entries.append({
+                'username': name,
+                'rank': rank,
+                'previousRank': previous_rank,
+                'change': previous_rank - rank if previous_rank else None,
+                'streamCount': stream_count,
+                'previousStreamCount': previous_streams if previous_rank else None
+            })
+        return jsonify({'songId': song_id, 'since': since.isoformat(), 'entries': entries})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/verifications', methods=['POST'])
+@api.route('/api/leaderboard/history', methods=['GET'])
+@response_cache.cached
+@read_router.replica
+def get_leaderboard_history():
+    """A user's all-time rank at every snapshot between from and to (default: last 7 days)"""
+    try:
+        username = request.args.get('username')
+        if not username:
+            return jsonify({'error': '닉네임을 입력해주세요'}), 400
+        try:
+            song_id = request.args.get('songId')
+            song_id = int(song_id) if song_id else None
+            today = kst_now().date()
+            date_to = request.args.get('to')
+            date_to = date.fromisoformat(date_to) if date_to else today
+            date_from = request.args.get('from')
+            date_from = date.fromisoformat(date_from) if date_from else date_to - timedelta(days=6)
+            if not 0 <= (date_to - date_from).days < current_app.config['SNAPSHOT_HISTORY_MAX_DAYS']:
+                raise ValueError()
+        except ValueError:
+            return jsonify({'error': '잘못된 요청입니다'}), 400
+
+        credentials = User.credentials(username)
+        if credentials is None:
+            return jsonify({'error': '사용자를 찾을 수 없습니다'}), 404
+
+        # Dates are KST days; taken_at is stored as naive KST
+        first = datetime.combine(date_from, datetime.min.time())
+        last = datetime.combine(date_to, datetime.max.time())
+        points = rank_history(song_id, credentials[0], first, last)
+        return jsonify({
+            'username': username,
+            'songId': song_id,
+            'points': [{
+                'takenAt': taken_at.isoformat(),
+                'rank': rank,
+                'streamCount': stream_count if rank else None
+            } for taken_at, rank, stream_count in points]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/api/verifications', methods=['POST'])
 def create_verification():
     """Create or update verification (streaming proof) with PIN authentication"""
     try:
@@ -214,41 +516,30 @@ def create_verification():
         try:
             song_id = int(song_id)
             stream_count = int(stream_count)
-            if stream_count <= 0:
+            if not 0 < stream_count <= MAX_STREAM_COUNT:
                 raise ValueError()
         except ValueError:
             return jsonify({'error': '잘못된 곡 ID 또는 스트리밍 횟수입니다'}), 400
 
-        # Check if song exists
-        song = Song.query.get(song_id)
-        if not song:
+        # Reject unknown songs before the proof file is written
+        if not song_exists(song_id):
             return jsonify({'error': '해당 곡을 찾을 수 없습니다'}), 404
 
-        # Get or create user with PIN
-        user = User.query.filter_by(username=username).first()
-        if user:
-            # User exists - verify PIN
-            if not user.verify_pin(pin):
-                return jsonify({'error': '이 닉네임의 PIN이 일치하지 않습니다'}), 401
-        else:
-            # Create new user with PIN
-            user = User(username=username, pin_hash=User.hash_pin(pin))
-            db.session.add(user)
-            db.session.flush()
+        if ingest_queue.enabled:
+            return enqueue_verification(proof_file, existing_proof_image, username, pin, song_id, stream_count)
 
-        # Check if verification already exists for this user and song
-        verification = Verification.query.filter_by(
-            user_id=user.id,
-            song_id=song_id
-        ).first()
+        # Get or create user with PIN (cached, else one statement safe under concurrent signups)
+        pin_hash = User.hash_pin(pin)
+        user_id, stored_pin_hash = resolve_user(username, pin_hash)
+        if stored_pin_hash != pin_hash:
+            db.session.rollback()
+            return jsonify({'error': '이 닉네임의 PIN이 일치하지 않습니다'}), 401
 
         # Save new proof image if provided, otherwise keep existing
+        stored = False
         if proof_file:
-            filename = secure_filename(proof_file.filename)
-            timestamp = kst_now().strftime('%Y%m%d_%H%M%S')
-            filename = f"{user.id}_{song_id}_{timestamp}_{filename}"
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            proof_file.save(filepath)
+            extension = secure_filename(proof_file.filename).rsplit('.', 1)[1].lower()
+            filename, stored = proof_storage.save(proof_file, extension)
         elif existing_proof_image:
             # Keep existing filename
             filename = existing_proof_image
@@ -256,31 +547,32 @@ def create_verification():
             # This shouldn't happen due to earlier validation
             return jsonify({'error': '인증 이미지를 업로드해주세요'}), 400
 
-        if verification:
-            # Update existing verification
-            verification.stream_count = stream_count
-            verification.proof_image = filename
-            verification.verified_at = kst_now()
-            verification.updated_at = kst_now()
-            message = '스트리밍 인증이 업데이트되었습니다!'
-        else:
-            # Create new verification
-            verification = Verification(
-                user_id=user.id,
-                song_id=song_id,
-                stream_count=stream_count,
-                proof_image=filename,
-                status='approved',
-                verified_at=kst_now()
-            )
-            db.session.add(verification)
+        # Create or update the verification for this user and song
+        try:
+            row = upsert_verification(user_id, song_id, stream_count, filename)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            if stored:
+                release_proof(filename)
+            if isinstance(e, SongNotFound):
+                return jsonify({'error': '해당 곡을 찾을 수 없습니다'}), 404
+            raise
+
+        verification = verification_from_row(row)
+        if row.created:
             message = '스트리밍 인증이 성공적으로 제출되었습니다!'
+        else:
+            message = '스트리밍 인증이 업데이트되었습니다!'
 
-        db.session.commit()
+        verifications_changed((verification, username, row.song_title, row.written_at))
+        if proof_file and (stored or not os.path.exists(
+                proof_storage.path(derivative_name(filename, 'thumb')))):
+            proof_images.submit(filename)
 
         return jsonify({
             'message': message,
-            'verification': verification.to_dict()
+            'verification': serialize_verification(verification, username, row.song_title)
         }), 200
 
     except Exception as e:
@@ -288,87 +580,352 @@ def create_verification():
         return jsonify({'error': f'서버 오류가 발생했습니다: {str(e)}'}), 500
 
 
-@app.route('/api/verifications/<int:verification_id>', methods=['GET'])
+def enqueue_verification(proof_file, existing_proof_image, username, pin, song_id, stream_count):
+    """Queued mode: store the proof, hand the submission to the batch writer and return a ticket"""
+    stored = False
+    if proof_file:
+        extension = secure_filename(proof_file.filename).rsplit('.', 1)[1].lower()
+        filename, stored = proof_storage.save(proof_file, extension)
+    else:
+        filename = existing_proof_image
+    process_image = bool(proof_file) and (stored or not os.path.exists(
+        proof_storage.path(derivative_name(filename, 'thumb'))))
+
+    submission = Submission(username, pin, song_id, stream_count, filename, stored, process_image)
+    try:
+        ticket_id = ingest_queue.submit(submission)
+    except queue.Full:
+        if stored:
+            release_proof(filename)
+        response = jsonify({'error': '요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해주세요'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+
+    return jsonify({
+        'ticketId': ticket_id.hex,
+        'status': 'queued',
+        'message': '스트리밍 인증이 접수되었습니다'
+    }), 202
+
+
+@api.route('/api/verifications/tickets/<ticket_id>', methods=['GET'])
+def get_ingest_ticket(ticket_id):
+    """Result of a queued verification submission"""
+    try:
+        ticket_uuid = uuid.UUID(ticket_id)
+    except ValueError:
+        return jsonify({'error': '잘못된 요청입니다'}), 400
+
+    try:
+        ticket = db.session.get(IngestTicket, ticket_uuid, options=[
+            joinedload(IngestTicket.verification).joinedload(Verification.user),
+            joinedload(IngestTicket.verification).joinedload(Verification.song)
+        ])
+        if ticket is None:
+            # Not written yet (or pruned after INGEST_TICKET_RETENTION_HOURS)
+            return jsonify({'ticketId': ticket_uuid.hex, 'status': 'pending'})
+
+        if ticket.status == 'failed' or ticket.verification is None:
+            return jsonify({
+                'ticketId': ticket_uuid.hex,
+                'status': 'failed',
+                'httpStatus': ticket.http_status,
+                'error': ticket.message
+            })
+
+        verification = ticket.verification
+        return jsonify({
+            'ticketId': ticket_uuid.hex,
+            'status': 'done',
+            'message': ticket.message,
+            'verification': serialize_verification(
+                verification, verification.user.username, verification.song.title)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def admin_required(view):
+    """Only serve requests carrying `Authorization: Bearer <ADMIN_TOKEN>`"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config['ADMIN_TOKEN']
+        if not token:
+            return jsonify({'error': '관리자 기능이 설정되지 않았습니다'}), 403
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode()):
+            return jsonify({'error': '관리자 인증이 필요합니다'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def load_verification(verification_id):
+    """Verification with its user and song in one query, or 404"""
+    return Verification.query \
+        .options(joinedload(Verification.user), joinedload(Verification.song)) \
+        .get_or_404(verification_id)
+
+
+@api.route('/api/verifications/<int:verification_id>', methods=['GET'])
 def get_verification(verification_id):
     """Get a specific verification"""
     try:
-        verification = Verification.query.get_or_404(verification_id)
+        verification = load_verification(verification_id)
         return jsonify(verification.to_dict())
     except Exception as e:
         return jsonify({'error': str(e)}), 404
 
 
-@app.route('/api/verifications/<int:verification_id>/approve', methods=['PUT'])
+@api.route('/api/verifications/<int:verification_id>/approve', methods=['PUT'])
+@admin_required
 def approve_verification(verification_id):
     """Approve a verification (admin endpoint)"""
     try:
-        verification = Verification.query.get_or_404(verification_id)
+        verification = load_verification(verification_id)
+        username, song_title = verification.user.username, verification.song.title
         verification.status = 'approved'
         verification.verified_at = kst_now()
         db.session.commit()
-        return jsonify(verification.to_dict())
+        verifications_changed((verification, username, song_title, None))
+        return jsonify(serialize_verification(verification, username, song_title))
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/verifications/<int:verification_id>/reject', methods=['PUT'])
+@api.route('/api/verifications/<int:verification_id>/reject', methods=['PUT'])
+@admin_required
 def reject_verification(verification_id):
     """Reject a verification (admin endpoint)"""
     try:
-        verification = Verification.query.get_or_404(verification_id)
+        verification = load_verification(verification_id)
+        username, song_title = verification.user.username, verification.song.title
         verification.status = 'rejected'
         db.session.commit()
-        return jsonify(verification.to_dict())
+        verifications_changed((verification, username, song_title, None))
+        return jsonify(serialize_verification(verification, username, song_title))
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/users/<username>', methods=['GET'])
+def parse_bulk_filter(raw):
+    """Validate a bulk moderation filter; raises ValueError on bad input"""
+    if not isinstance(raw, dict) or not raw:
+        raise ValueError()
+    unknown = set(raw) - {'songId', 'userId', 'username', 'from', 'to', 'status'}
+    if unknown:
+        raise ValueError()
+    filters = {
+        'songId': int(raw['songId']) if raw.get('songId') is not None else None,
+        'userId': int(raw['userId']) if raw.get('userId') is not None else None,
+        'username': raw.get('username'),
+        'from': date.fromisoformat(raw['from']) if raw.get('from') else None,
+        'to': date.fromisoformat(raw['to']) if raw.get('to') else None,
+        'status': raw.get('status')
+    }
+    if filters['status'] not in (None, 'pending', 'approved', 'rejected'):
+        raise ValueError()
+    if not any(value is not None for value in filters.values()):
+        raise ValueError()
+    return filters
+
+
+@api.route('/api/verifications/bulk', methods=['POST'])
+@admin_required
+def bulk_moderate_verifications():
+    """Approve or reject many verifications by id list or filter (admin endpoint)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        action = data.get('action')
+        if action not in MODERATION_STATUSES or ('ids' in data) == ('filter' in data):
+            return jsonify({'error': '잘못된 요청입니다'}), 400
+
+        max_rows = current_app.config['MODERATION_MAX_ROWS']
+        ids = filters = None
+        try:
+            if 'ids' in data:
+                if not isinstance(data['ids'], list):
+                    raise ValueError()
+                ids = list(dict.fromkeys(int(verification_id) for verification_id in data['ids']))
+                if not 0 < len(ids) <= max_rows:
+                    raise ValueError()
+            else:
+                filters = parse_bulk_filter(data['filter'])
+        except (TypeError, ValueError):
+            return jsonify({'error': '잘못된 요청입니다'}), 400
+
+        try:
+            rows, results = bulk_moderate(action, ids=ids, filters=filters, max_rows=max_rows)
+        except TooManyRows:
+            db.session.rollback()
+            return jsonify({'error': f'한 번에 {max_rows}건까지만 처리할 수 있습니다. 조건을 좁혀주세요'}), 400
+        db.session.commit()
+
+        if rows:
+            verifications_changed(*[
+                (verification_from_row(row), row.username, row.song_title, None) for row in rows
+            ])
+
+        summary = {'updated': 0, 'unchanged': 0, 'not_found': 0}
+        for result in results.values():
+            summary[result] += 1
+        return jsonify({
+            'action': action,
+            'status': MODERATION_STATUSES[action],
+            'summary': summary,
+            'results': [{'id': verification_id, 'result': result}
+                        for verification_id, result in results.items()]
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+BULK_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+
+
+def bulk_format(default=None):
+    """Resolve ?format= or the request Content-Type to 'csv' or 'ndjson'"""
+    fmt = request.args.get('format')
+    if fmt is None:
+        fmt = next((name for name, mimetype in BULK_FORMATS.items() if request.mimetype == mimetype), default)
+    if fmt not in BULK_FORMATS:
+        raise ValueError()
+    return fmt
+
+
+@api.route('/api/verifications/import', methods=['POST'])
+@admin_required
+def import_verifications_route():
+    """Bulk import verifications from a raw CSV or NDJSON request body (admin endpoint)"""
+    try:
+        fmt = bulk_format()
+    except ValueError:
+        return jsonify({'error': 'CSV 또는 NDJSON 형식만 지원합니다'}), 400
+
+    try:
+        # Read the body directly, past form parsing, against its own size limit
+        stream = get_input_stream(request.environ, max_content_length=current_app.config['IMPORT_MAX_CONTENT_LENGTH'])
+        summary = import_verifications(stream, fmt)
+        db.session.commit()
+        # Every worker's index catches up from the notification the import sends
+        response_cache.invalidate()
+        return jsonify(summary)
+    except ImportFormatError as e:
+        db.session.rollback()
+        return jsonify({'error': f'CSV 헤더를 확인해주세요: {e}'}), 400
+    except RequestEntityTooLarge:
+        db.session.rollback()
+        limit = current_app.config['IMPORT_MAX_CONTENT_LENGTH'] // (1024 * 1024)
+        return jsonify({'error': f'한 번에 {limit}MB까지 가져올 수 있습니다. 파일을 나눠주세요'}), 413
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/api/verifications/export', methods=['GET'])
+@admin_required
+def export_verifications_route():
+    """Stream all verifications as CSV or NDJSON (admin endpoint)"""
+    try:
+        fmt = bulk_format(default='csv')
+        song_id = request.args.get('songId')
+        filters = {
+            'status': request.args.get('status'),
+            'songId': int(song_id) if song_id else None
+        }
+    except ValueError:
+        return jsonify({'error': '잘못된 요청입니다'}), 400
+
+    rows = export_csv(filters) if fmt == 'csv' else export_ndjson(filters)
+    response = Response(stream_with_context(rows), mimetype=BULK_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename=verifications.{fmt}'
+    return response
+
+
+@api.route('/api/search/users', methods=['GET'])
+@read_router.replica
+def search_users():
+    """Usernames matching q (prefix, then substring) with all-time rank and streams.
+
+    Ranks are on the All Songs board, or on songId's board when given;
+    users without approved streams there have rank null.
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': '검색어를 입력해주세요'}), 400
+        try:
+            song_id = request.args.get('songId')
+            song_id = int(song_id) if song_id else None
+            limit = int(request.args.get('limit', 20))
+            if len(query) > 50 or not 0 < limit <= current_app.config['SEARCH_MAX_LIMIT']:
+                raise ValueError()
+        except ValueError:
+            return jsonify({'error': '잘못된 요청입니다'}), 400
+
+        sync_leaderboard_index()
+        results = []
+        for user_id, username in search_usernames(query, limit):
+            ranked = leaderboard_index.song_rank(song_id, username) if song_id \
+                else leaderboard_index.overall_rank(username)
+            results.append({
+                'id': user_id,
+                'username': username,
+                'rank': ranked[0] if ranked else None,
+                'streamCount': ranked[1][0]['streamCount'] if ranked else 0
+            })
+        return jsonify({'query': query, 'songId': song_id, 'results': results})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/api/users/<username>', methods=['GET'])
+@read_router.replica
 def get_user(username):
     """Get user profile with their verifications"""
     try:
-        user = User.query.filter_by(username=username).first_or_404()
-        verifications = [v.to_dict() for v in user.verifications]
+        user = User.query \
+            .options(selectinload(User.verifications).joinedload(Verification.song)) \
+            .filter_by(username=username) \
+            .first_or_404()
+        verifications = [serialize_verification(v, user.username, v.song.title) for v in user.verifications]
 
         return jsonify({
             **user.to_dict(),
             'verifications': verifications,
-            'totalStreams': sum(v.stream_count for v in user.verifications if v.status == 'approved')
+            'totalStreams': sum(v['streamCount'] for v in verifications if v['status'] == 'approved')
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 404
 
 
-@app.route('/api/users/id/<int:user_id>', methods=['GET'])
+@api.route('/api/users/id/<int:user_id>', methods=['GET'])
+@read_router.replica
 def get_user_by_id(user_id):
     """Get user profile by ID with their verifications"""
     try:
         user = User.query.get_or_404(user_id)
 
-        # Get all approved verifications with song details
-        verifications_data = db.session.query(
-            Verification,
-            Song
+        # Get all approved verifications with song details (columns only)
+        verifications = profile_verification_fields.many(db.session.query(
+            Verification.id,
+            Verification.song_id,
+            Song.title.label('song_title'),
+            Verification.stream_count,
+            Verification.proof_image,
+            Verification.status,
+            Verification.verified_at,
+            Verification.created_at
         ).join(Song, Verification.song_id == Song.id) \
          .filter(Verification.user_id == user_id) \
          .filter(Verification.status == 'approved') \
          .order_by(Verification.stream_count.desc()) \
-         .all()
-
-        verifications = []
-        for verification, song in verifications_data:
-            verifications.append({
-                'id': verification.id,
-                'songId': song.id,
-                'songTitle': song.title,
-                'streamCount': verification.stream_count,
-                'proofImage': verification.proof_image,
-                'status': verification.status,
-                'verifiedAt': verification.verified_at.isoformat() if verification.verified_at else None,
-                'createdAt': verification.created_at.isoformat() if verification.created_at else None
-            })
+         .all())
 
         total_streams = sum(v['streamCount'] for v in verifications)
 
@@ -382,43 +939,196 @@ def get_user_by_id(user_id):
         return jsonify({'error': str(e)}), 404
 
 
-@app.route('/api/stats', methods=['GET'])
+@api.route('/api/stats', methods=['GET'])
+@response_cache.cached
+@read_router.replica
 def get_stats():
     """Get overall statistics"""
     try:
-        total_verifications = Verification.query.filter_by(status='approved').count()
-        total_streams = db.session.query(
-            db.func.sum(Verification.stream_count)
-        ).filter(Verification.status == 'approved').scalar() or 0
-        active_users = db.session.query(Verification.user_id).distinct().count()
-        total_songs = Song.query.count()
-
-        return jsonify({
-            'totalVerifications': total_verifications,
-            'totalStreams': total_streams,
-            'activeUsers': active_users,
-            'totalSongs': total_songs
-        })
+        return jsonify(live_stats())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/uploads/<filename>')
-def uploaded_file(filename):
-    """Serve uploaded files"""
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+@api.route('/api/stream/leaderboard', methods=['GET'])
+def stream_leaderboard():
+    """Server-Sent Events: a snapshot of the board, then rank-change diffs and stats.
+
+    Takes the same songId/filter/from/to as /api/leaderboard plus `limit`
+    (default 100); limit=0 streams stats only. Events: snapshot
+    {entries, total}, diff {changed, removed, total} and stats.
+    """
+    try:
+        song_id = request.args.get('songId')
+        song_id = int(song_id) if song_id else None
+        time_filter = request.args.get('filter', 'all')
+        date_from = request.args.get('from')
+        date_to = request.args.get('to')
+        date_from = date.fromisoformat(date_from) if date_from else None
+        date_to = date.fromisoformat(date_to) if date_to else None
+        limit = int(request.args.get('limit', 100))
+        if not 0 <= limit <= current_app.config['LEADERBOARD_MAX_LIMIT']:
+            raise ValueError()
+    except ValueError:
+        return jsonify({'error': '잘못된 요청입니다'}), 400
+
+    key = None
+    if limit:
+        key = (song_id, time_filter, date_from, date_to, limit)
+    try:
+        subscription, initial = live_broker.subscribe(key)
+    except queue.Full:
+        # This worker is at LIVE_MAX_STREAMS; the client retries later
+        response = jsonify({'error': '요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해주세요'})
+        response.headers['Retry-After'] = str(max(1, current_app.config['LIVE_RETRY_MS'] // 1000))
+        return response, 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
+    retry = current_app.config['LIVE_RETRY_MS']
 
-@app.errorhandler(404)
+    def stream():
+        # Runs outside the request context: no DB session is held while idle
+        try:
+            yield f'retry: {retry}\n\n'
+            yield from initial
+            yield from live_broker.events(subscription)
+        finally:
+            live_broker.unsubscribe(subscription)
+
+    response = Response(stream(), mimetype='text/event-stream')
+    # The generator's finally never runs if the body is closed before it starts
+    response.call_on_close(lambda: live_broker.unsubscribe(subscription))
+    response.headers['Cache-Control'] = 'no-cache'
+    # Keep nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api.route('/uploads/<path:filename>')
+def uploaded_file(filename):
+    """Serve proof image derivatives; content-addressed names are cached as immutable.
+
+    Originals keep the uploader's EXIF/GPS metadata and are never served. A
+    derivative that is not generated yet is built from the original on demand.
+    """
+    if not proof_images.ensure(filename, current_app.config['ALLOWED_EXTENSIONS']):
+        return jsonify({'error': 'Not found'}), 404
+    if is_immutable(filename):
+        cache_control = 'public, max-age=31536000, immutable'
+    else:
+        cache_control = f"public, max-age={current_app.config['UPLOADS_LEGACY_MAX_AGE']}"
+
+    accel_prefix = current_app.config['UPLOADS_ACCEL_REDIRECT']
+    if accel_prefix:
+        # Let nginx stream the file (with Range support) from an internal location
+        if '..' in filename.split('/') or filename.startswith('/'):
+            return jsonify({'error': 'Not found'}), 404
+        response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + filename
+    else:
+        # conditional responses give ETag/Last-Modified, 304s and Range (206) support;
+        # with USE_X_SENDFILE the body is offloaded to the front server
+        response = send_from_directory(current_app.config['UPLOAD_FOLDER'], filename, conditional=True)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+@api.cli.command('backfill-rollups')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='First day to rebuild (default: oldest attached event)')
+def backfill_rollups_command(since):
+    """Rebuild the daily_streams rollup from verification_events"""
+    buckets = backfill_daily_streams(since.date() if since else None)
+    response_cache.invalidate()
+    print(f'daily_streams rebuilt: {buckets} buckets')
+
+
+@api.cli.command('snapshot-ranks')
+def snapshot_ranks_command():
+    """Snapshot changed top-N ranks now and downsample old snapshots"""
+    written = rank_snapshotter.run_once()
+    if written is None:
+        print('another snapshot is in progress')
+    else:
+        print(f'rank snapshot: {written} changed position(s)')
+
+
+@api.cli.command('ensure-event-partitions')
+def ensure_event_partitions_command():
+    """Create monthly verification_events partitions ahead of time (run monthly)"""
+    names = ensure_partitions(current_app.config['EVENT_PARTITIONS_AHEAD'])
+    print(f'verification_events partitions: {", ".join(names)}')
+
+
+@api.cli.command('detach-event-partitions')
+@click.argument('before', type=click.DateTime(formats=['%Y-%m']))
+def detach_event_partitions_command(before):
+    """Detach verification_events partitions for months before BEFORE (YYYY-MM)"""
+    detached = detach_partitions(before.date())
+    print(f'detached {len(detached)} partition(s): {", ".join(detached) or "-"}')
+
+
+@api.cli.command('reconcile-counters')
+def reconcile_counters_command():
+    """Repair site_counters and songs.total_stream_count from verifications"""
+    drift = reconcile_counters()
+    response_cache.invalidate()
+    for name, (stored, actual) in drift.items():
+        print(f'{name}: {stored} -> {actual}')
+    print(f'counters reconciled: {len(drift)} value(s) repaired')
+
+
+@api.cli.command('process-proofs')
+def process_proofs_command():
+    """Generate missing WebP derivatives for existing proof uploads"""
+    processed = 0
+    root = current_app.config['UPLOAD_FOLDER']
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = [name for name in subdirectories if not name.startswith('.')]
+        for filename in sorted(files):
+            filename = os.path.relpath(os.path.join(directory, filename), root)
+            if any(filename.endswith(f'.{size}.webp') for size in PROOF_SIZES):
+                continue  # a derivative itself
+            if not allowed_file(filename):
+                continue
+            if os.path.exists(os.path.join(root, derivative_name(filename, 'thumb'))):
+                continue
+            try:
+                proof_images.process(filename)
+                processed += 1
+            except Exception as e:
+                print(f'{filename}: {e}')
+    print(f'proof derivatives generated for {processed} file(s)')
+
+
+@api.cli.command('gc-proofs')
+def gc_proofs_command():
+    """Delete proof files no verification references anymore"""
+    removed = proof_storage.collect_unreferenced(current_app.config['PROOF_GC_GRACE_SECONDS'])
+    print(f'unreferenced proof files removed: {removed}')
+
+
+@api.cli.command('prune-ingest-tickets')
+def prune_ingest_tickets_command():
+    """Delete queued-submission tickets older than INGEST_TICKET_RETENTION_HOURS"""
+    cutoff = kst_now() - timedelta(hours=current_app.config['INGEST_TICKET_RETENTION_HOURS'])
+    removed = IngestTicket.query.filter(IngestTicket.created_at < cutoff).delete()
+    db.session.commit()
+    print(f'ingest tickets removed: {removed}')
+
+
+@api.app_errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Not found'}), 404
 
 
-@app.errorhandler(500)
+@api.app_errorhandler(500)
 def internal_error(error):
     db.session.rollback()
     return jsonify({'error': 'Internal server error'}), 500
 
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Development server only; production runs wsgi.py under gunicorn (gunicorn.conf.py)
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
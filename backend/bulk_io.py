@@ -0,0 +1,218 @@
+import csv
+import io
+import json
+
+import psycopg
+
+from models import db, kst_now
+
+# Staging columns, in COPY order; header aliases map the API's camelCase names
+IMPORT_COLUMNS = ('username', 'pin', 'song_id', 'stream_count', 'proof_image')
+REQUIRED_COLUMNS = {'username', 'pin', 'song_id', 'stream_count'}
+COLUMN_ALIASES = {
+    'songId': 'song_id',
+    'streamCount': 'stream_count',
+    'proofImage': 'proof_image'
+}
+
+EXPORT_COLUMNS = ('id', 'username', 'song_id', 'song_title', 'stream_count', 'status',
+                  'proof_image', 'created_at', 'verified_at', 'updated_at')
+
+CHUNK_SIZE = 64 * 1024
+EXPORT_BATCH_SIZE = 2000
+
+_STAGING_DDL = """
+    CREATE TEMP TABLE verification_import (
+        line BIGSERIAL,
+        username TEXT,
+        pin TEXT,
+        song_id TEXT,
+        stream_count TEXT,
+        proof_image TEXT
+    ) ON COMMIT DROP
+"""
+
+# One row per (username, song) - the last one in the file wins, earlier ones are superseded
+_VALID_ROWS_DDL = """
+    CREATE TEMP TABLE verification_import_rows ON COMMIT DROP AS
+    SELECT DISTINCT ON (s.username, s.song_id::INTEGER)
+        s.line,
+        s.username,
+        encode(sha256(convert_to(s.pin, 'UTF8')), 'hex') AS pin_hash,
+        s.song_id::INTEGER AS song_id,
+        s.stream_count::INTEGER AS stream_count,
+        NULLIF(s.proof_image, '') AS proof_image,
+        COUNT(*) OVER (PARTITION BY s.username, s.song_id) AS copies
+    FROM verification_import s
+    JOIN songs ON songs.id::TEXT = s.song_id
+    WHERE length(s.username) BETWEEN 1 AND 50
+        AND s.pin ~ '^[0-9]{4}$'
+        -- CASE guards the cast: AND operands have no evaluation order
+        AND CASE WHEN s.stream_count ~ '^[0-9]{1,9}$' THEN s.stream_count::INTEGER > 0 END
+        AND coalesce(length(s.proof_image), 0) <= 255
+    ORDER BY s.username, s.song_id::INTEGER, s.line DESC
+"""
+
+# A new user has no verification to inherit a proof from, so only a row with a
+# proof image can create one; its PIN is the one the upsert then matches
+_INSERT_USERS = """
+    INSERT INTO users (username, pin_hash, created_at, updated_at)
+    SELECT DISTINCT ON (username) username, pin_hash, :now, :now
+    FROM verification_import_rows
+    WHERE proof_image IS NOT NULL
+    ORDER BY username, line DESC
+    ON CONFLICT (username) DO NOTHING
+"""
+
+_UPSERT_VERIFICATIONS = """
+    WITH upserted AS (
+        INSERT INTO verifications
+            (user_id, song_id, stream_count, proof_image, status, verified_at, created_at, updated_at)
+        SELECT u.id, r.song_id, r.stream_count, coalesce(r.proof_image, v.proof_image),
+            'approved', :now, :now, :now
+        FROM verification_import_rows r
+        JOIN users u ON u.username = r.username AND u.pin_hash = r.pin_hash
+        LEFT JOIN verifications v ON v.user_id = u.id AND v.song_id = r.song_id
+        WHERE coalesce(r.proof_image, v.proof_image) IS NOT NULL
+        ON CONFLICT (user_id, song_id) DO UPDATE SET
+            stream_count = EXCLUDED.stream_count,
+            proof_image = EXCLUDED.proof_image,
+            verified_at = EXCLUDED.verified_at,
+            updated_at = EXCLUDED.updated_at
+        RETURNING xmax = 0 AS created
+    )
+    SELECT count(*) FILTER (WHERE created), count(*) FILTER (WHERE NOT created)
+    FROM upserted
+"""
+
+_REJECTED_ROWS = """
+    SELECT
+        (SELECT count(*) FROM verification_import),
+        (SELECT count(*) FROM verification_import_rows),
+        (SELECT coalesce(sum(copies - 1), 0)::BIGINT FROM verification_import_rows),
+        (SELECT count(*) FROM verification_import_rows r
+            JOIN users u ON u.username = r.username AND u.pin_hash <> r.pin_hash)
+"""
+
+
+class ImportFormatError(ValueError):
+    """The upload's header or format can't be mapped onto the staging table"""
+
+
+def _csv_columns(header_line):
+    header = next(csv.reader([header_line.lstrip('\ufeff')]), [])
+    columns = [COLUMN_ALIASES.get(name.strip(), name.strip()) for name in header]
+    unknown = set(columns) - set(IMPORT_COLUMNS)
+    if unknown or not REQUIRED_COLUMNS <= set(columns) or len(set(columns)) != len(columns):
+        raise ImportFormatError(header_line.strip())
+    return columns
+
+
+def _copy_csv(cursor, stream):
+    """COPY a CSV upload (header row first) straight into the staging table"""
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    columns = _csv_columns(text.readline())
+    with cursor.copy(f"COPY verification_import ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)") as copy:
+        for chunk in iter(lambda: text.read(CHUNK_SIZE), ''):
+            copy.write(chunk.encode('utf-8'))
+
+
+def _copy_ndjson(cursor, stream):
+    """COPY an NDJSON upload, one object per line; unparsable lines stage as empty rows"""
+    with cursor.copy(f"COPY verification_import ({', '.join(IMPORT_COLUMNS)}) FROM STDIN") as copy:
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                record = {COLUMN_ALIASES.get(key, key): value for key, value in record.items()}
+            except (ValueError, AttributeError):
+                record = {}
+            copy.write_row(tuple(
+                None if record.get(column) is None else str(record[column])
+                for column in IMPORT_COLUMNS
+            ))
+
+
+def import_verifications(stream, fmt):
+    """Stage an upload with COPY and merge it into users/verifications set-wise.
+
+    New users are created with the PIN of their last row that has a proof
+    image, and only if they have one; rows whose PIN does not match
+    an existing user are skipped, as are rows for unknown songs, invalid
+    values, and new verifications without a proof image. Resubmitted rows
+    keep their moderation status, matching POST /api/verifications. Counter
+    deltas are applied once per song. The caller commits.
+    """
+    db.session.execute(db.text("SET LOCAL app.defer_counts = 'on'"))
+    db.session.execute(db.text(_STAGING_DDL))
+    cursor = db.session.connection().connection.driver_connection.cursor()
+    stream = io.BufferedReader(stream, CHUNK_SIZE)
+    if fmt == 'csv':
+        _copy_csv(cursor, stream)
+    else:
+        _copy_ndjson(cursor, stream)
+
+    now = kst_now()
+    db.session.execute(db.text(_VALID_ROWS_DDL))
+    db.session.execute(db.text(_INSERT_USERS), {'now': now})
+    received, valid, superseded, pin_mismatch = db.session.execute(db.text(_REJECTED_ROWS)).one()
+    inserted, updated = db.session.execute(db.text(_UPSERT_VERIFICATIONS), {'now': now}).one()
+    db.session.execute(db.text('SELECT apply_count_deltas()'))
+    return {
+        'received': received,
+        'inserted': inserted,
+        'updated': updated,
+        'skipped': {
+            'invalid': received - valid - superseded,
+            'superseded': superseded,
+            'pinMismatch': pin_mismatch,
+            'missingProof': valid - pin_mismatch - inserted - updated
+        }
+    }
+
+
+def _export_query(filters):
+    """Export SELECT with psycopg placeholders, and its parameters"""
+    conditions = []
+    params = {}
+    if filters.get('status'):
+        conditions.append('v.status = %(status)s')
+        params['status'] = filters['status']
+    if filters.get('songId'):
+        conditions.append('v.song_id = %(song_id)s')
+        params['song_id'] = filters['songId']
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    return f"""
+        SELECT v.id, u.username, v.song_id, s.title AS song_title, v.stream_count, v.status,
+            v.proof_image, v.created_at, v.verified_at, v.updated_at
+        FROM verifications v
+        JOIN users u ON u.id = v.user_id
+        JOIN songs s ON s.id = v.song_id
+        {where}
+        ORDER BY v.id
+    """, params
+
+
+def export_csv(filters):
+    """Yield CSV chunks straight from COPY ... TO STDOUT"""
+    query, params = _export_query(filters)
+    connection = db.session.connection().connection.driver_connection
+    # COPY takes no bind parameters; render them client-side
+    statement = psycopg.ClientCursor(connection).mogrify(query, params)
+    with connection.cursor().copy(f'COPY ({statement}) TO STDOUT WITH (FORMAT csv, HEADER true)') as copy:
+        for chunk in copy:
+            yield bytes(chunk)
+
+
+def export_ndjson(filters):
+    """Yield one JSON object per line, read through a server-side (named) cursor"""
+    query, params = _export_query(filters)
+    connection = db.session.connection().connection.driver_connection
+    with connection.cursor(name='verification_export') as cursor:
+        cursor.execute(query, params)
+        while rows := cursor.fetchmany(EXPORT_BATCH_SIZE):
+            yield ''.join(json.dumps({
+                column: value.isoformat() if hasattr(value, 'isoformat') else value
+                for column, value in zip(EXPORT_COLUMNS, row)
+            }, ensure_ascii=False) + '\n' for row in rows).encode('utf-8')
@@ -0,0 +1,160 @@
+import fcntl
+import functools
+import gzip
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+from flask import Response, g, request
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+_GENERATION = struct.Struct('<Q')
+
+# Bodies smaller than this are served uncompressed
+MIN_COMPRESS_SIZE = 512
+
+
+class GenerationCounter:
+    """Invalidation counter shared by every worker process on the host.
+
+    Backed by an 8-byte memory-mapped file (under /dev/shm by default), so
+    reading the current generation is a memory load and bumping it is a
+    flock-protected increment that all workers see immediately.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._map = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        with self._lock:
+            if self._map is None:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    if os.fstat(fd).st_size < _GENERATION.size:
+                        os.ftruncate(fd, _GENERATION.size)
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                self._map = mmap.mmap(fd, _GENERATION.size)
+                self._fd = fd
+        return self._map
+
+    def current(self):
+        return _GENERATION.unpack_from(self._open(), 0)[0]
+
+    def bump(self):
+        """Increment the generation and return the new value"""
+        shared = self._open()
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            generation = _GENERATION.unpack_from(shared, 0)[0] + 1
+            _GENERATION.pack_into(shared, 0, generation)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return generation
+
+
+class _CachedResponse:
+    """A 200 response body with its precompressed variants and ETags"""
+    __slots__ = ('generation', 'mimetype', 'variants')
+
+    def __init__(self, generation, response):
+        self.generation = generation
+        self.mimetype = response.mimetype
+        body = response.get_data()
+        digest = hashlib.sha1(body).hexdigest()
+        # encoding -> (etag, body); each representation gets its own strong ETag
+        self.variants = {'identity': (digest, body)}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            self.variants['gzip'] = (f'{digest}-gz', gzip.compress(body, compresslevel=6))
+            if brotli is not None:
+                self.variants['br'] = (f'{digest}-br', brotli.compress(body, quality=5))
+
+    def to_response(self):
+        encoding = 'identity'
+        accepted = request.accept_encodings
+        for candidate in ('br', 'gzip'):
+            if candidate in self.variants and accepted[candidate]:
+                encoding = candidate
+                break
+        etag, body = self.variants[encoding]
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype=self.mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+class ResponseCache:
+    """Cache for read endpoints, invalidated by a shared generation counter.
+
+    Write endpoints call invalidate() after commit; every cached entry from an
+    older generation is then treated as a miss by all workers.
+    """
+
+    def __init__(self, app=None):
+        self.counter = None
+        self.max_entries = 512
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.counter = GenerationCounter(app.config['CACHE_GENERATION_FILE'])
+        self.max_entries = app.config['RESPONSE_CACHE_SIZE']
+
+    def generation(self):
+        return self.counter.current()
+
+    def invalidate(self):
+        """Bump the shared generation; returns the new value"""
+        return self.counter.bump()
+
+    def cached(self, view):
+        """Serve a GET view from the cache with ETag/304 and precompressed bodies.
+
+        A view can set g.skip_response_cache to keep its response out of the cache.
+        """
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = (request.path, tuple(sorted(request.args.items(multi=True))))
+            generation = self.counter.current()
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.generation == generation:
+                    self._entries.move_to_end(key)
+                    return entry.to_response()
+
+            response = view(*args, **kwargs)
+            if isinstance(response, tuple) or response.status_code != 200 \
+                    or g.get('skip_response_cache'):
+                return response
+
+            entry = _CachedResponse(generation, response)
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return entry.to_response()
+        return wrapper
+
+
+response_cache = ResponseCache()
@@ -1,41 +1,222 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
 
+CPU_COUNT = os.cpu_count() or 1
 
-class Config:
-    """Base configuration"""
-    SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+
+def database_uri(database_url):
+    """SQLAlchemy URI for a postgresql:// URL: psycopg3 driver, KST session timezone"""
     # Convert postgresql:// to postgresql+psycopg:// for psycopg3
-    database_url = os.environ.get('DATABASE_URL', 'postgresql://localhost/nmixx_streaming')
     if database_url.startswith('postgresql://'):
         database_url = database_url.replace('postgresql://', 'postgresql+psycopg://', 1)
-    
+
     # Add timezone parameter for KST (Asia/Seoul)
     if '?' in database_url:
         database_url += '&options=-c timezone=Asia/Seoul'
     else:
         database_url += '?options=-c timezone=Asia/Seoul'
-    
-    SQLALCHEMY_DATABASE_URI = database_url
+    return database_url
+
+
+# Pooled sessions of a worker's background threads: ingest writer, live
+# fan-out and rank snapshots
+BACKGROUND_SESSIONS = 3
+# Fewest pooled connections a worker can run with: the background threads plus
+# one request at a time
+MIN_POOL_SIZE = BACKGROUND_SESSIONS + 1
+
+
+def max_workers(max_connections, reserved):
+    """Most worker processes that still get MIN_POOL_SIZE pooled connections
+    plus their LISTEN connection within max_connections"""
+    return max(1, (max_connections - reserved) // (MIN_POOL_SIZE + 1))
+
+
+def pool_options(workers, threads, max_connections, reserved):
+    """SQLAlchemy pool sized so every worker at full overflow stays under max_connections.
+
+    Each worker holds up to `threads` request sessions plus the background
+    threads' sessions, and one LISTEN connection outside the pool. Raises
+    ValueError when the budget leaves a worker fewer than MIN_POOL_SIZE.
+    """
+    per_worker = (max_connections - reserved) // max(workers, 1) - 1
+    if per_worker < MIN_POOL_SIZE:
+        raise ValueError(
+            f'{workers} workers need {workers * (MIN_POOL_SIZE + 1) + reserved} database connections, '
+            f'DB_MAX_CONNECTIONS is {max_connections}; lower WEB_CONCURRENCY (at most '
+            f'{max_workers(max_connections, reserved)}) or raise DB_MAX_CONNECTIONS'
+        )
+    pool_size = min(threads + BACKGROUND_SESSIONS, per_worker)
+    return {
+        'pool_size': pool_size,
+        'max_overflow': per_worker - pool_size,
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+
+
+class Config:
+    """Base configuration"""
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+    SQLALCHEMY_DATABASE_URI = database_uri(os.environ.get('DATABASE_URL', 'postgresql://localhost/nmixx_streaming'))
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ECHO = os.environ.get('SQLALCHEMY_ECHO', 'false').lower() == 'true'
+    # Statements at least this slow are logged with their route and counted at /metrics
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+
+    # Connection budget shared by all workers; keep in line with Postgres max_connections
+    DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 100))
+    # Left for psql, migrations and CLI commands
+    DB_RESERVED_CONNECTIONS = int(os.environ.get('DB_RESERVED_CONNECTIONS', 10))
+    # Serving (gunicorn.conf.py): worker processes, each serving connections on
+    # greenlets ('gevent', so open live streams cost no OS thread) or on
+    # WEB_THREADS threads ('gthread'). By default 2 x CPUs + 1 workers, fewer
+    # when the connection budget can't give each one a pool
+    WEB_CONCURRENCY = int(os.environ.get(
+        'WEB_CONCURRENCY', min(CPU_COUNT * 2 + 1, max_workers(DB_MAX_CONNECTIONS, DB_RESERVED_CONNECTIONS))
+    ))
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 4))
+    WORKER_CLASS = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+    WORKER_CONNECTIONS = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+    SQLALCHEMY_ENGINE_OPTIONS = pool_options(WEB_CONCURRENCY, WEB_THREADS,
+                                             DB_MAX_CONNECTIONS, DB_RESERVED_CONNECTIONS)
+
+    # Optional read replica (replicas.py): read-only GET endpoints use it while
+    # it is reachable and within REPLICA_MAX_LAG_SECONDS of the primary
+    SQLALCHEMY_BINDS = {'replica': database_uri(os.environ['DATABASE_READ_URL'])} \
+        if os.environ.get('DATABASE_READ_URL') else {}
+    REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))
+    REPLICA_CHECK_INTERVAL = float(os.environ.get('REPLICA_CHECK_INTERVAL', 1))
+    # After a write the client reads from the primary for this long (read-your-writes)
+    READ_STICKY_SECONDS = float(os.environ.get('READ_STICKY_SECONDS', 5))
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 10 * 1024 * 1024))  # 10MB default
+    # Raw CSV/NDJSON bodies of /api/verifications/import; split larger backfills
+    IMPORT_MAX_CONTENT_LENGTH = int(os.environ.get('IMPORT_MAX_CONTENT_LENGTH', 32 * 1024 * 1024))
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+    # Uploads: offload file bodies to the front server when it is configured for it
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'false').lower() == 'true'
+    UPLOADS_ACCEL_REDIRECT = os.environ.get('UPLOADS_ACCEL_REDIRECT')  # e.g. /internal-uploads/
+    UPLOADS_LEGACY_MAX_AGE = int(os.environ.get('UPLOADS_LEGACY_MAX_AGE', 3600))
+    PROOF_GC_GRACE_SECONDS = int(os.environ.get('PROOF_GC_GRACE_SECONDS', 24 * 3600))
+    # Proof image derivatives (thumb/preview/full WebP) are built on a bounded pool
+    IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', min(4, os.cpu_count() or 1)))
+    IMAGE_QUEUE_SIZE = int(os.environ.get('IMAGE_QUEUE_SIZE', 64))
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:3000').split(',')
+    # Page size of /api/leaderboard when the request gives no limit
+    LEADERBOARD_DEFAULT_LIMIT = int(os.environ.get('LEADERBOARD_DEFAULT_LIMIT', 100))
+    LEADERBOARD_MAX_LIMIT = int(os.environ.get('LEADERBOARD_MAX_LIMIT', 500))
+    LEADERBOARD_MAX_AROUND = int(os.environ.get('LEADERBOARD_MAX_AROUND', 50))
+    SEARCH_MAX_LIMIT = int(os.environ.get('SEARCH_MAX_LIMIT', 50))
+    # Verifications changed by other workers are re-read by id; a live round with
+    # more changed ids than this reloads the whole index instead
+    LEADERBOARD_MAX_APPLY = int(os.environ.get('LEADERBOARD_MAX_APPLY', 5000))
+
+    # Response cache: the generation file must be shared by all workers on the host
+    CACHE_GENERATION_FILE = os.environ.get(
+        'CACHE_GENERATION_FILE',
+        os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+                     'nmixx_streaming_cache.gen')
+    )
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 512))
+    # In-process model caches (models.py): song catalog and username -> credentials
+    SONG_CACHE_TTL = float(os.environ.get('SONG_CACHE_TTL', 3600))
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))
+    USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 300))
+
+    # Verification writes: 'sync' commits per request, 'queued' group-commits in batches
+    INGEST_MODE = os.environ.get('INGEST_MODE', 'sync')
+    INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 200))
+    INGEST_BATCH_INTERVAL_MS = float(os.environ.get('INGEST_BATCH_INTERVAL_MS', 5))
+    INGEST_QUEUE_SIZE = int(os.environ.get('INGEST_QUEUE_SIZE', 10000))
+    INGEST_TICKET_RETENTION_HOURS = int(os.environ.get('INGEST_TICKET_RETENTION_HOURS', 24))
+    # Live leaderboard (SSE). LIVE_MAX_STREAMS caps open streams per worker (503
+    # beyond it): under gevent half the worker's connections, under gthread half
+    # its threads, since every stream holds one
+    LIVE_MAX_STREAMS = int(os.environ.get(
+        'LIVE_MAX_STREAMS',
+        WORKER_CONNECTIONS // 2 if WORKER_CLASS == 'gevent' else WEB_THREADS // 2
+    )) or 1
+    LIVE_HEARTBEAT_SECONDS = float(os.environ.get('LIVE_HEARTBEAT_SECONDS', 15))
+    LIVE_COALESCE_MS = float(os.environ.get('LIVE_COALESCE_MS', 250))
+    LIVE_QUEUE_SIZE = int(os.environ.get('LIVE_QUEUE_SIZE', 64))
+    LIVE_RETRY_MS = int(os.environ.get('LIVE_RETRY_MS', 3000))
+    # Months of verification_events partitions `flask ensure-event-partitions` creates ahead
+    EVENT_PARTITIONS_AHEAD = int(os.environ.get('EVENT_PARTITIONS_AHEAD', 3))
+    # Rank snapshots (snapshots.py): changed top-N positions every interval, 0 = only
+    # `flask snapshot-ranks`; thinned to daily, then weekly rows as they age
+    SNAPSHOT_INTERVAL_SECONDS = float(os.environ.get('SNAPSHOT_INTERVAL_SECONDS', 3600))
+    SNAPSHOT_TOP_N = int(os.environ.get('SNAPSHOT_TOP_N', 100))
+    SNAPSHOT_DAILY_AFTER_DAYS = int(os.environ.get('SNAPSHOT_DAILY_AFTER_DAYS', 7))
+    SNAPSHOT_WEEKLY_AFTER_DAYS = int(os.environ.get('SNAPSHOT_WEEKLY_AFTER_DAYS', 90))
+    SNAPSHOT_HISTORY_MAX_DAYS = int(os.environ.get('SNAPSHOT_HISTORY_MAX_DAYS', 366))
+    # Upper bound on verifications one bulk moderation request may change, listed
+    # by id or matched by a filter
+    MODERATION_MAX_ROWS = int(os.environ.get('MODERATION_MAX_ROWS', 10000))
+    # Bearer token for the admin endpoints (moderation, import and export); they
+    # answer 403 while unset
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+    # Admission control (admission.py): token buckets of (tokens per second, burst)
+    # per client IP and per endpoint across all workers, kept in RATE_LIMIT_FILE.
+    # 'read' endpoints are shed with 503 while READ_MAX_IN_FLIGHT reads run in a
+    # worker, leaving request threads (or, under gevent, pool connections) for writes
+    # Proxies in front of the app whose X-Forwarded-For gives the client IP.
+    # Behind a proxy with this unset, every request comes from the proxy's address
+    # and the per-client buckets turn into one global limit, so limits default to
+    # on only when it is set
+    TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+    RATE_LIMIT_ENABLED = os.environ.get(
+        'RATE_LIMIT_ENABLED', 'true' if TRUSTED_PROXIES else 'false'
+    ).lower() == 'true'
+    RATE_LIMIT_FILE = os.environ.get(
+        'RATE_LIMIT_FILE',
+        os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+                     'nmixx_streaming_limits')
+    )
+    RATE_LIMIT_SLOTS = int(os.environ.get('RATE_LIMIT_SLOTS', 65536))
+    READ_MAX_IN_FLIGHT = int(os.environ.get(
+        'READ_MAX_IN_FLIGHT',
+        SQLALCHEMY_ENGINE_OPTIONS['pool_size'] + SQLALCHEMY_ENGINE_OPTIONS['max_overflow'] - 1
+        if WORKER_CLASS == 'gevent' else WEB_THREADS - 1
+    )) or 1
+    RATE_LIMITS = {
+        'api.create_verification': {'client': (1, 10), 'global': (100, 200), 'priority': 'write'},
+        'api.get_ingest_ticket': {'client': (5, 20), 'priority': 'write'},
+        'api.login': {'client': (1, 10), 'priority': 'write'},
+        'api.get_leaderboard': {'client': (10, 40), 'priority': 'read'},
+        'api.get_leaderboard_rank': {'client': (10, 40), 'priority': 'read'},
+        'api.get_leaderboard_changes': {'client': (5, 20), 'priority': 'read'},
+        'api.get_leaderboard_history': {'client': (5, 20), 'priority': 'read'},
+        'api.search_users': {'client': (10, 30), 'priority': 'read'},
+        'api.get_stats': {'client': (10, 40), 'priority': 'read'},
+        'api.get_songs': {'client': (10, 40), 'priority': 'read'},
+        'api.get_song': {'client': (10, 40), 'priority': 'read'},
+        'api.get_user': {'client': (5, 20), 'priority': 'read'},
+        'api.get_user_by_id': {'client': (5, 20), 'priority': 'read'},
+        'api.get_verification': {'client': (10, 40), 'priority': 'read'},
+        'api.approve_verification': {'client': (2, 20), 'priority': 'write'},
+        'api.reject_verification': {'client': (2, 20), 'priority': 'write'},
+        'api.bulk_moderate_verifications': {'client': (0.1, 2), 'global': (0.5, 2), 'priority': 'write'},
+        'api.export_verifications_route': {'client': (0.1, 2), 'global': (1, 2), 'priority': 'read'},
+        'api.import_verifications_route': {'client': (0.05, 2), 'global': (0.1, 2), 'priority': 'write'},
+        # Long-lived: limits reconnects only and holds no read slot
+        'api.stream_leaderboard': {'client': (1, 10)},
+    }
 
 
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
-    SQLALCHEMY_ECHO = True
 
 
 class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
-    SQLALCHEMY_ECHO = False
 
 
 config = {
@@ -0,0 +1,43 @@
+from models import db, Song, Verification, SiteCounter
+
+
+def reconcile_counters():
+    """Recompute trigger-maintained counters from the source rows.
+
+    Repairs site_counters and songs.total_stream_count in one transaction and
+    returns {counter: (stored, actual)} for every value that had drifted.
+    """
+    drift = {}
+
+    actual = {
+        'total_verifications': Verification.query.filter_by(status='approved').count(),
+        'total_streams': db.session.query(
+            db.func.coalesce(db.func.sum(Verification.stream_count), 0)
+        ).filter(Verification.status == 'approved').scalar(),
+        'active_users': db.session.query(
+            db.func.count(db.distinct(Verification.user_id))
+        ).scalar(),
+        'total_songs': Song.query.count()
+    }
+    counters = db.session.get(SiteCounter, 1, with_for_update=True)
+    if counters is None:
+        counters = SiteCounter(id=1)
+        db.session.add(counters)
+    for name, value in actual.items():
+        stored = getattr(counters, name)
+        if stored != value:
+            drift[name] = (stored, value)
+            setattr(counters, name, value)
+
+    song_totals = dict(db.session.query(
+        Verification.song_id,
+        db.func.sum(Verification.stream_count)
+    ).filter(Verification.status == 'approved').group_by(Verification.song_id).all())
+    for song in Song.query.with_for_update().all():
+        value = song_totals.get(song.id, 0)
+        if song.total_stream_count != value:
+            drift[f'songs[{song.id}].total_stream_count'] = (song.total_stream_count, value)
+            song.total_stream_count = value
+
+    db.session.commit()
+    return drift
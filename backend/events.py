@@ -0,0 +1,60 @@
+from datetime import date
+
+from models import db, kst_now
+
+PARTITION_PREFIX = 'verification_events_'
+
+
+def month_start(value):
+    return value.replace(day=1)
+
+
+def add_months(value, months):
+    month = value.month - 1 + months
+    return date(value.year + month // 12, month % 12 + 1, 1)
+
+
+def ensure_partitions(months_ahead, first_month=None):
+    """Create monthly verification_events partitions through `months_ahead`
+    months past the current one; returns the partition names"""
+    first_month = month_start(first_month or kst_now().date())
+    names = db.session.execute(
+        db.text('SELECT ensure_verification_events_partitions(:first_month, :months_ahead)'),
+        {'first_month': first_month, 'months_ahead': months_ahead}
+    ).scalars().all()
+    db.session.commit()
+    return names
+
+
+def attached_partitions():
+    """[(name, first_day)] of the monthly partitions, oldest first"""
+    rows = db.session.execute(db.text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'verification_events' AND child.relname ~ '^verification_events_[0-9]{4}_[0-9]{2}$'
+        ORDER BY child.relname
+    """)).scalars().all()
+    partitions = []
+    for name in rows:
+        year, month = name[len(PARTITION_PREFIX):].split('_')
+        partitions.append((name, date(int(year), int(month), 1)))
+    return partitions
+
+
+def detach_partitions(before):
+    """Detach every monthly partition that ends on or before `before`'s month.
+
+    Detached partitions stay as plain tables for archiving (pg_dump, then
+    DROP TABLE); daily_streams keeps their rollups.
+    """
+    cutoff = month_start(before)
+    detached = []
+    for name, first_day in attached_partitions():
+        if add_months(first_day, 1) > cutoff:
+            break
+        db.session.execute(db.text(f'ALTER TABLE verification_events DETACH PARTITION "{name}"'))
+        detached.append(name)
+    db.session.commit()
+    return detached
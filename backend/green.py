@@ -0,0 +1,16 @@
+import sys
+
+
+def gevent_patched():
+    """Whether gevent has monkey-patched threading"""
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('threading')
+
+
+def run_native(function, *args):
+    """Call function, on an OS thread under gevent so CPU-bound work doesn't
+    stall every other connection of the worker; the caller waits either way"""
+    if not gevent_patched():
+        return function(*args)
+    from gevent import get_hub
+    return get_hub().threadpool.apply(function, args)
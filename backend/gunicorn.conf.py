@@ -0,0 +1,44 @@
+"""Gunicorn settings; worker/thread counts and the DB pool share config.py's numbers.
+
+Reload code without dropping requests with `kill -HUP <master pid>`.
+"""
+import os
+import shutil
+
+from config import Config
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = Config.WEB_CONCURRENCY
+threads = Config.WEB_THREADS
+
+# 'gevent' by default: every page view holds /api/stream/leaderboard open, and
+# under 'gthread' each open stream would take one of the worker's threads
+worker_class = Config.WORKER_CLASS
+worker_connections = Config.WORKER_CONNECTIONS
+
+# Workers build their leaderboard index and background threads after fork
+preload_app = False
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers periodically; jitter keeps them from restarting together
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 1000))
+
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    # Metric files of the previous run would be summed into the new one
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,137 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+from werkzeug.security import safe_join
+
+from green import gevent_patched, run_native
+from metrics import IMAGE_SECONDS, IMAGE_FAILURES
+
+# Longest edge in pixels for each WebP derivative of a proof upload
+PROOF_SIZES = {
+    'thumb': 160,
+    'preview': 720,
+    'full': 1600
+}
+
+
+def derivative_name(filename, size):
+    """Name of a proof image derivative, relative to the upload folder"""
+    stem = filename.rsplit('.', 1)[0]
+    return f'{stem}.{size}.webp'
+
+
+def derivative_names(filename):
+    return {size: derivative_name(filename, size) for size in PROOF_SIZES}
+
+
+def parse_derivative(name):
+    """(original stem, size) of a derivative name, or None for any other name"""
+    parts = name.rsplit('.', 2)
+    if len(parts) == 3 and parts[1] in PROOF_SIZES and parts[2] == 'webp':
+        return parts[0], parts[1]
+    return None
+
+
+class ProofImageProcessor:
+    """Generates downscaled, metadata-free WebP derivatives of proof uploads.
+
+    Work runs on a bounded thread pool so the upload request returns as soon as
+    the original is on disk. When the queue is full the image is processed in
+    the calling thread instead, which pushes back on the submitters. Only the
+    derivatives are served; ensure() builds one on request if the pool has not
+    got to it yet. Under gevent all of this work runs on OS threads, since
+    decoding on a greenlet would stall every other connection of the worker.
+    """
+
+    def __init__(self, app=None):
+        self.upload_folder = None
+        self._executor = None
+        self._slots = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.upload_folder = app.config['UPLOAD_FOLDER']
+        self.logger = app.logger
+        executor = ThreadPoolExecutor
+        if gevent_patched():
+            # Same interface, but on native threads even with threading patched
+            from gevent.threadpool import ThreadPoolExecutor as executor
+        self._executor = executor(
+            max_workers=app.config['IMAGE_WORKERS'],
+            thread_name_prefix='proof-image'
+        )
+        self._slots = threading.BoundedSemaphore(
+            app.config['IMAGE_WORKERS'] + app.config['IMAGE_QUEUE_SIZE']
+        )
+
+    def submit(self, filename):
+        """Queue derivative generation for an uploaded file"""
+        if not self._slots.acquire(blocking=False):
+            self._run_inline(filename)
+            return
+        try:
+            self._executor.submit(self._run_queued, filename)
+        except RuntimeError:
+            # Executor shut down (interpreter exit); release and process inline
+            self._slots.release()
+            self._run_inline(filename)
+
+    def _run_inline(self, filename):
+        run_native(self._run, filename)
+
+    def _run_queued(self, filename):
+        try:
+            self._run(filename)
+        finally:
+            self._slots.release()
+
+    def _run(self, filename):
+        try:
+            with IMAGE_SECONDS.time():
+                self.process(filename)
+        except Exception:
+            IMAGE_FAILURES.inc()
+            self.logger.exception('Failed to process proof image %s', filename)
+
+    def ensure(self, name, extensions):
+        """Whether derivative `name` exists, building it inline from its original
+        (any of `extensions`) when it does not yet"""
+        parsed = parse_derivative(name)
+        target = safe_join(self.upload_folder, name)
+        if parsed is None or target is None:
+            return False
+        if os.path.exists(target):
+            return True
+        stem, _ = parsed
+        for extension in extensions:
+            original = f'{stem}.{extension}'
+            if os.path.isfile(os.path.join(self.upload_folder, original)):
+                self._run_inline(original)
+                break
+        return os.path.exists(target)
+
+    def process(self, filename):
+        """Decode, strip metadata, downscale and write every WebP derivative"""
+        source = os.path.join(self.upload_folder, filename)
+        with Image.open(source) as image:
+            # Let the JPEG decoder downscale while decoding when it can
+            image.draft('RGB', (PROOF_SIZES['full'], PROOF_SIZES['full']))
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+            # Largest first so each smaller size resamples an already reduced image
+            for size, edge in sorted(PROOF_SIZES.items(), key=lambda item: -item[1]):
+                image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+                target = os.path.join(self.upload_folder, derivative_name(filename, size))
+                # Unique per writer: ensure() may build the same file in two requests
+                temp = f'{target}.{os.getpid()}.{threading.get_ident()}.tmp'
+                # No exif/icc arguments: the derivative carries no metadata
+                image.save(temp, 'WEBP', quality=80, method=4)
+                os.replace(temp, target)
+
+
+proof_images = ProofImageProcessor()
@@ -0,0 +1,176 @@
+import queue
+import threading
+import time
+import uuid
+
+from sqlalchemy.exc import DBAPIError
+
+from models import db, User, IngestTicket, user_cache
+from submissions import resolve_user, upsert_verification, SongNotFound
+
+
+class Submission:
+    """A validated verification submission waiting for the batch writer"""
+    __slots__ = ('ticket_id', 'username', 'pin_hash', 'song_id', 'stream_count',
+                 'proof_image', 'stored', 'process_image')
+
+    def __init__(self, username, pin, song_id, stream_count, proof_image, stored, process_image):
+        self.ticket_id = uuid.uuid4()
+        self.username = username
+        self.pin_hash = User.hash_pin(pin)
+        self.song_id = song_id
+        self.stream_count = stream_count
+        self.proof_image = proof_image
+        self.stored = stored
+        self.process_image = process_image
+
+
+class IngestQueue:
+    """Group-commit writer for verification submissions.
+
+    In 'queued' mode POST /api/verifications only validates and enqueues;
+    a background thread drains the queue every INGEST_BATCH_INTERVAL_MS and
+    writes up to INGEST_BATCH_SIZE submissions in one transaction. Song and
+    site counter deltas are deferred inside that transaction and applied
+    once per song by apply_count_deltas(), so hot `songs` rows are locked
+    once per batch instead of once per submission. Each submission gets a
+    ticket whose result is stored in ingest_tickets by the same commit.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self._app = None
+        self._queue = None
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self.on_commit = None
+        self.on_rejected = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, on_commit=None, on_rejected=None):
+        """on_commit(batch, results) runs after each committed batch;
+        on_rejected(submission) runs for each submission that failed, including
+        every submission of a batch that could not be written"""
+        self._app = app
+        self.enabled = app.config['INGEST_MODE'] == 'queued'
+        self.batch_size = app.config['INGEST_BATCH_SIZE']
+        self.batch_interval = app.config['INGEST_BATCH_INTERVAL_MS'] / 1000
+        self._queue = queue.Queue(maxsize=app.config['INGEST_QUEUE_SIZE'])
+        self.on_commit = on_commit
+        self.on_rejected = on_rejected
+
+    def submit(self, submission):
+        """Enqueue a submission; raises queue.Full when the writer is saturated"""
+        self._ensure_writer()
+        self._queue.put_nowait(submission)
+        return submission.ticket_id
+
+    def _ensure_writer(self):
+        # Started lazily so a preforking server starts one writer per worker
+        if self._thread is None or not self._thread.is_alive():
+            with self._thread_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='ingest-writer', daemon=True)
+                    self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            with self._app.app_context():
+                try:
+                    self.write_batch(batch)
+                except Exception:
+                    self._app.logger.exception('Ingest batch of %d failed', len(batch))
+                    db.session.rollback()
+                    # resolve_user may have cached users created earlier in this batch
+                    user_cache.invalidate()
+                    self._fail_batch(batch)
+                finally:
+                    db.session.remove()
+
+    def write_batch(self, batch):
+        """Write a batch in one transaction; returns {ticket_id: (status, row, message)}"""
+        results = {}
+        db.session.execute(db.text("SET LOCAL app.defer_counts = 'on'"))
+        for submission in batch:
+            # A savepoint per submission keeps one bad row from aborting the batch
+            savepoint = db.session.begin_nested()
+            try:
+                user_id, pin_hash = resolve_user(submission.username, submission.pin_hash)
+                if pin_hash != submission.pin_hash:
+                    savepoint.rollback()
+                    results[submission.ticket_id] = (401, None, '이 닉네임의 PIN이 일치하지 않습니다')
+                    continue
+                row = upsert_verification(user_id, submission.song_id,
+                                          submission.stream_count, submission.proof_image)
+                savepoint.commit()
+                message = '스트리밍 인증이 성공적으로 제출되었습니다!' if row.created \
+                    else '스트리밍 인증이 업데이트되었습니다!'
+                results[submission.ticket_id] = (200, row, message)
+            except SongNotFound:
+                savepoint.rollback()
+                results[submission.ticket_id] = (404, None, '해당 곡을 찾을 수 없습니다')
+            except DBAPIError as e:
+                # A lost connection fails the whole batch; any other statement
+                # error (a value out of range, a constraint) fails only this row
+                if e.connection_invalidated:
+                    raise
+                savepoint.rollback()
+                self._app.logger.exception('Ingest submission %s failed', submission.ticket_id)
+                results[submission.ticket_id] = (500, None, '서버 오류가 발생했습니다')
+
+        db.session.execute(db.text('SELECT apply_count_deltas()'))
+        db.session.add_all([IngestTicket(
+            id=ticket_id,
+            status='done' if http_status == 200 else 'failed',
+            verification_id=row.id if row is not None else None,
+            http_status=http_status,
+            message=message
+        ) for ticket_id, (http_status, row, message) in results.items()])
+        db.session.commit()
+
+        if self.on_commit is not None:
+            self.on_commit(batch, results)
+        if self.on_rejected is not None:
+            for submission in batch:
+                if results[submission.ticket_id][0] != 200:
+                    self.on_rejected(submission)
+        return results
+
+    def _fail_batch(self, batch):
+        try:
+            db.session.add_all([IngestTicket(
+                id=submission.ticket_id,
+                status='failed',
+                http_status=500,
+                message='서버 오류가 발생했습니다'
+            ) for submission in batch])
+            db.session.commit()
+        except Exception:
+            self._app.logger.exception('Could not record failed ingest tickets')
+            db.session.rollback()
+        if self.on_rejected is not None:
+            for submission in batch:
+                try:
+                    self.on_rejected(submission)
+                except Exception:
+                    self._app.logger.exception('Could not release proof for ingest ticket %s',
+                                               submission.ticket_id)
+                    db.session.rollback()
+
+
+ingest_queue = IngestQueue()
@@ -0,0 +1,659 @@
+import threading
+from bisect import bisect_left, insort
+from datetime import timedelta
+
+from models import db, User, Song, Verification, VerificationEvent, DailyStream, KST, kst_now
+from replicas import read_router
+from green import run_native
+from live import notify_reload
+
+
+def _naive_kst(value):
+    """Normalize a datetime to naive KST so DB and in-process values compare"""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(KST).replace(tzinfo=None)
+    return value
+
+
+def _sort_ts(value):
+    return value.timestamp() if value is not None else float('-inf')
+
+
+class _Row:
+    """Approved verification as tracked by the index"""
+    __slots__ = ('id', 'user_id', 'song_id', 'stream_count', 'verified_at', 'created_at', 'key')
+
+    def __init__(self, verification_id, user_id, song_id, stream_count, verified_at, created_at):
+        self.id = verification_id
+        self.user_id = user_id
+        self.song_id = song_id
+        self.stream_count = stream_count
+        self.verified_at = _naive_kst(verified_at)
+        self.created_at = _naive_kst(created_at)
+        # Same ordering as the SQL leaderboard: stream_count DESC, created_at ASC
+        self.key = (-stream_count, _sort_ts(self.created_at), verification_id)
+
+
+class _Total:
+    """Per-user aggregate over approved verifications (All Songs board);
+    stream_count defaults to the sum of the rows' counts"""
+    __slots__ = ('user_id', 'stream_count', 'verified_at', 'created_at', 'key')
+
+    def __init__(self, user_id, rows, stream_count=None):
+        self.user_id = user_id
+        self.stream_count = sum(row.stream_count for row in rows) if stream_count is None else stream_count
+        self.verified_at = max((row.verified_at for row in rows if row.verified_at), default=None)
+        self.created_at = max((row.created_at for row in rows if row.created_at), default=None)
+        # total_stream_count DESC, latest_created_at DESC
+        self.key = (-self.stream_count, -_sort_ts(self.created_at), user_id)
+
+
+# Number of daily buckets covered by each time filter, today included
+TIME_FILTER_DAYS = {'today': 1, 'week': 7, 'month': 30}
+# Buckets the index keeps: those of the longest window
+WINDOW_DAYS = max(TIME_FILTER_DAYS.values())
+
+
+class _Window:
+    """Boards for one rolling time filter: streams summed from the daily
+    buckets from first_day through the index's today, per (user, song) pair"""
+    __slots__ = ('days', 'first_day', 'keys', 'song_keys', 'user_songs', 'totals', 'overall_keys')
+
+    def __init__(self, days):
+        self.days = days
+        self.first_day = None
+        self.keys = {}           # (user_id, song_id) -> key, pairs with streams in the window
+        self.song_keys = {}      # song_id -> sorted keys
+        self.user_songs = {}     # user_id -> {song_id} with streams in the window
+        self.totals = {}         # user_id -> _Total over the window's streams
+        self.overall_keys = []   # sorted [_Total.key]
+
+
+def _window_key(streams, row):
+    # Same ordering as _Row.key with the window's streams in place of stream_count
+    return (-streams, row.key[1], row.id)
+
+
+def _read_buckets(pairs=None):
+    """daily_streams rows the windows cover, of `pairs` or of everyone"""
+    query = db.session.query(DailyStream.user_id, DailyStream.song_id, DailyStream.day, DailyStream.streams) \
+        .filter(DailyStream.day >= kst_now().date() - timedelta(days=WINDOW_DAYS - 1))
+    if pairs is not None:
+        query = query.filter(db.tuple_(DailyStream.user_id, DailyStream.song_id).in_(sorted(pairs)))
+    return query.all()
+
+
+def _db_clock():
+    """Database clock_timestamp(); orders index updates against write stamps"""
+    return db.session.query(db.func.clock_timestamp()).scalar()
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+class LeaderboardIndex:
+    """In-process rank index for the all-time and today/week/month leaderboards.
+
+    Keeps one sorted key list per song plus one for the All Songs aggregate,
+    so reads are a slice instead of a join/group-by over verifications. The
+    rolling windows are kept the same way from the last WINDOW_DAYS of
+    daily_streams buckets, and end on the day of the last load(); once the
+    KST day changes windows_stale() is true until the next load.
+    Seeded once with load() and kept current by apply() from the write paths.
+    Writes made by other worker processes (or psql) arrive as the changed
+    verification ids of a NOTIFY, and reload_rows() re-reads just those rows;
+    load() runs again only when the ids are unknown. `generation` is the
+    shared cache generation the index is known to reflect.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.generation = None
+        self._reset()
+
+    def _reset(self):
+        self._rows = {}          # verification_id -> _Row
+        self._song_keys = {}     # song_id -> sorted [_Row.key]
+        self._user_rows = {}     # user_id -> {verification_id: _Row}
+        self._totals = {}        # user_id -> _Total
+        self._overall_keys = []  # sorted [_Total.key]
+        self._usernames = {}     # user_id -> username
+        self._user_ids = {}      # username -> user_id
+        self._song_titles = {}   # song_id -> title
+        self._written_at = {}    # verification_id -> newest applied write stamp
+        self._floor = None       # stamp taken after the last load(); older writes are in it
+        self._buckets = {}       # (user_id, song_id) -> {day: streams} for the last WINDOW_DAYS
+        self._buckets_read_at = {}  # (user_id, song_id) -> stamp of the newest applied read
+        self._windows = {name: _Window(days) for name, days in TIME_FILTER_DAYS.items()}
+        self._today = None       # day the windows end on
+        self._song_streams = {}  # song_id -> approved stream total (songs.total_stream_count)
+
+    def load(self, generation=None):
+        """Rebuild the index from the database (two queries, always on the primary)"""
+        today = kst_now().date()
+        with read_router.primary():
+            results = db.session.query(
+                Verification.id,
+                Verification.user_id,
+                Verification.song_id,
+                Verification.stream_count,
+                Verification.verified_at,
+                Verification.created_at,
+                User.username,
+                Song.title
+            ).join(User, Verification.user_id == User.id) \
+             .join(Song, Verification.song_id == Song.id) \
+             .filter(Verification.status == 'approved') \
+             .all()
+            buckets = _read_buckets()
+            floor = _db_clock()
+
+        # Built outside the lock (and off the hub under gevent) so reads go on
+        # meanwhile; a write applied during the build is lost here but re-read
+        # from its notification
+        fresh = LeaderboardIndex()
+        run_native(fresh._build, results, buckets, floor, today)
+        with self._lock:
+            self.__dict__.update({name: value for name, value in vars(fresh).items() if name != '_lock'})
+            self.generation = generation
+            self.loaded = True
+
+    def _build(self, results, buckets, floor, today):
+        self._floor = floor
+        for result in results:
+            self._usernames[result.user_id] = result.username
+            self._user_ids[result.username] = result.user_id
+            self._song_titles[result.song_id] = result.title
+            row = _Row(result.id, result.user_id, result.song_id, result.stream_count,
+                       result.verified_at, result.created_at)
+            self._rows[row.id] = row
+            self._song_keys.setdefault(row.song_id, []).append(row.key)
+            self._user_rows.setdefault(row.user_id, {})[row.id] = row
+            self._song_streams[row.song_id] = self._song_streams.get(row.song_id, 0) + row.stream_count
+        for keys in self._song_keys.values():
+            keys.sort()
+        for user_id, rows in self._user_rows.items():
+            self._totals[user_id] = _Total(user_id, rows.values())
+        self._overall_keys = sorted(total.key for total in self._totals.values())
+        for bucket in buckets:
+            self._buckets.setdefault((bucket.user_id, bucket.song_id), {})[bucket.day] = bucket.streams
+        self._build_windows(today)
+
+    def sync(self, generation):
+        """Load the index if it never was; returns whether it reflects `generation`.
+
+        Never reloads a loaded index: other workers' writes are applied by
+        reload_rows(), and settle() moves the generation once they are.
+        """
+        if not self.loaded:
+            self.load(generation)
+            return True
+        return self.generation == generation
+
+    def windows_stale(self):
+        """Whether the KST day has moved past the day the windows end on"""
+        return self.loaded and kst_now().date() > self._today
+
+    def settle(self, generation):
+        """Record that every write up to `generation` has been applied"""
+        with self._lock:
+            if self.generation is None or generation > self.generation:
+                self.generation = generation
+
+    def reload_rows(self, verification_ids):
+        """Re-read changed verifications from the primary and apply them.
+
+        Rows that are gone or no longer approved leave the index. The rows are
+        stamped with a database time taken after they were read, so an own
+        apply() of an older write does not undo them; a write that committed
+        after the read sends its own NOTIFY and is re-read in turn.
+        """
+        with read_router.primary():
+            results = db.session.query(
+                Verification.id,
+                Verification.user_id,
+                Verification.song_id,
+                Verification.stream_count,
+                Verification.status,
+                Verification.verified_at,
+                Verification.created_at,
+                User.username,
+                Song.title
+            ).join(User, Verification.user_id == User.id) \
+             .join(Song, Verification.song_id == Song.id) \
+             .filter(Verification.id.in_(sorted(verification_ids))) \
+             .all()
+            pairs = {(result.user_id, result.song_id) for result in results}
+            buckets = _read_buckets(pairs) if pairs else []
+            read_at = _db_clock()
+
+        with self._lock:
+            missing = set(verification_ids)
+            for result in results:
+                missing.discard(result.id)
+                row = _Row(result.id, result.user_id, result.song_id, result.stream_count,
+                           result.verified_at, result.created_at)
+                self._apply(row, result.status == 'approved', result.username, result.title, read_at)
+            for verification_id in missing:
+                self._apply_removal(verification_id, read_at)
+            self._apply_buckets(pairs, buckets, read_at)
+
+    def reload_buckets(self, pairs):
+        """Re-read the daily buckets of (user_id, song_id) pairs this process wrote,
+        so its windowed boards show the write before the next live round"""
+        with read_router.primary():
+            buckets = _read_buckets(pairs)
+            read_at = _db_clock()
+        with self._lock:
+            self._apply_buckets(pairs, buckets, read_at)
+
+    def advance(self, generation):
+        """Record that this process's own write produced `generation`"""
+        with self._lock:
+            if self.generation is not None and self.generation == generation - 1:
+                self.generation = generation
+
+    def apply(self, verification, username, song_title, written_at=None):
+        """Reflect a created or moderated verification in the index.
+
+        `written_at` is a database timestamp taken under the row lock; when two
+        requests update the same row, the one that committed last wins even if
+        its apply() runs first, and a write older than the last load() or
+        reload_rows() of the row is skipped.
+        """
+        # Read attributes before taking the lock; they may refresh from the DB
+        row = _Row(verification.id, verification.user_id, verification.song_id,
+                   verification.stream_count, verification.verified_at,
+                   verification.created_at)
+        approved = verification.status == 'approved'
+        with self._lock:
+            self._apply(row, approved, username, song_title, written_at)
+
+    def _newer(self, stamps, key, written_at):
+        """Whether a write stamped `written_at` is newer than what the index holds
+        for `key`, recording it in `stamps` if so; call with the lock held"""
+        if not self.loaded:
+            # Not seeded yet; the first read will load the current state
+            return False
+        if written_at is not None:
+            latest = stamps.get(key, self._floor)
+            if latest is not None and written_at <= latest:
+                return False
+            stamps[key] = written_at
+        return True
+
+    def _apply_removal(self, verification_id, written_at):
+        if self._newer(self._written_at, verification_id, written_at):
+            row = self._rows.get(verification_id)
+            self._discard(verification_id)
+            if row is not None:
+                self._update_pair(row.user_id, row.song_id)
+
+    def _apply_buckets(self, pairs, buckets, read_at):
+        days = {}
+        for bucket in buckets:
+            days.setdefault((bucket.user_id, bucket.song_id), {})[bucket.day] = bucket.streams
+        for pair in pairs:
+            if not self._newer(self._buckets_read_at, pair, read_at):
+                continue
+            self._buckets.pop(pair, None)
+            if pair in days:
+                self._buckets[pair] = days[pair]
+            self._update_pair(*pair)
+
+    def _apply(self, row, approved, username, song_title, written_at):
+        if not self._newer(self._written_at, row.id, written_at):
+            return
+        self._usernames[row.user_id] = username
+        self._user_ids[username] = row.user_id
+        self._song_titles[row.song_id] = song_title
+        self._discard(row.id)
+        if approved:
+            self._rows[row.id] = row
+            insort(self._song_keys.setdefault(row.song_id, []), row.key)
+            self._user_rows.setdefault(row.user_id, {})[row.id] = row
+            self._song_streams[row.song_id] = self._song_streams.get(row.song_id, 0) + row.stream_count
+            self._update_total(row.user_id)
+        self._update_pair(row.user_id, row.song_id, row_changed=True)
+
+    def _discard(self, verification_id):
+        row = self._rows.pop(verification_id, None)
+        if row is None:
+            return
+        keys = self._song_keys[row.song_id]
+        del keys[bisect_left(keys, row.key)]
+        self._song_streams[row.song_id] -= row.stream_count
+        user_rows = self._user_rows[row.user_id]
+        del user_rows[row.id]
+        if not user_rows:
+            del self._user_rows[row.user_id]
+        self._update_total(row.user_id)
+
+    def _update_total(self, user_id):
+        total = self._totals.pop(user_id, None)
+        if total is not None:
+            del self._overall_keys[bisect_left(self._overall_keys, total.key)]
+        rows = self._user_rows.get(user_id)
+        if rows:
+            total = _Total(user_id, rows.values())
+            self._totals[user_id] = total
+            insort(self._overall_keys, total.key)
+
+    def _pair_row(self, user_id, song_id):
+        rows = self._user_rows.get(user_id, {})
+        return next((row for row in rows.values() if row.song_id == song_id), None)
+
+    def _window_streams(self, window, pair):
+        days = self._buckets.get(pair, {})
+        return sum(streams for day, streams in days.items() if window.first_day <= day <= self._today)
+
+    def _update_pair(self, user_id, song_id, row_changed=False):
+        """Re-rank a (user, song) pair on every window after its buckets changed;
+        row_changed also refreshes the user's totals (latest verified_at)"""
+        pair = (user_id, song_id)
+        row = self._pair_row(user_id, song_id)
+        for window in self._windows.values():
+            old = window.keys.get(pair)
+            streams = self._window_streams(window, pair) if row is not None else 0
+            key = _window_key(streams, row) if streams > 0 else None
+            if key != old:
+                self._move_pair(window, pair, old, key)
+            elif key is None or not row_changed:
+                continue
+            self._update_window_total(window, user_id)
+
+    def _move_pair(self, window, pair, old, key):
+        user_id, song_id = pair
+        if old is not None:
+            keys = window.song_keys[song_id]
+            del keys[bisect_left(keys, old)]
+        if key is not None:
+            window.keys[pair] = key
+            insort(window.song_keys.setdefault(song_id, []), key)
+            window.user_songs.setdefault(user_id, set()).add(song_id)
+        else:
+            del window.keys[pair]
+            songs = window.user_songs[user_id]
+            songs.discard(song_id)
+            if not songs:
+                del window.user_songs[user_id]
+
+    def _update_window_total(self, window, user_id):
+        total = window.totals.pop(user_id, None)
+        if total is not None:
+            del window.overall_keys[bisect_left(window.overall_keys, total.key)]
+        if user_id in window.user_songs:
+            total = window.totals[user_id] = self._window_total(window, user_id)
+            insort(window.overall_keys, total.key)
+
+    def _window_total(self, window, user_id):
+        keys = [window.keys[(user_id, song_id)] for song_id in window.user_songs[user_id]]
+        return _Total(user_id, [self._rows[key[2]] for key in keys], -sum(key[0] for key in keys))
+
+    def _build_windows(self, today):
+        """Rank every window from scratch to end on `today`"""
+        rows = {(row.user_id, row.song_id): row for row in self._rows.values()}
+        self._today = today
+        windows = self._windows.values()
+        for window in windows:
+            window.first_day = today - timedelta(days=window.days - 1)
+            window.keys, window.song_keys, window.user_songs = {}, {}, {}
+        for pair, days in self._buckets.items():
+            row = rows.get(pair)
+            if row is None:
+                continue
+            for window in windows:
+                streams = sum(count for day, count in days.items() if window.first_day <= day <= today)
+                if streams > 0:
+                    key = window.keys[pair] = _window_key(streams, row)
+                    window.song_keys.setdefault(pair[1], []).append(key)
+                    window.user_songs.setdefault(pair[0], set()).add(pair[1])
+        for window in windows:
+            for keys in window.song_keys.values():
+                keys.sort()
+            window.totals = {user_id: self._window_total(window, user_id) for user_id in window.user_songs}
+            window.overall_keys = sorted(total.key for total in window.totals.values())
+
+    def _window(self, time_filter):
+        """The _Window for a rolling time filter, None for all time"""
+        return self._windows.get(time_filter)
+
+    def _song_entries(self, song_id, start, stop, window=None):
+        keys = (window.song_keys if window else self._song_keys).get(song_id, ())
+        title = self._song_titles.get(song_id)
+        entries = []
+        for rank, key in enumerate(keys[start:stop], start=start + 1):
+            row = self._rows[key[2]]
+            entries.append({
+                'id': row.id,
+                'rank': rank,
+                'username': self._usernames.get(row.user_id),
+                'songTitle': title,
+                'songId': song_id,
+                'streamCount': -key[0],
+                'verifiedAt': _isoformat(row.verified_at),
+                'createdAt': _isoformat(row.created_at)
+            })
+        return entries
+
+    def _overall_entries(self, start, stop, window=None):
+        keys, totals = (window.overall_keys, window.totals) if window else (self._overall_keys, self._totals)
+        entries = []
+        for rank, key in enumerate(keys[start:stop], start=start + 1):
+            total = totals[key[2]]
+            entries.append({
+                'id': total.user_id,
+                'rank': rank,
+                'username': self._usernames.get(total.user_id),
+                'songTitle': 'All Songs',
+                'songId': None,
+                'streamCount': total.stream_count,
+                'verifiedAt': _isoformat(total.verified_at),
+                'createdAt': _isoformat(total.created_at)
+            })
+        return entries
+
+    def song_totals(self):
+        """{song_id: approved stream total}; songs without approved streams are absent"""
+        with self._lock:
+            return dict(self._song_streams)
+
+    def song_page(self, song_id, offset=0, limit=None, time_filter=None):
+        """Ranked entries for a single song, returns (entries, total).
+
+        time_filter 'today', 'week' or 'month' ranks by the streams gained in
+        that window; anything else is all time (likewise below).
+        """
+        with self._lock:
+            window = self._window(time_filter)
+            stop = offset + limit if limit is not None else None
+            keys = (window.song_keys if window else self._song_keys).get(song_id, ())
+            return self._song_entries(song_id, offset, stop, window), len(keys)
+
+    def overall_page(self, offset=0, limit=None, time_filter=None):
+        """Ranked entries aggregated by user across all songs, returns (entries, total)"""
+        with self._lock:
+            window = self._window(time_filter)
+            stop = offset + limit if limit is not None else None
+            keys = window.overall_keys if window else self._overall_keys
+            return self._overall_entries(offset, stop, window), len(keys)
+
+    def user_id(self, username):
+        with self._lock:
+            return self._user_ids.get(username)
+
+    def positions(self, song_id=None, limit=None):
+        """[(user_id, username, rank, stream_count)] of a board's top `limit`;
+        song_id None is the All Songs board"""
+        with self._lock:
+            if song_id is None:
+                return [(key[2], self._usernames.get(key[2]), rank, self._totals[key[2]].stream_count)
+                        for rank, key in enumerate(self._overall_keys[:limit], start=1)]
+            rows = (self._rows[key[2]] for key in self._song_keys.get(song_id, ())[:limit])
+            return [(row.user_id, self._usernames.get(row.user_id), rank, row.stream_count)
+                    for rank, row in enumerate(rows, start=1)]
+
+    def song_rank(self, song_id, username, around=0, time_filter=None):
+        """Rank of a user on a song board and the entries around it, or None"""
+        with self._lock:
+            window = self._window(time_filter)
+            user_id = self._user_ids.get(username)
+            if window is None:
+                row = self._pair_row(user_id, song_id)
+                key, keys = row and row.key, self._song_keys.get(song_id)
+            else:
+                key, keys = window.keys.get((user_id, song_id)), window.song_keys.get(song_id)
+            if key is None:
+                return None
+            position = bisect_left(keys, key)
+            entries = self._song_entries(song_id, max(position - around, 0), position + around + 1, window)
+            return position + 1, entries, len(keys)
+
+    def overall_rank(self, username, around=0, time_filter=None):
+        """Rank of a user on the All Songs board and the entries around it, or None"""
+        with self._lock:
+            window = self._window(time_filter)
+            keys, totals = (window.overall_keys, window.totals) if window else (self._overall_keys, self._totals)
+            total = totals.get(self._user_ids.get(username))
+            if total is None:
+                return None
+            position = bisect_left(keys, total.key)
+            entries = self._overall_entries(max(position - around, 0), position + around + 1, window)
+            return position + 1, entries, len(keys)
+
+
+def _ranked_query(window, song_id):
+    """Date-range board: stream deltas from first_day to last_day summed from
+    daily_streams, ranked by ROW_NUMBER()"""
+    first_day, last_day = window
+    streams = db.session.query(
+        DailyStream.user_id.label('user_id'),
+        DailyStream.song_id.label('song_id'),
+        db.cast(db.func.sum(DailyStream.streams), db.BigInteger).label('streams')
+    )
+    if first_day:
+        streams = streams.filter(DailyStream.day >= first_day)
+    if last_day:
+        streams = streams.filter(DailyStream.day <= last_day)
+    if song_id:
+        streams = streams.filter(DailyStream.song_id == song_id)
+    streams = streams.group_by(DailyStream.user_id, DailyStream.song_id) \
+        .having(db.func.sum(DailyStream.streams) > 0) \
+        .subquery('streams')
+
+    if song_id:
+        # Specific song selected - one verification per user
+        rank = db.func.row_number().over(order_by=(
+            streams.c.streams.desc(),
+            Verification.created_at.asc(),
+            Verification.id.asc()
+        ))
+        return db.session.query(
+            Verification.id.label('id'),
+            User.username.label('username'),
+            Song.title.label('song_title'),
+            Song.id.label('song_id'),
+            streams.c.streams.label('stream_count'),
+            Verification.verified_at.label('verified_at'),
+            Verification.created_at.label('created_at'),
+            rank.label('rank'),
+            db.func.count().over().label('total')
+        ).join(Verification, db.and_(Verification.user_id == streams.c.user_id,
+                                     Verification.song_id == streams.c.song_id)) \
+         .join(User, Verification.user_id == User.id) \
+         .join(Song, Verification.song_id == Song.id)
+
+    # All Songs - aggregate by user
+    total_stream_count = db.cast(db.func.sum(streams.c.streams), db.BigInteger)
+    latest_created_at = db.func.max(Verification.created_at)
+    rank = db.func.row_number().over(order_by=(
+        total_stream_count.desc(),
+        latest_created_at.desc(),
+        User.id.asc()
+    ))
+    return db.session.query(
+        User.id.label('id'),
+        User.username.label('username'),
+        db.null().label('song_title'),
+        db.null().label('song_id'),
+        total_stream_count.label('stream_count'),
+        db.func.max(Verification.verified_at).label('verified_at'),
+        latest_created_at.label('created_at'),
+        rank.label('rank'),
+        db.func.count().over().label('total')
+    ).join(Verification, db.and_(Verification.user_id == streams.c.user_id,
+                                 Verification.song_id == streams.c.song_id)) \
+     .join(User, Verification.user_id == User.id) \
+     .group_by(User.id, User.username)
+
+
+def _serialize(result):
+    return {
+        'id': result.id,
+        'rank': result.rank,
+        'username': result.username,
+        'songTitle': result.song_title if result.song_id else 'All Songs',
+        'songId': result.song_id,
+        'streamCount': result.stream_count,
+        'verifiedAt': _isoformat(result.verified_at),
+        'createdAt': _isoformat(result.created_at)
+    }
+
+
+def query_page(window, song_id, offset=0, limit=None):
+    """Date-range leaderboard page from the database, returns (entries, total)"""
+    ranked = _ranked_query(window, song_id).subquery('ranked')
+    query = db.session.query(ranked).filter(ranked.c.rank > offset).order_by(ranked.c.rank)
+    if limit is not None:
+        query = query.limit(limit)
+    results = query.all()
+    if results:
+        return [_serialize(result) for result in results], results[0].total
+    total = db.session.query(db.func.count()).select_from(ranked).scalar()
+    return [], total
+
+
+def query_rank(window, song_id, username, around=0):
+    """Rank of a user on a date-range board and the entries around it, or None"""
+    ranked = _ranked_query(window, song_id).cte('ranked')
+    user_rank = db.select(ranked.c.rank).where(ranked.c.username == username).scalar_subquery()
+    results = db.session.query(ranked) \
+        .filter(ranked.c.rank.between(user_rank - around, user_rank + around)) \
+        .order_by(ranked.c.rank) \
+        .all()
+    match = next((result for result in results if result.username == username), None)
+    if match is None:
+        return None
+    return match.rank, [_serialize(result) for result in results], match.total
+
+
+def backfill_daily_streams(since=None):
+    """Rebuild daily_streams from verification_events in one transaction.
+
+    Days before `since` (default: the oldest attached event) are kept, so
+    rollups for detached partitions survive a rebuild.
+    """
+    if since is None:
+        since = db.session.query(db.func.min(VerificationEvent.occurred_at)).scalar()
+        if since is None:
+            return 0
+        since = since.date()
+    db.session.execute(db.text('DELETE FROM daily_streams WHERE day >= :since'), {'since': since})
+    db.session.execute(db.text("""
+        INSERT INTO daily_streams (day, user_id, song_id, streams)
+        SELECT DATE(e.occurred_at), e.user_id, e.song_id, SUM(e.stream_delta)
+        FROM verification_events e
+        JOIN users u ON u.id = e.user_id
+        JOIN songs s ON s.id = e.song_id
+        WHERE e.occurred_at >= :since AND e.stream_delta <> 0
+        GROUP BY DATE(e.occurred_at), e.user_id, e.song_id
+    """), {'since': since})
+    notify_reload()
+    db.session.commit()
+    return db.session.query(db.func.count()).select_from(DailyStream) \
+        .filter(DailyStream.day >= since).scalar()
+
+
+leaderboard_index = LeaderboardIndex()
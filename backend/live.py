@@ -0,0 +1,254 @@
+import queue
+import threading
+import time
+
+import psycopg
+
+from models import db
+from serializers import dumps
+
+# Postgres channel notified by a statement-level trigger on verifications
+CHANNEL = 'leaderboard_changes'
+
+
+def notify_reload():
+    """Make every listener reload the index when the current transaction commits;
+    for writes to verifications or daily_streams that the triggers don't report"""
+    db.session.execute(db.text('SELECT pg_notify(:channel, :payload)'), {'channel': CHANNEL, 'payload': ''})
+
+
+def format_event(event, data):
+    """One Server-Sent Events message"""
+    return f'event: {event}\ndata: {dumps(data).decode("utf-8")}\n\n'
+
+
+class Subscription:
+    __slots__ = ('key', 'events', 'closed', 'registered')
+
+    def __init__(self, key, size):
+        self.key = key
+        self.events = queue.Queue(maxsize=size)
+        self.closed = False
+        self.registered = True
+
+
+class _Board:
+    """Last published state of one (song, window, limit) board"""
+    __slots__ = ('entries', 'total', 'subscribers')
+
+    def __init__(self, entries, total):
+        self.entries = {entry['id']: entry for entry in entries}
+        self.total = total
+        self.subscribers = set()
+
+    def diff(self, entries, total):
+        """Compact change set against the previous state; None if nothing changed"""
+        current = {entry['id']: entry for entry in entries}
+        changed = [entry for entry in entries if self.entries.get(entry['id']) != entry]
+        removed = [entry_id for entry_id in self.entries if entry_id not in current]
+        self.entries = current
+        if not changed and not removed and total == self.total:
+            return None
+        self.total = total
+        return {'changed': changed, 'removed': removed, 'total': total}
+
+
+class LiveBroker:
+    """Fans leaderboard and stats changes out to SSE subscribers.
+
+    Every process LISTENs on one Postgres channel that a trigger on
+    verifications notifies with the changed ids, so writes from any worker
+    (or psql) reach every subscriber. Notifications are coalesced for
+    LIVE_COALESCE_MS, then each distinct board is recomputed once and only
+    the entries that changed are queued to its subscribers. Subscribers wait
+    on their queue, which is a greenlet rather than a thread under a gevent
+    worker. At most LIVE_MAX_STREAMS subscriptions are open per process.
+
+    `compute(key, fresh)` returns (entries, total) for a board key, `stats()`
+    the site stats, and `refresh(changed, token)` runs once before each
+    fan-out round with the verification ids notified since the last round
+    (None when they are unknown: a bulk write or a listener reconnect) and
+    returns the token passed to the next; all run in an app context.
+    """
+
+    def __init__(self, app=None):
+        self._app = None
+        self._boards = {}
+        self._stats = None
+        self._stats_subscribers = set()
+        self._open = 0
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._changed = set()
+        self._started = False
+        self._refresh_token = None
+        self.compute = None
+        self.stats = None
+        self.refresh = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, compute=None, stats=None, refresh=None):
+        self._app = app
+        self.heartbeat = app.config['LIVE_HEARTBEAT_SECONDS']
+        self.coalesce = app.config['LIVE_COALESCE_MS'] / 1000
+        self.queue_size = app.config['LIVE_QUEUE_SIZE']
+        self.max_streams = app.config['LIVE_MAX_STREAMS']
+        self.compute = compute
+        self.stats = stats
+        self.refresh = refresh
+        app.before_request(self.start)
+
+    def start(self):
+        # Started on first request so CLI commands don't LISTEN; every serving
+        # worker needs the listener to apply other workers' writes
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._listen, name='live-listen', daemon=True).start()
+        threading.Thread(target=self._fan_out, name='live-fan-out', daemon=True).start()
+
+    def subscribe(self, key):
+        """Register a subscriber; returns (subscription, snapshot events).
+
+        key None subscribes to stats only. Raises queue.Full when
+        LIVE_MAX_STREAMS subscriptions are open. Must run in an app context.
+        """
+        subscription = Subscription(key, self.queue_size)
+        with self._lock:
+            if self._open >= self.max_streams:
+                raise queue.Full()
+            self._open += 1
+        try:
+            stats = self.stats()
+            events = [format_event('stats', stats)]
+            if key is not None:
+                entries, total = self.compute(key, fresh=False)
+                events.insert(0, format_event('snapshot', {'entries': entries, 'total': total}))
+        except BaseException:
+            self.unsubscribe(subscription)
+            raise
+        with self._lock:
+            if self._stats is None:
+                self._stats = stats
+            self._stats_subscribers.add(subscription)
+            if key is not None:
+                board = self._boards.get(key)
+                if board is None:
+                    board = self._boards[key] = _Board(entries, total)
+                board.subscribers.add(subscription)
+        return subscription, events
+
+    def unsubscribe(self, subscription):
+        """Drop a subscriber; safe to call more than once"""
+        subscription.closed = True
+        with self._lock:
+            if not subscription.registered:
+                return
+            subscription.registered = False
+            self._open -= 1
+            self._stats_subscribers.discard(subscription)
+            board = self._boards.get(subscription.key)
+            if board is not None:
+                board.subscribers.discard(subscription)
+                if not board.subscribers:
+                    del self._boards[subscription.key]
+
+    def publish(self):
+        """Mark boards stale; the fan-out thread recomputes them shortly"""
+        self._dirty.set()
+
+    def _notified(self, payload):
+        with self._lock:
+            if not payload:
+                self._changed = None
+            elif self._changed is not None:
+                self._changed.update(int(verification_id) for verification_id in payload.split(','))
+        self._dirty.set()
+
+    def events(self, subscription):
+        """Yield queued events for one subscriber, with heartbeat comments"""
+        while not subscription.closed:
+            try:
+                yield subscription.events.get(timeout=self.heartbeat)
+            except queue.Empty:
+                yield ': ping\n\n'
+
+    def _send(self, subscribers, event):
+        for subscription in subscribers:
+            try:
+                subscription.events.put_nowait(event)
+            except queue.Full:
+                # Too slow to keep up; closing makes the client reconnect for a fresh snapshot
+                subscription.closed = True
+
+    def _fan_out(self):
+        while True:
+            self._dirty.wait()
+            time.sleep(self.coalesce)
+            self._dirty.clear()
+            with self._app.app_context():
+                try:
+                    self._publish_changes()
+                except Exception:
+                    self._app.logger.exception('Failed to publish live updates')
+                finally:
+                    db.session.remove()
+
+    def _publish_changes(self):
+        with self._lock:
+            notified, self._changed = self._changed, set()
+        if self.refresh is not None:
+            try:
+                self._refresh_token = self.refresh(notified, self._refresh_token)
+            except Exception:
+                # The ids are lost; make the next round start over
+                with self._lock:
+                    self._changed = None
+                raise
+        with self._lock:
+            boards = list(self._boards.items())
+        for key, board in boards:
+            entries, total = self.compute(key, fresh=True)
+            with self._lock:
+                changes = board.diff(entries, total)
+                subscribers = list(board.subscribers)
+            if changes is not None:
+                self._send(subscribers, format_event('diff', changes))
+
+        with self._lock:
+            if not self._stats_subscribers:
+                self._stats = None
+                return
+        stats = self.stats()
+        with self._lock:
+            changed = stats != self._stats
+            self._stats = stats
+            subscribers = list(self._stats_subscribers)
+        if changed:
+            self._send(subscribers, format_event('stats', stats))
+
+    def _listen(self):
+        with self._app.app_context():
+            # Same connection parameters (timezone options included) as the pool
+            args, kwargs = db.engine.dialect.create_connect_args(db.engine.url)
+        delay = 1
+        while True:
+            try:
+                with psycopg.connect(*args, autocommit=True, **kwargs) as connection:
+                    connection.execute(f'LISTEN {CHANNEL}')
+                    delay = 1
+                    # Anything missed while (re)connecting is unknown
+                    self._notified('')
+                    for notify in connection.notifies():
+                        self._notified(notify.payload)
+            except Exception:
+                self._app.logger.exception('Live update listener disconnected')
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+
+
+live_broker = LiveBroker()
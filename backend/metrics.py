@@ -0,0 +1,167 @@
+import os
+import time
+
+from flask import Response, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Set by gunicorn's environment so every worker writes to one shared directory
+MULTIPROCESS_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+SIZE_BUCKETS = (1024, 16 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 10 * 1024 ** 2,
+                64 * 1024 ** 2, 512 * 1024 ** 2)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+RECORD_KEY = 'metrics.record'
+
+REQUESTS = Counter(
+    'http_requests_total', 'Requests by route and status',
+    ['method', 'route', 'status']
+)
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Time until the response body is sent, live streams included',
+    ['method', 'route']
+)
+IN_PROGRESS = Gauge(
+    'http_requests_in_progress', 'Requests being handled, open live streams included',
+    ['method', 'route'], multiprocess_mode='livesum'
+)
+REQUEST_BYTES = Histogram(
+    'http_request_size_bytes', 'Request bodies (proof uploads, imports)',
+    ['route'], buckets=SIZE_BUCKETS
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries', 'SQL statements per request',
+    ['route'], buckets=QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_SECONDS = Histogram(
+    'http_request_db_seconds', 'Cumulative SQL time per request',
+    ['route']
+)
+SLOW_QUERIES = Counter(
+    'db_slow_queries_total', 'Statements slower than SLOW_QUERY_MS',
+    ['route']
+)
+IMAGE_SECONDS = Histogram(
+    'proof_image_processing_seconds', 'Time to build all derivatives of one proof upload',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+IMAGE_FAILURES = Counter('proof_image_failures_total', 'Proof uploads whose derivatives failed')
+
+
+def current_route():
+    """URL rule of the current request ('background' outside requests)"""
+    if not has_request_context():
+        return 'background'
+    rule = request.url_rule
+    # Unmatched paths share one label so scanners can't grow the series count
+    return rule.rule if rule is not None else 'unmatched'
+
+
+class _Record:
+    """Measurements of one request, kept in the WSGI environ so they outlive the
+    request context while a streamed body is sent"""
+    __slots__ = ('method', 'route', 'started', 'queries', 'db_seconds', 'finishing')
+
+    def __init__(self, method, route):
+        self.method = method
+        self.route = route
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.finishing = False
+
+
+def _current_record():
+    return request.environ.get(RECORD_KEY) if has_request_context() else None
+
+
+class RequestMetrics:
+    """Prometheus metrics for requests and SQL, served at /metrics.
+
+    Request hooks record latency, status and in-flight counts per URL rule,
+    finished when the server closes the response so streamed bodies count;
+    engine events count statements and their time per request and log
+    statements slower than SLOW_QUERY_MS with the route that issued them.
+    Under gunicorn set PROMETHEUS_MULTIPROC_DIR so /metrics sums all workers.
+    """
+
+    def __init__(self, app=None):
+        self.slow_query_seconds = None
+        self.logger = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.slow_query_seconds = app.config['SLOW_QUERY_MS'] / 1000
+        self.logger = app.logger
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        # Engine class events cover the primary and the replica engine
+        if not event.contains(Engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_request(self):
+        record = _Record(request.method, current_route())
+        request.environ[RECORD_KEY] = record
+        IN_PROGRESS.labels(record.method, record.route).inc()
+        if request.content_length:
+            REQUEST_BYTES.labels(record.route).observe(request.content_length)
+
+    def _after_request(self, response):
+        record = _current_record()
+        if record is None or record.finishing:
+            return response
+        record.finishing = True
+        status = str(response.status_code)
+        # Flask tears the request down before a streamed body is iterated; the
+        # response is only closed once the server has sent all of it
+        response.call_on_close(lambda: self._finish(record, status))
+        return response
+
+    def _teardown_request(self, error=None):
+        record = _current_record()
+        if record is not None and not record.finishing:
+            # No response was made (an unhandled error propagated)
+            record.finishing = True
+            self._finish(record, '500')
+
+    def _finish(self, record, status):
+        REQUEST_SECONDS.labels(record.method, record.route).observe(time.perf_counter() - record.started)
+        REQUESTS.labels(record.method, record.route, status).inc()
+        REQUEST_QUERIES.labels(record.route).observe(record.queries)
+        REQUEST_DB_SECONDS.labels(record.route).observe(record.db_seconds)
+        IN_PROGRESS.labels(record.method, record.route).dec()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # On the execution context rather than the connection, so a statement
+        # that fails (no after_cursor_execute) leaves nothing behind
+        context._metrics_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_started
+        record = _current_record()
+        if record is not None:
+            record.queries += 1
+            record.db_seconds += elapsed
+        if elapsed >= self.slow_query_seconds:
+            route = current_route()
+            SLOW_QUERIES.labels(route).inc()
+            self.logger.warning('Slow query (%.0f ms) from %s: %s', elapsed * 1000, route,
+                                ' '.join(statement.split())[:1000])
+
+    def render(self):
+        """Prometheus text exposition of this process, or of all workers in multiprocess mode"""
+        registry = REGISTRY
+        if MULTIPROCESS_DIR:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+request_metrics = RequestMetrics()
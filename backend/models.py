@@ -1,8 +1,16 @@
 from datetime import datetime, timezone, timedelta
+from collections import OrderedDict
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import functools
 import hashlib
+import threading
+import time
+from replicas import RoutingSession, read_router
+from serializers import user_fields, song_fields, verification_fields
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # KST (한국 표준시) 타임존: UTC+9
 KST = timezone(timedelta(hours=9))
@@ -12,6 +20,70 @@ def kst_now():
     return datetime.now(KST)
 
 
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after a TTL.
+
+    Sized from <PREFIX>_SIZE and <PREFIX>_TTL in the app config when set. Hit and miss
+    counts are kept for /api/cache/stats.
+    """
+    _MISSING = object()
+
+    def __init__(self, config_prefix, max_entries=1024, ttl=300.0):
+        self.config_prefix = config_prefix
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_entries = app.config.get(f'{self.config_prefix}_SIZE', self.max_entries)
+        self.ttl = app.config.get(f'{self.config_prefix}_TTL', self.ttl)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, self._MISSING)
+            if entry is not self._MISSING and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not self._MISSING:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxEntries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# Song catalog (static columns only) and username -> (id, pin_hash)
+song_cache = TTLCache('SONG_CACHE', max_entries=1, ttl=3600.0)
+user_cache = TTLCache('USER_CACHE', max_entries=10000, ttl=300.0)
+
+
 class User(db.Model):
     __tablename__ = 'users'
 
@@ -24,21 +96,31 @@ class User(db.Model):
     verifications = db.relationship('Verification', back_populates='user', cascade='all, delete-orphan')
 
     @staticmethod
+    @functools.lru_cache(maxsize=10000)  # every 4-digit PIN fits
     def hash_pin(pin):
         """Hash a PIN using SHA-256"""
         return hashlib.sha256(pin.encode()).hexdigest()
 
+    @staticmethod
+    def credentials(username):
+        """(id, pin_hash) for a username, or None; served from user_cache when warm"""
+        cached = user_cache.get(username)
+        if cached is not None:
+            return cached
+        row = db.session.query(User.id, User.pin_hash).filter_by(username=username).first()
+        if row is None:
+            # Not cached: the user may be created by the next submission
+            return None
+        credentials = (row.id, row.pin_hash)
+        user_cache.set(username, credentials)
+        return credentials
+
     def verify_pin(self, pin):
         """Verify a PIN against the stored hash"""
         return self.pin_hash == User.hash_pin(pin)
 
     def to_dict(self):
-        return {
-            'id': self.id,
-            'username': self.username,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        return user_fields(self)
 
 
 class Song(db.Model):
@@ -55,17 +137,23 @@ class Song(db.Model):
 
     verifications = db.relationship('Verification', back_populates='song', cascade='all, delete-orphan')
 
+    @staticmethod
+    def catalog():
+        """{song_id: to_dict()} for every song, served from song_cache when warm.
+
+        streamCount in the cached dicts is as of the load; callers that show it
+        overlay the live totals.
+        """
+        songs = song_cache.get('catalog')
+        if songs is None:
+            # Cached for the process lifetime, so never from a lagging replica
+            with read_router.primary():
+                songs = {song.id: song.to_dict() for song in Song.query.order_by(Song.id).all()}
+            song_cache.set('catalog', songs)
+        return songs
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'album': self.album,
-            'releaseDate': self.release_date.isoformat() if self.release_date else None,
-            'coverImage': self.cover_image,
-            'streamCount': self.total_stream_count,
-            'createdAt': self.created_at.isoformat() if self.created_at else None,
-            'updatedAt': self.updated_at.isoformat() if self.updated_at else None
-        }
+        return song_fields(self)
 
 
 class Verification(db.Model):
@@ -84,17 +172,116 @@ class Verification(db.Model):
     user = db.relationship('User', back_populates='verifications')
     song = db.relationship('Song', back_populates='verifications')
 
+    def to_dict(self):
+        # Lazy-loads user and song unless they were eager-loaded with the row
+        return verification_fields(
+            self,
+            username=self.user.username if self.user else None,
+            songTitle=self.song.title if self.song else None
+        )
+
+
+class VerificationEvent(db.Model):
+    """Append-only verification change, partitioned by month; written by trigger"""
+    __tablename__ = 'verification_events'
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    verification_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    song_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    stream_count = db.Column(db.Integer, nullable=False)
+    stream_delta = db.Column(db.BigInteger, nullable=False)
+    occurred_at = db.Column(db.DateTime, primary_key=True)
+
+
+class DailyStream(db.Model):
+    """Approved stream deltas rolled up per (event day, user, song); maintained by trigger"""
+    __tablename__ = 'daily_streams'
+
+    day = db.Column(db.Date, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    song_id = db.Column(db.Integer, db.ForeignKey('songs.id', ondelete='CASCADE'), primary_key=True)
+    streams = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class SiteCounter(db.Model):
+    """Single-row site-wide totals for /api/stats; maintained by triggers"""
+    __tablename__ = 'site_counters'
+
+    id = db.Column(db.SmallInteger, primary_key=True, default=1)
+    total_verifications = db.Column(db.BigInteger, nullable=False, default=0)
+    total_streams = db.Column(db.BigInteger, nullable=False, default=0)
+    active_users = db.Column(db.BigInteger, nullable=False, default=0)
+    total_songs = db.Column(db.BigInteger, nullable=False, default=0)
+
     def to_dict(self):
         return {
-            'id': self.id,
-            'userId': self.user_id,
-            'username': self.user.username if self.user else None,
-            'songId': self.song_id,
-            'songTitle': self.song.title if self.song else None,
-            'streamCount': self.stream_count,
-            'proofImage': self.proof_image,
-            'status': self.status,
-            'verifiedAt': self.verified_at.isoformat() if self.verified_at else None,
-            'createdAt': self.created_at.isoformat() if self.created_at else None,
-            'updatedAt': self.updated_at.isoformat() if self.updated_at else None
+            'totalVerifications': self.total_verifications,
+            'totalStreams': self.total_streams,
+            'activeUsers': self.active_users,
+            'totalSongs': self.total_songs
         }
+
+
+class ProofFile(db.Model):
+    """Reference count of a stored proof upload; maintained by trigger"""
+    __tablename__ = 'proof_files'
+
+    name = db.Column(db.String(255), primary_key=True)
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=kst_now)
+
+
+class IngestTicket(db.Model):
+    """Outcome of a queued verification submission"""
+    __tablename__ = 'ingest_tickets'
+
+    id = db.Column(db.Uuid, primary_key=True)
+    status = db.Column(db.String(20), nullable=False)
+    verification_id = db.Column(db.Integer, db.ForeignKey('verifications.id', ondelete='SET NULL'))
+    http_status = db.Column(db.SmallInteger, nullable=False)
+    message = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=kst_now)
+
+    verification = db.relationship('Verification')
+
+
+def init_caches(app):
+    song_cache.init_app(app)
+    user_cache.init_app(app)
+
+
+# Invalidate after commit, not at flush: a concurrent reader could otherwise
+# re-cache the pre-commit row between the flush and the commit
+@event.listens_for(Song, 'after_insert')
+@event.listens_for(Song, 'after_update')
+@event.listens_for(Song, 'after_delete')
+def _song_written(mapper, connection, target):
+    session = db.inspect(target).session
+    if session is not None:
+        session.info['invalidate_songs'] = True
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_written(mapper, connection, target):
+    state = db.inspect(target)
+    if state.session is not None:
+        # A rename also invalidates the old name
+        usernames = {target.username, *state.attrs.username.history.deleted}
+        state.session.info.setdefault('invalidate_users', set()).update(usernames)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_written(session):
+    if session.info.pop('invalidate_songs', False):
+        song_cache.invalidate()
+    for username in session.info.pop('invalidate_users', ()):
+        user_cache.invalidate(username)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_written(session, previous_transaction):
+    session.info.pop('invalidate_songs', None)
+    session.info.pop('invalidate_users', None)
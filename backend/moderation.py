@@ -0,0 +1,83 @@
+from datetime import datetime, time, timedelta
+
+from models import db, User, Song, Verification, kst_now
+
+MODERATION_STATUSES = {
+    'approve': 'approved',
+    'reject': 'rejected'
+}
+
+
+class TooManyRows(Exception):
+    """A bulk filter matches more verifications than one request may change"""
+
+
+def _filter_conditions(filters):
+    """WHERE conditions for a bulk filter (songId, userId, username, from, to, status)"""
+    conditions = []
+    if filters.get('songId') is not None:
+        conditions.append(Verification.song_id == filters['songId'])
+    if filters.get('userId') is not None:
+        conditions.append(Verification.user_id == filters['userId'])
+    if filters.get('username'):
+        conditions.append(User.username == filters['username'])
+    if filters.get('from'):
+        conditions.append(Verification.created_at >= datetime.combine(filters['from'], time.min))
+    if filters.get('to'):
+        conditions.append(Verification.created_at < datetime.combine(filters['to'] + timedelta(days=1), time.min))
+    if filters.get('status'):
+        conditions.append(Verification.status == filters['status'])
+    return conditions
+
+
+def bulk_moderate(action, ids=None, filters=None, max_rows=None):
+    """Approve or reject many verifications in one UPDATE ... RETURNING.
+
+    Targets either a list of ids or the rows matching filters; raises
+    TooManyRows when filters would change more than max_rows. Song and site
+    counter changes are deferred by the triggers and applied as one delta
+    per song before the caller commits. Returns (rows, results) where rows
+    are the updated verifications (with username and song_title) and results
+    maps every requested id to 'updated', 'unchanged' or 'not_found'
+    (only updated ids when filtering).
+    """
+    status = MODERATION_STATUSES[action]
+    values = {'status': status}
+    if status == 'approved':
+        values['verified_at'] = kst_now()
+
+    conditions = [Verification.user_id == User.id,
+                  Verification.song_id == Song.id,
+                  Verification.status != status]
+    if ids is not None:
+        conditions.append(Verification.id.in_(ids))
+    else:
+        conditions.extend(_filter_conditions(filters))
+        if max_rows is not None:
+            # Lock the matches first so the count holds for the UPDATE below
+            matched = db.session.scalars(
+                db.select(Verification.id).where(*conditions)
+                .limit(max_rows + 1).with_for_update(of=Verification)
+            ).all()
+            if len(matched) > max_rows:
+                raise TooManyRows()
+            conditions.append(Verification.id.in_(matched))
+
+    db.session.execute(db.text("SET LOCAL app.defer_counts = 'on'"))
+    statement = db.update(Verification) \
+        .where(*conditions) \
+        .values(**values) \
+        .returning(*Verification.__table__.c, User.username, Song.title.label('song_title')) \
+        .execution_options(synchronize_session=False)
+    rows = db.session.execute(statement).all()
+    db.session.execute(db.text('SELECT apply_count_deltas()'))
+
+    results = {row.id: 'updated' for row in rows}
+    if ids is not None:
+        remaining = [verification_id for verification_id in ids if verification_id not in results]
+        existing = set(db.session.scalars(
+            db.select(Verification.id).where(Verification.id.in_(remaining))
+        )) if remaining else set()
+        for verification_id in remaining:
+            results[verification_id] = 'unchanged' if verification_id in existing else 'not_found'
+    return rows, results
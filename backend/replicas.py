@@ -0,0 +1,187 @@
+import contextlib
+import functools
+import threading
+import time
+
+from flask import current_app, request, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.sql import Select
+
+from cache import response_cache
+
+REPLICA_BIND = 'replica'
+
+# 0 on a caught-up standby (or a plain server used as a replica locally),
+# otherwise seconds since the last replayed transaction
+LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class RoutingSession(Session):
+    """db.session that sends SELECTs to the replica while a read-only view runs.
+
+    Flushes, text() statements and everything outside ReadRouter.replica views
+    go to the primary as before.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get(REPLICA_BIND) and not self._flushing \
+                and (clause is None or isinstance(clause, Select)):
+            engine = read_router.engine(self._db)
+            if engine is not None:
+                # This request's response now depends on the replica
+                g.replica_read = True
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReadRouter:
+    """Routes read-only endpoints to DATABASE_READ_URL when it is configured.
+
+    A background check measures replica lag every REPLICA_CHECK_INTERVAL; the
+    replica is skipped while it is down or more than REPLICA_MAX_LAG_SECONDS
+    behind. After a successful write a client's reads stay on the primary for
+    READ_STICKY_SECONDS (read-your-writes). The deadline is sent as a cookie
+    for same-origin clients and as a response header that cross-origin
+    clients, which don't send the cookie, echo back as a request header.
+    """
+
+    COOKIE = 'read_primary_until'
+    HEADER = 'X-Read-Primary-Until'
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.healthy = False
+        self.lag = None
+        # Cache generation at which the replica was last seen fully caught up
+        self._caught_up_generation = None
+        self._engine = None
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = REPLICA_BIND in app.config.get('SQLALCHEMY_BINDS', {})
+        self.max_lag = app.config['REPLICA_MAX_LAG_SECONDS']
+        self.check_interval = app.config['REPLICA_CHECK_INTERVAL']
+        self.sticky_seconds = app.config['READ_STICKY_SECONDS']
+        app.after_request(self._mark_write)
+
+    def engine(self, db):
+        """Replica engine when it is usable, otherwise None"""
+        if not self.enabled:
+            return None
+        if self._engine is None:
+            self._start(db.engines[REPLICA_BIND])
+        return self._engine if self.healthy else None
+
+    def _start(self, engine):
+        with self._thread_lock:
+            if self._engine is not None:
+                return
+            event.listen(engine, 'handle_error', self._on_error)
+            self._engine = engine
+            # First check inline so the first reads already know the replica's state
+            self._check()
+            self._thread = threading.Thread(target=self._monitor, name='replica-lag', daemon=True)
+            self._thread.start()
+
+    def _on_error(self, context):
+        # Dropped connections and failed connects take the replica out until the next check
+        if context.is_disconnect or context.connection is None:
+            self.healthy = False
+            # Only a replica read of this request is retried, not one of another
+            # request or of the lag check
+            if has_app_context() and g.get('replica_read'):
+                g.replica_failed = True
+
+    def _check(self):
+        generation = response_cache.generation()
+        try:
+            with self._engine.connect() as connection:
+                self.lag = float(connection.execute(LAG_QUERY).scalar())
+        except Exception:
+            self.lag = None
+            self.healthy = False
+            return
+        self.healthy = self.lag <= self.max_lag
+        if self.lag == 0:
+            self._caught_up_generation = generation
+
+    def _monitor(self):
+        while True:
+            time.sleep(self.check_interval)
+            self._check()
+
+    def sticky(self):
+        """Whether this client wrote recently and must read from the primary"""
+        try:
+            until = float(request.headers.get(self.HEADER) or request.cookies.get(self.COOKIE, 0))
+        except ValueError:
+            return False
+        # A deadline further out than a write could have set is not honoured
+        return 0 < until - time.time() <= self.sticky_seconds
+
+    def _mark_write(self, response):
+        if self.enabled and request.method in ('POST', 'PUT', 'PATCH', 'DELETE') \
+                and response.status_code < 400:
+            until = f'{time.time() + self.sticky_seconds:.3f}'
+            response.set_cookie(self.COOKIE, until, max_age=int(self.sticky_seconds) + 1,
+                                httponly=True, samesite='Lax')
+            response.headers[self.HEADER] = until
+        return response
+
+    def replica(self, view):
+        """Run a read-only view against the replica when it is usable.
+
+        Place under @response_cache.cached. A response read from the replica is
+        only cached once the replica has been seen caught up at the current
+        generation, so a lagging read is not pinned in the cache. If the
+        replica drops mid-request the view is retried on the primary.
+        """
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.enabled or self.sticky():
+                return view(*args, **kwargs)
+            session = current_app.extensions['sqlalchemy'].session
+            g.replica_read = g.replica_failed = False
+            session.info[REPLICA_BIND] = True
+            try:
+                response = view(*args, **kwargs)
+            except Exception:
+                if not g.replica_failed:
+                    raise
+                response = None
+            finally:
+                session.info.pop(REPLICA_BIND, None)
+            if g.replica_failed:
+                session.rollback()
+                g.replica_read = g.replica_failed = False
+                return view(*args, **kwargs)
+            if g.replica_read and self._caught_up_generation != response_cache.generation():
+                g.skip_response_cache = True
+            return response
+        return wrapper
+
+    @contextlib.contextmanager
+    def primary(self):
+        """Read from the primary inside a replica view, e.g. to fill a process-wide cache"""
+        session = current_app.extensions['sqlalchemy'].session
+        routed = session.info.pop(REPLICA_BIND, None)
+        try:
+            yield
+        finally:
+            if routed:
+                session.info[REPLICA_BIND] = routed
+
+    def stats(self):
+        return {'enabled': self.enabled, 'healthy': self.healthy, 'lag': self.lag}
+
+
+read_router = ReadRouter()
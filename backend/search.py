@@ -0,0 +1,30 @@
+from models import db
+
+# Shortest query the trigram index can serve; shorter ones match prefixes only
+TRIGRAM_MIN_LENGTH = 3
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_usernames(query, limit):
+    """[(user_id, username)] matching `query`, case-insensitive: prefix matches
+    first (idx_users_username_prefix), then substring matches
+    (idx_users_username_trgm), shortest names first within each"""
+    pattern = _escape_like(query.lower())
+    matches = db.session.execute(db.text("""
+        SELECT id, username FROM users
+        WHERE lower(username) LIKE :prefix
+        ORDER BY lower(username)
+        LIMIT :limit
+    """), {'prefix': pattern + '%', 'limit': limit}).all()
+    if len(matches) < limit and len(query) >= TRIGRAM_MIN_LENGTH:
+        matches += db.session.execute(db.text("""
+            SELECT id, username FROM users
+            WHERE username ILIKE :substring AND lower(username) NOT LIKE :prefix
+            ORDER BY length(username), username
+            LIMIT :limit
+        """), {'substring': '%' + pattern + '%', 'prefix': pattern + '%',
+               'limit': limit - len(matches)}).all()
+    return [(row.id, row.username) for row in matches]
@@ -0,0 +1,115 @@
+import json
+from datetime import date, datetime
+from operator import attrgetter
+
+from flask.json.provider import DefaultJSONProvider
+
+from images import derivative_names
+
+try:
+    import orjson
+except ImportError:  # optional; falls back to the stdlib encoder
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def dumps(payload):
+    """Encode to JSON bytes with sorted keys; datetimes and dates become ISO 8601"""
+    if orjson is not None:
+        # orjson writes datetimes the same way isoformat() does
+        return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(payload, default=_default, ensure_ascii=False, sort_keys=True,
+                      separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify() through dumps(): orjson when installed, ISO 8601 datetimes"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+
+class Fields:
+    """Precompiled (json_key, getter) list mapping an object or row to a dict.
+
+    A field is either an attribute name or a (json_key, callable) pair for
+    derived values. Datetimes are left as-is for the encoder.
+    """
+
+    def __init__(self, **fields):
+        self._fields = tuple(
+            (key, field if callable(field) else attrgetter(field))
+            for key, field in fields.items()
+        )
+
+    def __call__(self, obj, **extra):
+        data = {key: getter(obj) for key, getter in self._fields}
+        data.update(extra)
+        return data
+
+    def many(self, objs, **extra):
+        return [self(obj, **extra) for obj in objs]
+
+
+def _proof_images(obj):
+    return derivative_names(obj.proof_image) if obj.proof_image else None
+
+
+user_fields = Fields(
+    id='id',
+    username='username',
+    created_at='created_at',
+    updated_at='updated_at'
+)
+
+song_fields = Fields(
+    id='id',
+    title='title',
+    album='album',
+    releaseDate='release_date',
+    coverImage='cover_image',
+    streamCount='total_stream_count',
+    createdAt='created_at',
+    updatedAt='updated_at'
+)
+
+# username and songTitle are passed in by the caller, which loaded them
+# alongside the verification instead of through the lazy relationships
+verification_fields = Fields(
+    id='id',
+    userId='user_id',
+    songId='song_id',
+    streamCount='stream_count',
+    proofImage='proof_image',
+    proofImages=_proof_images,
+    status='status',
+    verifiedAt='verified_at',
+    createdAt='created_at',
+    updatedAt='updated_at'
+)
+
+# Approved verification rows on a user profile (/api/users/id/<id>)
+profile_verification_fields = Fields(
+    id='id',
+    songId='song_id',
+    songTitle='song_title',
+    streamCount='stream_count',
+    proofImage='proof_image',
+    proofImages=_proof_images,
+    status='status',
+    verifiedAt='verified_at',
+    createdAt='created_at'
+)
+
+
+def serialize_verification(verification, username, song_title):
+    return verification_fields(verification, username=username, songTitle=song_title)
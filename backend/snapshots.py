@@ -0,0 +1,209 @@
+import random
+import threading
+import time
+from datetime import timedelta
+
+from models import db, Song, kst_now
+from cache import response_cache
+from leaderboard import leaderboard_index
+
+# pg_try_advisory_xact_lock key: one snapshot at a time across workers and hosts
+SNAPSHOT_LOCK = 0x72616e6b  # 'rank'
+
+# Board id stored for the All Songs board
+ALL_SONGS = 0
+
+# Current top-N positions diffed against each position's latest stored row:
+# new or moved positions get a row, positions that left the top N get rank NULL
+RECORD_CHANGES = db.text("""
+    WITH current_positions AS (
+        SELECT * FROM unnest(CAST(:song_ids AS INTEGER[]), CAST(:user_ids AS INTEGER[]),
+                             CAST(:ranks AS INTEGER[]), CAST(:stream_counts AS BIGINT[]))
+            AS p(song_id, user_id, rank, stream_count)
+    ),
+    latest AS (
+        SELECT DISTINCT ON (song_id, user_id) song_id, user_id, rank, stream_count
+        FROM rank_snapshots
+        ORDER BY song_id, user_id, taken_at DESC
+    )
+    INSERT INTO rank_snapshots (song_id, user_id, taken_at, rank, stream_count)
+    SELECT c.song_id, c.user_id, :taken_at, c.rank, c.stream_count
+    FROM current_positions c
+    LEFT JOIN latest l ON l.song_id = c.song_id AND l.user_id = c.user_id
+    WHERE l.rank IS DISTINCT FROM c.rank OR l.stream_count IS DISTINCT FROM c.stream_count
+    UNION ALL
+    SELECT l.song_id, l.user_id, :taken_at, NULL, 0
+    FROM latest l
+    WHERE l.rank IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM current_positions c WHERE c.song_id = l.song_id AND c.user_id = l.user_id
+    )
+    -- Deleted users are gone from the index; their rows went with them
+    AND EXISTS (SELECT 1 FROM users WHERE users.id = l.user_id)
+""")
+
+# Keep only the last row per position (and the last run) in each bucket
+DOWNSAMPLE = db.text("""
+    WITH superseded AS (
+        SELECT song_id, user_id, taken_at, ROW_NUMBER() OVER (
+            PARTITION BY song_id, user_id, date_trunc(:bucket, taken_at)
+            ORDER BY taken_at DESC
+        ) AS newer
+        FROM rank_snapshots
+        WHERE taken_at < :before
+    )
+    DELETE FROM rank_snapshots s
+    USING superseded
+    WHERE superseded.newer > 1 AND s.song_id = superseded.song_id
+        AND s.user_id = superseded.user_id AND s.taken_at = superseded.taken_at
+""")
+
+DOWNSAMPLE_RUNS = db.text("""
+    DELETE FROM rank_snapshot_runs r
+    USING (
+        SELECT taken_at, ROW_NUMBER() OVER (
+            PARTITION BY date_trunc(:bucket, taken_at) ORDER BY taken_at DESC
+        ) AS newer
+        FROM rank_snapshot_runs
+        WHERE taken_at < :before
+    ) superseded
+    WHERE superseded.newer > 1 AND r.taken_at = superseded.taken_at
+""")
+
+
+def take_snapshot(top_n, min_interval=0.0):
+    """Store changed top-N positions of every board; returns rows written.
+
+    Returns None without writing when another process holds the snapshot
+    lock or the last run is less than `min_interval` seconds old.
+    """
+    if not db.session.execute(db.text('SELECT pg_try_advisory_xact_lock(:key)'),
+                              {'key': SNAPSHOT_LOCK}).scalar():
+        db.session.rollback()
+        return None
+    due = db.session.execute(db.text("""
+        SELECT COALESCE(MAX(taken_at) <= LOCALTIMESTAMP - make_interval(secs => :min_interval), TRUE)
+        FROM rank_snapshot_runs
+    """), {'min_interval': min_interval}).scalar()
+    if not due:
+        db.session.rollback()
+        return None
+
+    leaderboard_index.sync(response_cache.generation())
+    song_ids, user_ids, ranks, stream_counts = [], [], [], []
+    for board, song_id in [(ALL_SONGS, None)] + [(song_id, song_id) for song_id in Song.catalog()]:
+        for user_id, _, rank, stream_count in leaderboard_index.positions(song_id, top_n):
+            song_ids.append(board)
+            user_ids.append(user_id)
+            ranks.append(rank)
+            stream_counts.append(stream_count)
+
+    taken_at = db.session.execute(db.text(
+        'INSERT INTO rank_snapshot_runs (top_n) VALUES (:top_n) RETURNING taken_at'
+    ), {'top_n': top_n}).scalar()
+    written = db.session.execute(RECORD_CHANGES, {
+        'song_ids': song_ids, 'user_ids': user_ids, 'ranks': ranks,
+        'stream_counts': stream_counts, 'taken_at': taken_at
+    }).rowcount
+    db.session.commit()
+    return written
+
+
+def downsample(daily_after_days, weekly_after_days):
+    """Thin old snapshots to one per day, then one per week; returns rows removed"""
+    removed = 0
+    now = kst_now()
+    for bucket, days in (('week', weekly_after_days), ('day', daily_after_days)):
+        before = now - timedelta(days=days)
+        removed += db.session.execute(DOWNSAMPLE, {'bucket': bucket, 'before': before}).rowcount
+        db.session.execute(DOWNSAMPLE_RUNS, {'bucket': bucket, 'before': before})
+    db.session.commit()
+    return removed
+
+
+def rank_as_of(song_id, user_ids, as_of):
+    """{user_id: (rank, stream_count)} from each position's latest row at or
+    before `as_of`; rank None means outside the top N then"""
+    rows = db.session.execute(db.text("""
+        SELECT DISTINCT ON (user_id) user_id, rank, stream_count
+        FROM rank_snapshots
+        WHERE song_id = :song_id AND user_id = ANY(:user_ids) AND taken_at <= :as_of
+        ORDER BY user_id, taken_at DESC
+    """), {'song_id': song_id or ALL_SONGS, 'user_ids': list(user_ids), 'as_of': as_of}).all()
+    return {row.user_id: (row.rank, row.stream_count) for row in rows}
+
+
+def rank_history(song_id, user_id, first, last):
+    """[(taken_at, rank, stream_count)] at every snapshot run in [first, last]"""
+    return db.session.execute(db.text("""
+        SELECT r.taken_at, s.rank, s.stream_count
+        FROM rank_snapshot_runs r
+        LEFT JOIN LATERAL (
+            SELECT rank, stream_count FROM rank_snapshots
+            WHERE song_id = :song_id AND user_id = :user_id AND taken_at <= r.taken_at
+            ORDER BY taken_at DESC
+            LIMIT 1
+        ) s ON TRUE
+        WHERE r.taken_at >= :first AND r.taken_at <= :last
+        ORDER BY r.taken_at
+    """), {'song_id': song_id or ALL_SONGS, 'user_id': user_id, 'first': first, 'last': last}).all()
+
+
+class RankSnapshotter:
+    """Takes rank snapshots every SNAPSHOT_INTERVAL_SECONDS from inside the app.
+
+    Every worker runs the timer; the advisory lock and the last-run check in
+    take_snapshot() make one of them write per interval. Set the interval to
+    0 to schedule `flask snapshot-ranks` externally instead.
+    """
+
+    def __init__(self, app=None):
+        self._app = None
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._app = app
+        self.interval = app.config['SNAPSHOT_INTERVAL_SECONDS']
+        self.top_n = app.config['SNAPSHOT_TOP_N']
+        self.daily_after = app.config['SNAPSHOT_DAILY_AFTER_DAYS']
+        self.weekly_after = app.config['SNAPSHOT_WEEKLY_AFTER_DAYS']
+        if self.interval > 0:
+            app.before_request(self._ensure_started)
+
+    def _ensure_started(self):
+        # Started on first request so CLI commands don't schedule snapshots
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='rank-snapshots', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            # Jitter keeps workers from contending for the lock at the same instant
+            time.sleep(self.interval * random.uniform(0.5, 1.0))
+            with self._app.app_context():
+                try:
+                    self.run_once(min_interval=self.interval * 0.9)
+                except Exception:
+                    self._app.logger.exception('Rank snapshot failed')
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    def run_once(self, min_interval=0.0):
+        """Snapshot and downsample; returns rows written, or None if skipped"""
+        written = take_snapshot(self.top_n, min_interval)
+        if written is None:
+            return None
+        downsample(self.daily_after, self.weekly_after)
+        if written:
+            # Cached rank-change responses compare against the latest snapshot;
+            # verifications did not change, so this worker's index stays current
+            leaderboard_index.advance(response_cache.invalidate())
+        return written
+
+
+rank_snapshotter = RankSnapshotter()
@@ -0,0 +1,119 @@
+import hashlib
+import os
+import re
+import tempfile
+import time
+from datetime import timedelta
+
+from images import PROOF_SIZES, derivative_name
+from models import db, ProofFile, kst_now
+
+# Content-addressed proof name: aa/bb/<sha256>.<ext>
+CONTENT_NAME = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.[a-z0-9]+$')
+# Any file served from a content-addressed name, derivatives included
+IMMUTABLE_NAME = re.compile(
+    r'^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.(' + '|'.join(PROOF_SIZES) + r'))?\.[a-z0-9]+$'
+)
+
+CHUNK_SIZE = 64 * 1024
+
+
+def is_content_addressed(name):
+    return bool(CONTENT_NAME.match(name or ''))
+
+
+def is_immutable(name):
+    return bool(IMMUTABLE_NAME.match(name or ''))
+
+
+class ProofStorage:
+    """Content-addressed store for proof uploads.
+
+    Files are named by the SHA-256 of their bytes and sharded into two levels
+    of subdirectories (aa/bb/<hash>.<ext>), so identical uploads share one
+    file and no directory grows past a few thousand entries. Names never
+    change content, which lets them be served as immutable.
+    """
+
+    def __init__(self, app=None):
+        self.root = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.root = app.config['UPLOAD_FOLDER']
+        os.makedirs(os.path.join(self.root, '.incoming'), exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def save(self, file_storage, extension):
+        """Store an upload; returns (name, created) where created is False for a duplicate"""
+        digest = hashlib.sha256()
+        fd, temp = tempfile.mkstemp(dir=os.path.join(self.root, '.incoming'))
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in iter(lambda: file_storage.stream.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    out.write(chunk)
+
+            hexdigest = digest.hexdigest()
+            name = f'{hexdigest[:2]}/{hexdigest[2:4]}/{hexdigest}.{extension}'
+            target = self.path(name)
+            if os.path.exists(target):
+                # Duplicate: refresh mtime so cleanup's grace period covers the new reference
+                os.utime(target)
+                os.unlink(temp)
+                return name, False
+
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.chmod(temp, 0o644)
+            os.replace(temp, target)
+            return name, True
+        except BaseException:
+            if os.path.exists(temp):
+                os.unlink(temp)
+            raise
+
+    def delete(self, name):
+        """Remove a stored file and its derivatives; returns the number of files removed"""
+        if not is_content_addressed(name):
+            return 0
+        removed = 0
+        for candidate in [name] + [derivative_name(name, size) for size in PROOF_SIZES]:
+            try:
+                os.unlink(self.path(candidate))
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def modified_since(self, name, cutoff):
+        try:
+            return os.path.getmtime(self.path(name)) >= cutoff
+        except FileNotFoundError:
+            return False
+
+    def collect_unreferenced(self, grace_seconds):
+        """Delete files whose reference count dropped to zero more than grace_seconds ago.
+
+        Files touched within the grace period (a fresh duplicate upload whose
+        verification has not committed yet) are kept. Returns files removed.
+        """
+        cutoff = kst_now() - timedelta(seconds=grace_seconds)
+        cutoff_ts = time.time() - grace_seconds
+        unreferenced = ProofFile.query \
+            .filter(ProofFile.refcount <= 0, ProofFile.updated_at < cutoff) \
+            .with_for_update(skip_locked=True) \
+            .all()
+        removed = 0
+        for proof_file in unreferenced:
+            if self.modified_since(proof_file.name, cutoff_ts):
+                continue
+            removed += self.delete(proof_file.name)
+            db.session.delete(proof_file)
+        db.session.commit()
+        return removed
+
+
+proof_storage = ProofStorage()
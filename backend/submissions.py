@@ -0,0 +1,104 @@
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User, Song, Verification, kst_now, user_cache
+
+# SQLSTATE for foreign_key_violation
+FOREIGN_KEY_VIOLATION = '23503'
+# Largest stream count verifications.stream_count (INTEGER) can hold
+MAX_STREAM_COUNT = 2 ** 31 - 1
+
+
+class SongNotFound(Exception):
+    """The submitted song_id does not reference an existing song"""
+
+
+def upsert_user(username, pin_hash):
+    """Get or create a user in one statement; returns (id, pin_hash, created).
+
+    Uses ON CONFLICT DO NOTHING so resubmissions by an existing user don't
+    rewrite the users row. If a concurrent transaction inserted the same
+    username, this statement's snapshot can't see it yet; the next statement
+    can, so the lookup is retried once.
+    """
+    inserted = pg_insert(User) \
+        .values(username=username, pin_hash=pin_hash) \
+        .on_conflict_do_nothing(index_elements=[User.username]) \
+        .returning(User.id, User.pin_hash, db.literal(True).label('created')) \
+        .cte('inserted')
+    statement = db.select(inserted.c.id, inserted.c.pin_hash, inserted.c.created).union_all(
+        db.select(User.id, User.pin_hash, db.literal(False).label('created'))
+        .where(User.username == username)
+        .where(~db.exists(db.select(inserted.c.id)))
+    )
+    for _ in range(2):
+        row = db.session.execute(statement).first()
+        if row is not None:
+            return row
+    raise RuntimeError(f'user {username!r} could not be inserted or found')
+
+
+def resolve_user(username, pin_hash):
+    """(id, stored_pin_hash) for a submitter, from user_cache when warm.
+
+    Falls back to upsert_user(). Only users that already existed are cached:
+    a user created by this transaction could still be rolled back.
+    """
+    cached = user_cache.get(username)
+    if cached is not None:
+        return cached
+    user_id, stored_pin_hash, created = upsert_user(username, pin_hash)
+    if not created:
+        user_cache.set(username, (user_id, stored_pin_hash))
+    return user_id, stored_pin_hash
+
+
+def upsert_verification(user_id, song_id, stream_count, proof_image):
+    """Create or update the (user, song) verification in one round trip.
+
+    New rows start approved; resubmissions replace stream_count and proof_image
+    and keep the current moderation status. Returns the stored row with
+    song_title, created (True for a new row) and written_at.
+
+    Raises SongNotFound when song_id does not exist.
+    """
+    now = kst_now()
+    statement = pg_insert(Verification).values(
+        user_id=user_id,
+        song_id=song_id,
+        stream_count=stream_count,
+        proof_image=proof_image,
+        status='approved',
+        verified_at=now,
+        created_at=now,
+        updated_at=now
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[Verification.user_id, Verification.song_id],
+        set_={
+            'stream_count': statement.excluded.stream_count,
+            'proof_image': statement.excluded.proof_image,
+            'verified_at': statement.excluded.verified_at,
+            'updated_at': statement.excluded.updated_at
+        }
+    ).returning(
+        *Verification.__table__.c,
+        # xmax is 0 only for a freshly inserted tuple
+        db.literal_column('xmax = 0').label('created'),
+        # Taken while holding the row lock, so it orders writes to the same row
+        db.func.clock_timestamp().label('written_at')
+    ).cte('upserted')
+    query = db.select(statement, Song.title.label('song_title')) \
+        .join(Song, Song.id == statement.c.song_id)
+    try:
+        return db.session.execute(query).one()
+    except IntegrityError as e:
+        if getattr(e.orig, 'sqlstate', None) == FOREIGN_KEY_VIOLATION:
+            raise SongNotFound(song_id) from e
+        raise
+
+
+def verification_from_row(row):
+    """Detached Verification built from an upsert_verification() row"""
+    return Verification(**{column.name: row._mapping[column.name]
+                           for column in Verification.__table__.c})
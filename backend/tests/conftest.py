@@ -0,0 +1,21 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Config reads the environment once, on import, so it is set here before any
+# test module imports the backend
+if os.environ.get('TEST_DATABASE_URL'):
+    STATE = tempfile.mkdtemp(prefix='nmixx-test-')
+    os.environ.update({
+        'DATABASE_URL': os.environ['TEST_DATABASE_URL'],
+        'UPLOAD_FOLDER': os.path.join(STATE, 'uploads'),
+        'CACHE_GENERATION_FILE': os.path.join(STATE, 'generation'),
+        'RATE_LIMIT_FILE': os.path.join(STATE, 'limits'),
+        'RATE_LIMIT_ENABLED': 'false',
+        'ADMIN_TOKEN': 'test-admin',
+        'SNAPSHOT_INTERVAL_SECONDS': '0',
+        # Every request runs its view instead of replaying a cached response
+        'RESPONSE_CACHE_SIZE': '0',
+    })
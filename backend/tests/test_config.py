@@ -0,0 +1,40 @@
+"""Database pool sizing stays within the connection budget.
+
+    python -m pytest backend/tests/test_config.py
+"""
+import pytest
+
+from config import BACKGROUND_SESSIONS, MIN_POOL_SIZE, max_workers, pool_options
+
+
+def connections(workers, options):
+    """Connections all workers open at full overflow, each with its LISTEN connection"""
+    return workers * (options['pool_size'] + options['max_overflow'] + 1)
+
+
+@pytest.mark.parametrize('cpus', [1, 2, 4, 8, 16, 64])
+@pytest.mark.parametrize('threads', [1, 4, 16])
+def test_default_workers_fit_the_budget(cpus, threads):
+    workers = min(cpus * 2 + 1, max_workers(100, 10))
+    options = pool_options(workers, threads, 100, 10)
+    assert options['pool_size'] + options['max_overflow'] >= MIN_POOL_SIZE
+    assert connections(workers, options) + 10 <= 100
+
+
+def test_sixteen_cores_are_capped_by_the_budget():
+    # 2 x 16 + 1 = 33 workers would need at least 33 x 5 + 10 connections
+    assert max_workers(100, 10) == 18
+    with pytest.raises(ValueError, match='WEB_CONCURRENCY'):
+        pool_options(33, 4, 100, 10)
+
+
+@pytest.mark.parametrize('workers', range(1, 19))
+def test_pool_never_exceeds_the_budget(workers):
+    options = pool_options(workers, 4, 100, 10)
+    assert connections(workers, options) + 10 <= 100
+    assert options['pool_size'] <= 4 + BACKGROUND_SESSIONS
+
+
+def test_budget_too_small_for_one_worker():
+    with pytest.raises(ValueError):
+        pool_options(1, 4, 12, 10)
@@ -0,0 +1,185 @@
+"""Endpoints run the same number of statements for one row as for many.
+
+    TEST_DATABASE_URL=postgresql://localhost/nmixx_test python -m pytest backend/tests
+
+Runs against a database with database/schema.sql applied; all of its user
+data is deleted. Skipped when TEST_DATABASE_URL is unset.
+"""
+import io
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+import pytest
+
+if not os.environ.get('TEST_DATABASE_URL'):
+    pytest.skip('TEST_DATABASE_URL is not set', allow_module_level=True)
+
+from PIL import Image
+from sqlalchemy import event
+
+from app import create_app
+from cache import response_cache
+from leaderboard import leaderboard_index
+from models import db, User, Song, Verification, IngestTicket, kst_now, user_cache
+
+# Deleted rather than truncated: TRUNCATE would deadlock with the live
+# listener re-reading the rows it was notified about
+USER_DATA_TABLES = ('ingest_tickets', 'verifications', 'verification_events', 'daily_streams',
+                    'rank_snapshots', 'rank_snapshot_runs', 'proof_files', 'users')
+
+PIN = '0000'
+ADMIN = {'Authorization': 'Bearer test-admin'}
+
+# Filled in with the ids of the first seeded user, song and verification
+ENDPOINTS = {
+    'songs': '/api/songs',
+    'song': '/api/songs/{song_id}',
+    'leaderboard': '/api/leaderboard?limit=100',
+    'leaderboard_song': '/api/leaderboard?songId={song_id}&limit=100',
+    'leaderboard_week': '/api/leaderboard?filter=week&limit=100',
+    'leaderboard_range': '/api/leaderboard?from={week_ago}&to={today}&limit=100',
+    'leaderboard_song_range': '/api/leaderboard?songId={song_id}&from={week_ago}&to={today}&limit=100',
+    'leaderboard_rank': '/api/leaderboard/rank?username={username}&around=10',
+    'leaderboard_rank_range': '/api/leaderboard/rank?username={username}&from={week_ago}&to={today}&around=10',
+    'search': '/api/search/users?q=user',
+    'user': '/api/users/{username}',
+    'user_by_id': '/api/users/id/{user_id}',
+    'verification': '/api/verifications/{verification_id}',
+    'ticket': '/api/verifications/tickets/{ticket_id}',
+}
+
+
+def submission(username, song_id):
+    image = io.BytesIO()
+    Image.new('RGB', (64, 64), (120, 40, 200)).save(image, 'PNG')
+    image.seek(0)
+    return {'data': {'username': username, 'pin': PIN, 'songId': str(song_id), 'streamCount': '4321',
+                     'proof': (image, 'proof.png')}}
+
+
+# (method, url, request arguments from the seeded values)
+WRITES = {
+    'create_verification': ('POST', '/api/verifications',
+                            lambda values: submission(values['username'], values['song_id'])),
+    'create_verification_new_user': ('POST', '/api/verifications',
+                                     lambda values: submission('newcomer', values['song_id'])),
+    'approve': ('PUT', '/api/verifications/{pending_id}/approve', lambda values: {'headers': ADMIN}),
+    'reject': ('PUT', '/api/verifications/{verification_id}/reject', lambda values: {'headers': ADMIN}),
+    'bulk_moderate_ids': ('POST', '/api/verifications/bulk', lambda values: {
+        'headers': ADMIN, 'json': {'action': 'reject', 'ids': values['verification_ids']}}),
+    'bulk_moderate_filter': ('POST', '/api/verifications/bulk', lambda values: {
+        'headers': ADMIN, 'json': {'action': 'reject', 'filter': {'status': 'approved'}}}),
+}
+
+
+@pytest.fixture(scope='module')
+def app():
+    return create_app('production')
+
+
+def seed(app, users, songs_each):
+    """`users` users with one approved verification on each of the first `songs_each` songs,
+    plus one pending verification and a ticket for the first approved one"""
+    with app.app_context():
+        for table in USER_DATA_TABLES:
+            db.session.execute(db.text(f'DELETE FROM {table}'))
+        song_ids = [song_id for song_id, in db.session.query(Song.id).order_by(Song.id).limit(songs_each)]
+        for index in range(users):
+            user = User(username=f'user{index}', pin_hash=User.hash_pin(PIN))
+            db.session.add(user)
+            db.session.flush()
+            for song_id in song_ids:
+                db.session.add(Verification(user_id=user.id, song_id=song_id, stream_count=1000 * (index + 1),
+                                            proof_image='test.png', status='approved'))
+        db.session.flush()
+        verifications = Verification.query.order_by(Verification.id).all()
+        first = verifications[0]
+        moderated = User(username='moderated', pin_hash=User.hash_pin(PIN))
+        db.session.add(moderated)
+        db.session.flush()
+        pending = Verification(user_id=moderated.id, song_id=first.song_id, stream_count=500,
+                               proof_image='test.png', status='pending')
+        ticket = IngestTicket(id=uuid.uuid4(), status='done', verification_id=first.id, http_status=200)
+        db.session.add_all([pending, ticket])
+        db.session.commit()
+
+        today = kst_now().date()
+        values = {
+            'username': first.user.username,
+            'user_id': first.user_id,
+            'song_id': first.song_id,
+            'verification_id': first.id,
+            'verification_ids': [verification.id for verification in verifications],
+            'pending_id': pending.id,
+            'ticket_id': ticket.id.hex,
+            'today': today.isoformat(),
+            'week_ago': (today - timedelta(days=6)).isoformat(),
+        }
+        # The deletes fire no ORM events, and the index only hears about writes
+        # through the live listener
+        user_cache.invalidate()
+        leaderboard_index.load(response_cache.generation())
+        db.session.remove()
+    return values
+
+
+@contextmanager
+def statements(app):
+    """Statements run by this thread; the live listener and other background
+    threads share the engine"""
+    executed = []
+    thread = threading.get_ident()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == thread:
+            executed.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield executed
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def query_count(app, url, rows):
+    values = seed(app, users=rows, songs_each=rows)
+    client = app.test_client()
+    url = url.format(**values)
+    # Warm the song catalog and user caches so both runs start from the same state
+    assert client.get(url).status_code == 200
+    with statements(app) as executed:
+        response = client.get(url)
+    assert response.status_code == 200, response.get_json()
+    return len(executed)
+
+
+def write_query_count(app, method, url, arguments, rows):
+    values = seed(app, users=rows, songs_each=rows)
+    client = app.test_client()
+    # A write can't be repeated as its own warm-up; load the song catalog and
+    # the submitter's credentials instead
+    assert client.get('/api/songs').status_code == 200
+    assert client.post('/api/auth/login', json={'username': values['username'], 'pin': PIN}).status_code == 200
+    with statements(app) as executed:
+        response = client.open(url.format(**values), method=method, **arguments(values))
+    assert response.status_code == 200, response.get_json()
+    return len(executed)
+
+
+@pytest.mark.parametrize('name', list(ENDPOINTS))
+def test_query_count_does_not_grow_with_rows(app, name):
+    one = query_count(app, ENDPOINTS[name], 1)
+    many = query_count(app, ENDPOINTS[name], 8)
+    assert one == many, f'{name}: {one} statements for 1 row, {many} for 8 users x 8 songs'
+
+
+@pytest.mark.parametrize('name', list(WRITES))
+def test_write_query_count_does_not_grow_with_rows(app, name):
+    one = write_query_count(app, *WRITES[name], 1)
+    many = write_query_count(app, *WRITES[name], 8)
+    assert one == many, f'{name}: {one} statements for 1 row, {many} for 8 users x 8 songs'
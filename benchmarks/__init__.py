@@ -0,0 +1,6 @@
+"""Benchmark tooling: synthetic data (generate), load driver (load), result diffs (compare).
+
+    python -m benchmarks.generate --reset --users 200000 --events 3000000
+    python -m benchmarks.load --url http://localhost:5000 --duration 60 -o head.json
+    python -m benchmarks.compare base.json head.json
+"""
@@ -0,0 +1,68 @@
+"""Compare two benchmarks.load reports endpoint by endpoint.
+
+    python -m benchmarks.compare base.json head.json --fail-over 10
+
+Exits 1 when --fail-over is given and any endpoint's p95 latency grew by
+more than that many percent.
+"""
+import argparse
+import json
+import sys
+
+COLUMNS = [('p50', 'latency_ms', 'p50'), ('p95', 'latency_ms', 'p95'), ('p99', 'latency_ms', 'p99'),
+           ('rps', 'throughput_rps', None), ('queries', 'db_queries_per_request', None),
+           ('db ms', 'db_ms_per_request', None)]
+
+
+def value(report, key, field):
+    value = report.get(key)
+    return value.get(field) if field and value else value
+
+
+def change(before, after):
+    if before is None or after is None:
+        return None
+    if before == 0:
+        return 0.0 if after == 0 else float('inf')
+    return (after - before) / before * 100
+
+
+def format_cell(before, after):
+    if before is None and after is None:
+        return '-'
+    delta = change(before, after)
+    delta = f' ({delta:+.0f}%)' if delta is not None else ''
+    return f'{before} -> {after}{delta}'
+
+
+def compare(base, head, fail_over=None):
+    print(f"base {base['meta'].get('commit') or '?'}  head {head['meta'].get('commit') or '?'}")
+    regressions = []
+    names = sorted(set(base['endpoints']) | set(head['endpoints']))
+    for name in names:
+        before = base['endpoints'].get(name, {})
+        after = head['endpoints'].get(name, {})
+        print(f'\n{name}')
+        for label, key, field in COLUMNS:
+            print(f'  {label:>8}  {format_cell(value(before, key, field), value(after, key, field))}')
+        growth = change(value(before, 'latency_ms', 'p95'), value(after, 'latency_ms', 'p95'))
+        if fail_over is not None and growth is not None and growth > fail_over:
+            regressions.append(f'{name} p95 {growth:+.0f}%')
+    if regressions:
+        print('\nRegressions: ' + ', '.join(regressions))
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('base')
+    parser.add_argument('head')
+    parser.add_argument('--fail-over', type=float, help='p95 growth in percent that fails the comparison')
+    args = parser.parse_args()
+    with open(args.base, encoding='utf-8') as base, open(args.head, encoding='utf-8') as head:
+        sys.exit(compare(json.load(base), json.load(head), args.fail_over))
+
+
+if __name__ == '__main__':
+    main()
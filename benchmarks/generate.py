@@ -0,0 +1,209 @@
+"""Fill a local database with skewed synthetic streaming data.
+
+Users follow a Zipf distribution (a few heavy streamers, a long tail), songs
+have uneven popularity, and a few comeback days carry burst traffic toward
+one song. Every submission becomes a verification_events row at its own
+time; verifications hold each (user, song) pair's latest count. Rollups and
+counters are then rebuilt with the backend's own backfill and reconcile code.
+
+    python -m benchmarks.generate --reset --users 200000 --events 3000000
+
+Runs against DATABASE_URL after database/schema.sql has been applied. Every
+user gets the PIN given by --pin so the load driver can submit as them.
+"""
+import argparse
+import hashlib
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import psycopg
+
+BACKEND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, BACKEND)
+
+LATIN_NAMES = ['nswer', 'mixx', 'haewon', 'lily', 'sullyoon', 'bae', 'jiwoo', 'kyujin',
+               'dice', 'ogeu', 'party', 'stream', 'love', 'melon']
+HANGUL_SYLLABLES = [chr(code) for code in range(0xAC00, 0xD7A4, 97)]
+
+# Share of a day's submissions in each KST hour: quiet overnight, peak in the evening
+HOUR_WEIGHTS = [3, 2, 1, 1, 1, 1, 2, 3, 4, 4, 4, 5, 6, 5, 5, 5, 6, 7, 8, 9, 10, 10, 8, 5]
+
+USER_DATA_TABLES = ('verification_events', 'daily_streams', 'rank_snapshots', 'rank_snapshot_runs',
+                    'ingest_tickets', 'proof_files', 'verifications', 'users')
+
+
+def log(message, *args):
+    print(message % args, file=sys.stderr, flush=True)
+
+
+def connect_url(database_url):
+    # The backend accepts postgresql+psycopg:// too; libpq does not
+    return database_url.replace('postgresql+psycopg://', 'postgresql://', 1)
+
+
+def username(rng, index):
+    if rng.random() < 0.35:
+        return ''.join(rng.choices(HANGUL_SYLLABLES, k=rng.randint(2, 4))) + str(index)
+    return f'{rng.choice(LATIN_NAMES)}_{index}'
+
+
+def cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+
+def generate_events(rng, args, user_ids, song_ids, start, now):
+    """[(user_id, song_id, occurred_at, streams)] sorted by pair then time"""
+    user_weights = cumulative(1 / rank ** args.zipf for rank in range(1, len(user_ids) + 1))
+    song_weights = cumulative(1 / rank ** 0.8 for rank in range(1, len(song_ids) + 1))
+    burst_days = {day: rng.choice(song_ids) for day in rng.sample(range(args.days), min(args.bursts, args.days))}
+    day_weights = cumulative(args.burst_factor if day in burst_days else 1 for day in range(args.days))
+    hour_weights = cumulative(HOUR_WEIGHTS)
+    log('Comeback days: %s', ', '.join(
+        f'{(start + timedelta(days=day)).date()} (song {song})' for day, song in sorted(burst_days.items())))
+
+    events = []
+    users = rng.choices(user_ids, cum_weights=user_weights, k=args.events)
+    songs = rng.choices(song_ids, cum_weights=song_weights, k=args.events)
+    days = rng.choices(range(args.days), cum_weights=day_weights, k=args.events)
+    hours = rng.choices(range(24), cum_weights=hour_weights, k=args.events)
+    for user_id, song_id, day, hour in zip(users, songs, days, hours):
+        if day in burst_days and rng.random() < 0.6:
+            song_id = burst_days[day]
+        occurred_at = start + timedelta(days=day, hours=hour, seconds=rng.randrange(3600))
+        if occurred_at > now:
+            occurred_at -= timedelta(days=1)
+        streams = min(int(rng.paretovariate(1.3) * 10), 5000)
+        events.append((user_id, song_id, occurred_at, streams))
+    events.sort()
+    return events
+
+
+def copy_rows(cursor, statement, rows):
+    with cursor.copy(statement) as copy:
+        for row in rows:
+            copy.write_row(row)
+
+
+def generate(args):
+    rng = random.Random(args.seed)
+    now = datetime.now(ZoneInfo('Asia/Seoul')).replace(tzinfo=None, microsecond=0)
+    # The last of --days is today, up to now
+    start = (now - timedelta(days=args.days - 1)).replace(hour=0, minute=0, second=0)
+    pin_hash = hashlib.sha256(args.pin.encode()).hexdigest()
+
+    with psycopg.connect(connect_url(args.database_url), options='-c timezone=Asia/Seoul') as connection:
+        cursor = connection.cursor()
+        song_ids = [row[0] for row in cursor.execute('SELECT id FROM songs ORDER BY release_date DESC')]
+        if not song_ids:
+            sys.exit('No songs: apply database/schema.sql first')
+        existing = cursor.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+        if existing and not args.reset:
+            sys.exit(f'{existing} users already exist; pass --reset to replace all user data')
+        if args.reset:
+            cursor.execute(f'TRUNCATE {", ".join(USER_DATA_TABLES)} RESTART IDENTITY CASCADE')
+
+        started = time.perf_counter()
+        user_ids = list(range(1, args.users + 1))
+        # Heavy streamers are spread over the id range instead of being the first signups
+        weighted_ids = user_ids[:]
+        rng.shuffle(weighted_ids)
+        events = generate_events(rng, args, weighted_ids, song_ids, start, now)
+        log('Generated %d submissions in %.1fs', len(events), time.perf_counter() - started)
+
+        cursor.execute('SELECT ensure_verification_events_partitions(%s, 3)', (start.date(),))
+        # Events and rollups are written here directly; the row triggers would log
+        # every verification again at the current time
+        cursor.execute('ALTER TABLE verifications DISABLE TRIGGER USER')
+
+        first_seen = {}
+        verification_rows = []
+        event_count = 0
+        with cursor.copy('COPY verification_events (verification_id, user_id, song_id, status, '
+                         'stream_count, stream_delta, occurred_at) FROM STDIN') as copy:
+            for (user_id, song_id), pair in itertools.groupby(events, key=lambda event: event[:2]):
+                pair = list(pair)
+                roll = rng.random()
+                status = 'pending' if roll < args.pending_rate else \
+                    'rejected' if roll < args.pending_rate + args.rejected_rate else 'approved'
+                verification_id = len(verification_rows) + 1
+                stream_count = 0
+                for _, _, occurred_at, streams in pair:
+                    stream_count += streams
+                    delta = streams if status == 'approved' else 0
+                    copy.write_row((verification_id, user_id, song_id, status, stream_count, delta, occurred_at))
+                event_count += len(pair)
+                created_at, updated_at = pair[0][2], pair[-1][2]
+                verification_rows.append((verification_id, user_id, song_id, stream_count,
+                                          f'bench/{verification_id}.png', status,
+                                          updated_at, created_at, updated_at))
+                first_seen[user_id] = min(first_seen.get(user_id, created_at), created_at)
+        del events
+
+        copy_rows(cursor, 'COPY users (id, username, pin_hash, created_at, updated_at) FROM STDIN', (
+            (user_id, username(rng, user_id), pin_hash,
+             first_seen.get(user_id, start), first_seen.get(user_id, start))
+            for user_id in user_ids
+        ))
+        copy_rows(cursor, 'COPY verifications (id, user_id, song_id, stream_count, proof_image, status, '
+                          'verified_at, created_at, updated_at) FROM STDIN', verification_rows)
+        cursor.execute("""
+            INSERT INTO proof_files (name, refcount)
+            SELECT proof_image, COUNT(*) FROM verifications GROUP BY proof_image
+        """)
+        cursor.execute('ALTER TABLE verifications ENABLE TRIGGER USER')
+        for table in ('users', 'verifications'):
+            cursor.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                           f"(SELECT COALESCE(MAX(id), 1) FROM {table}))")
+        connection.commit()
+        log('Loaded %d users, %d verifications, %d events in %.1fs', len(user_ids),
+            len(verification_rows), event_count, time.perf_counter() - started)
+
+        connection.autocommit = True
+        for table in USER_DATA_TABLES:
+            cursor.execute(f'ANALYZE {table}')
+
+    rebuild_derived(args.database_url)
+    log('Done in %.1fs', time.perf_counter() - started)
+
+
+def rebuild_derived(database_url):
+    """daily_streams, counters and cache generation through the backend's own code"""
+    os.environ['DATABASE_URL'] = database_url
+    from app import create_app
+    from cache import response_cache
+    from counters import reconcile_counters
+    from leaderboard import backfill_daily_streams
+
+    app = create_app('production')
+    with app.app_context():
+        log('Rebuilt %d daily_streams rows', backfill_daily_streams())
+        reconcile_counters()
+        # Running servers drop cached responses; the rollup rebuild told them to
+        # reload their leaderboard index
+        response_cache.invalidate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'postgresql://localhost/nmixx_streaming'))
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--events', type=int, default=1000000, help='verification submissions')
+    parser.add_argument('--days', type=int, default=60, help='days of history ending today')
+    parser.add_argument('--bursts', type=int, default=3, help='comeback days')
+    parser.add_argument('--burst-factor', type=float, default=8.0, help='traffic multiplier on comeback days')
+    parser.add_argument('--zipf', type=float, default=1.1, help='user activity skew exponent')
+    parser.add_argument('--pending-rate', type=float, default=0.02)
+    parser.add_argument('--rejected-rate', type=float, default=0.01)
+    parser.add_argument('--pin', default='0000')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help='delete all existing users and verifications first')
+    generate(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
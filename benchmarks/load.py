@@ -0,0 +1,334 @@
+"""Scripted load against a running server; prints or writes a JSON report.
+
+Closed-loop workers (--concurrency) pick a scenario by weight (--mix) and
+issue requests for --duration seconds after a --warmup that is not
+recorded. Each endpoint reports requests, errors, throughput and p50/p95/p99
+latency; SQL statements and time per request come from the server's
+/metrics counters read before and after the measured run.
+
+    python -m benchmarks.load --url http://localhost:5000 --duration 60 -o head.json
+
+Uploads submit as users loaded by benchmarks.generate with its --pin, so
+point it at a server using that database. --seed makes the request sequence
+repeatable. --clients spreads requests over that many client IPs through
+X-Forwarded-For, for servers started with TRUSTED_PROXIES=1.
+"""
+import argparse
+import http.client
+import io
+import json
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+from urllib.parse import urlencode, urlsplit
+
+from PIL import Image
+
+FILTERS = ['all', 'all', 'all', 'today', 'week', 'month']
+
+# name: (weight, URL rule the server reports in /metrics)
+SCENARIOS = {
+    'leaderboard': (40, '/api/leaderboard'),
+    'leaderboard_rank': (10, '/api/leaderboard/rank'),
+    'stats': (15, '/api/stats'),
+    'songs': (15, '/api/songs'),
+    'search': (5, '/api/search/users'),
+    'verification': (5, '/api/verifications'),
+}
+
+METRIC_LINE = re.compile(r'^(http_request_db_(?:queries|seconds)_(?:sum|count))\{route="([^"]*)"\} (\S+)$')
+
+
+class Client:
+    """One keep-alive connection per worker"""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.connection = None
+
+    def request(self, method, path, body=None, headers=None):
+        """(status, body); reconnects once when the server closed the connection"""
+        for attempt in (0, 1):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.connection.request(method, path, body=body, headers=headers or {})
+                response = self.connection.getresponse()
+                data = response.read()
+                if response.getheader('Connection', '').lower() == 'close':
+                    self.close()
+                return response.status, data
+            except (http.client.HTTPException, OSError):
+                self.close()
+                if attempt:
+                    raise
+
+    def get_json(self, path, **params):
+        status, data = self.request('GET', f'{path}?{urlencode(params)}' if params else path)
+        return status, json.loads(data) if status == 200 else None
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class Scenarios:
+    """Builds each scenario's request from the board the server is serving"""
+
+    def __init__(self, client, pin):
+        _, songs = client.get_json('/api/songs')
+        _, page = client.get_json('/api/leaderboard', limit=500)
+        if not songs or not page or not page['entries']:
+            sys.exit('The server has no songs or leaderboard entries; run benchmarks.generate first')
+        self.song_ids = [song['id'] for song in songs]
+        self.usernames = [entry['username'] for entry in page['entries']]
+        self.pin = pin
+
+    def build(self, name, rng):
+        """(method, path, body, headers)"""
+        song_id = rng.choice(self.song_ids) if rng.random() < 0.4 else None
+        if name == 'leaderboard':
+            params = {'filter': rng.choice(FILTERS), 'limit': 100}
+            if song_id:
+                params['songId'] = song_id
+            return 'GET', f'/api/leaderboard?{urlencode(params)}', None, None
+        if name == 'leaderboard_rank':
+            params = {'username': rng.choice(self.usernames), 'filter': rng.choice(FILTERS), 'around': 5}
+            return 'GET', f'/api/leaderboard/rank?{urlencode(params)}', None, None
+        if name == 'stats':
+            return 'GET', '/api/stats', None, None
+        if name == 'songs':
+            return 'GET', '/api/songs', None, None
+        if name == 'search':
+            username = rng.choice(self.usernames)
+            query = username[:rng.randint(1, min(4, len(username)))]
+            return 'GET', f'/api/search/users?{urlencode({"q": query})}', None, None
+        if name == 'verification':
+            return self.verification(rng)
+        raise ValueError(name)
+
+    def verification(self, rng):
+        # A fresh image per upload, so every submission stores and processes a new proof
+        image = io.BytesIO()
+        Image.new('RGB', (rng.randint(600, 1200), rng.randint(800, 1600)),
+                  tuple(rng.randrange(256) for _ in range(3))).save(image, 'JPEG', quality=70)
+        fields = {
+            'username': rng.choice(self.usernames),
+            'pin': self.pin,
+            'songId': str(rng.choice(self.song_ids)),
+            'streamCount': str(rng.randint(1, 100000)),
+        }
+        body, content_type = multipart(fields, 'proof', 'proof.jpg', image.getvalue(), rng)
+        return 'POST', '/api/verifications', body, {'Content-Type': content_type}
+
+
+def multipart(fields, file_field, filename, content, rng):
+    boundary = uuid.UUID(int=rng.getrandbits(128)).hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+                 f'filename="{filename}"\r\nContent-Type: image/jpeg\r\n\r\n'.encode())
+    parts.append(content)
+    parts.append(f'\r\n--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def read_db_metrics(client):
+    """{route: {metric: value}} from /metrics, or None when it is not served"""
+    try:
+        status, data = client.request('GET', '/metrics')
+    except (http.client.HTTPException, OSError):
+        return None
+    if status != 200:
+        return None
+    metrics = defaultdict(dict)
+    for line in data.decode('utf-8').splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            name, route, value = match.groups()
+            metrics[route][name] = float(value)
+    return metrics
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not ordered:
+        return None
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def worker(index, args, scenarios, names, weights, deadline, measure_from, results):
+    rng = random.Random(f'{args.seed}-{index}')
+    client = Client(args.url, args.timeout)
+    samples = []
+    while True:
+        name = rng.choices(names, weights=weights)[0]
+        method, path, body, headers = scenarios.build(name, rng)
+        if args.clients:
+            client_ip = rng.randrange(args.clients)
+            headers = {**(headers or {}), 'X-Forwarded-For': f'10.{client_ip >> 16 & 255}.{client_ip >> 8 & 255}.{client_ip & 255}'}
+        started = time.perf_counter()
+        if started >= deadline:
+            break
+        try:
+            status, _ = client.request(method, path, body, headers)
+        except (http.client.HTTPException, OSError):
+            status = 0
+        finished = time.perf_counter()
+        if started >= measure_from:
+            samples.append((name, status, finished - started))
+    client.close()
+    results[index] = samples
+
+
+def summarize(samples, duration, db_before, db_after):
+    by_name = defaultdict(list)
+    for name, status, seconds in samples:
+        by_name[name].append((status, seconds))
+
+    endpoints = {}
+    for name, rows in sorted(by_name.items()):
+        latencies = sorted(seconds * 1000 for status, seconds in rows)
+        statuses = Counter(status for status, _ in rows)
+        report = {
+            'route': SCENARIOS[name][1],
+            'requests': len(rows),
+            # 0: connection failed or timed out
+            'errors': sum(count for status, count in statuses.items() if status == 0 or status >= 500),
+            'status': {str(status): count for status, count in sorted(statuses.items())},
+            'throughput_rps': round(len(rows) / duration, 2),
+            'latency_ms': {
+                'p50': round(percentile(latencies, 0.50), 2),
+                'p95': round(percentile(latencies, 0.95), 2),
+                'p99': round(percentile(latencies, 0.99), 2),
+                'mean': round(sum(latencies) / len(latencies), 2),
+                'max': round(latencies[-1], 2),
+            },
+            'db_queries_per_request': None,
+            'db_ms_per_request': None,
+        }
+        endpoints[name] = report
+
+    if db_before is not None and db_after is not None:
+        for report in endpoints.values():
+            before, after = db_before.get(report['route'], {}), db_after.get(report['route'], {})
+            handled = after.get('http_request_db_queries_count', 0) - before.get('http_request_db_queries_count', 0)
+            if handled > 0:
+                queries = after['http_request_db_queries_sum'] - before.get('http_request_db_queries_sum', 0)
+                seconds = after['http_request_db_seconds_sum'] - before.get('http_request_db_seconds_sum', 0)
+                report['db_queries_per_request'] = round(queries / handled, 2)
+                report['db_ms_per_request'] = round(seconds * 1000 / handled, 3)
+
+    latencies = sorted(seconds * 1000 for _, _, seconds in samples)
+    total = {
+        'requests': len(samples),
+        'errors': sum(report['errors'] for report in endpoints.values()),
+        'throughput_rps': round(len(samples) / duration, 2),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50), 2),
+            'p95': round(percentile(latencies, 0.95), 2),
+            'p99': round(percentile(latencies, 0.99), 2),
+        } if latencies else None,
+    }
+    return {'endpoints': endpoints, 'total': total}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_mix(value):
+    """'leaderboard=40,stats=10' -> weights; unnamed scenarios get 0"""
+    mix = dict.fromkeys(SCENARIOS, 0)
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f'unknown scenario {name!r}; choose from {", ".join(SCENARIOS)}')
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def run(args):
+    client = Client(args.url, args.timeout)
+    scenarios = Scenarios(client, args.pin)
+    mix = args.mix or {name: weight for name, (weight, _) in SCENARIOS.items()}
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+
+    print(f'Warming up for {args.warmup}s, measuring for {args.duration}s '
+          f'with {args.concurrency} workers', file=sys.stderr, flush=True)
+    started = time.perf_counter()
+    measure_from = started + args.warmup
+    deadline = measure_from + args.duration
+    results = [None] * args.concurrency
+    threads = [threading.Thread(target=worker, args=(index, args, scenarios, names, weights,
+                                                    deadline, measure_from, results))
+               for index in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+
+    time.sleep(max(0, measure_from - time.perf_counter()))
+    db_before = read_db_metrics(client)
+    for thread in threads:
+        thread.join()
+    db_after = read_db_metrics(client)
+    client.close()
+
+    samples = [sample for worker_samples in results for sample in worker_samples]
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'url': args.url,
+            'duration_s': args.duration,
+            'warmup_s': args.warmup,
+            'concurrency': args.concurrency,
+            'clients': args.clients,
+            'seed': args.seed,
+            'mix': dict(zip(names, weights)),
+        },
+        **summarize(samples, args.duration, db_before, db_after),
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output + '\n')
+        print(f'Wrote {args.output}', file=sys.stderr)
+    else:
+        print(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='unrecorded seconds before measuring')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--mix', type=parse_mix, help='scenario weights, e.g. leaderboard=40,stats=10 '
+                                                      f'(default: {",".join(f"{n}={w}" for n, (w, _) in SCENARIOS.items())})')
+    parser.add_argument('--clients', type=int, default=0, help='simulated client IPs (X-Forwarded-For)')
+    parser.add_argument('--pin', default='0000', help='PIN of the generated users')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('-o', '--output', help='write the JSON report here instead of stdout')
+    run(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
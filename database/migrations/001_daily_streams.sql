@@ -0,0 +1,53 @@
+-- Migration: daily stream rollup for the time-windowed leaderboards
+-- Apply to an existing database created from an earlier schema.sql
+
+BEGIN;
+
+-- Daily rollup of approved streams for the today/week/month leaderboards
+CREATE TABLE daily_streams (
+    day DATE NOT NULL,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    song_id INTEGER NOT NULL REFERENCES songs(id) ON DELETE CASCADE,
+    streams BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, user_id, song_id)
+);
+
+CREATE INDEX idx_daily_streams_song_day ON daily_streams(song_id, day);
+
+-- Function to maintain the daily stream rollup
+CREATE OR REPLACE FUNCTION update_daily_streams()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'approved' THEN
+        UPDATE daily_streams
+        SET streams = streams - OLD.stream_count
+        WHERE day = DATE(OLD.created_at) AND user_id = OLD.user_id AND song_id = OLD.song_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'approved' THEN
+        INSERT INTO daily_streams (day, user_id, song_id, streams)
+        VALUES (DATE(NEW.created_at), NEW.user_id, NEW.song_id, NEW.stream_count)
+        ON CONFLICT (day, user_id, song_id)
+        DO UPDATE SET streams = daily_streams.streams + EXCLUDED.streams;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM daily_streams
+        WHERE day = DATE(OLD.created_at) AND user_id = OLD.user_id AND song_id = OLD.song_id
+            AND streams = 0;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Trigger to maintain the daily stream rollup
+CREATE TRIGGER update_daily_streams_on_verification
+AFTER INSERT OR UPDATE OR DELETE ON verifications
+FOR EACH ROW EXECUTE FUNCTION update_daily_streams();
+
+-- Backfill from existing verifications (same as `flask backfill-rollups`)
+INSERT INTO daily_streams (day, user_id, song_id, streams)
+SELECT DATE(created_at), user_id, song_id, SUM(stream_count)
+FROM verifications
+WHERE status = 'approved'
+GROUP BY DATE(created_at), user_id, song_id;
+
+COMMIT;
@@ -0,0 +1,106 @@
+-- Migration: site-wide counters for /api/stats
+-- Apply to an existing database created from an earlier schema.sql
+
+BEGIN;
+
+-- Site-wide counters for /api/stats (single row, maintained by triggers)
+CREATE TABLE site_counters (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    total_verifications BIGINT NOT NULL DEFAULT 0,
+    total_streams BIGINT NOT NULL DEFAULT 0,
+    active_users BIGINT NOT NULL DEFAULT 0,
+    total_songs BIGINT NOT NULL DEFAULT 0
+);
+
+-- Function to maintain site-wide verification counters. Runs once per
+-- statement over the transition tables, so multi-row writes update the
+-- single counter row once.
+CREATE OR REPLACE FUNCTION update_site_counters()
+RETURNS TRIGGER AS $$
+DECLARE
+    verification_delta BIGINT := 0;
+    stream_delta BIGINT := 0;
+    user_delta BIGINT := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT verification_delta - COUNT(*), stream_delta - COALESCE(SUM(stream_count), 0)
+        INTO verification_delta, stream_delta
+        FROM old_rows WHERE status = 'approved';
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT verification_delta + COUNT(*), stream_delta + COALESCE(SUM(stream_count), 0)
+        INTO verification_delta, stream_delta
+        FROM new_rows WHERE status = 'approved';
+    END IF;
+
+    -- Active users have at least one verification of any status. Lock the user
+    -- rows so concurrent first submissions by the same user count once.
+    IF TG_OP = 'INSERT' THEN
+        PERFORM 1 FROM users WHERE id IN (SELECT user_id FROM new_rows) ORDER BY id FOR UPDATE;
+        SELECT COUNT(DISTINCT n.user_id) INTO user_delta
+        FROM new_rows n
+        WHERE NOT EXISTS (
+            SELECT 1 FROM verifications v
+            WHERE v.user_id = n.user_id AND v.id NOT IN (SELECT id FROM new_rows)
+        );
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT -COUNT(DISTINCT o.user_id) INTO user_delta
+        FROM old_rows o
+        WHERE NOT EXISTS (SELECT 1 FROM verifications v WHERE v.user_id = o.user_id);
+    END IF;
+
+    IF verification_delta <> 0 OR stream_delta <> 0 OR user_delta <> 0 THEN
+        UPDATE site_counters
+        SET total_verifications = total_verifications + verification_delta,
+            total_streams = total_streams + stream_delta,
+            active_users = active_users + user_delta
+        WHERE id = 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Triggers to maintain site-wide verification counters (transition tables
+-- allow only one event per trigger)
+CREATE TRIGGER update_site_counters_on_verification_insert
+AFTER INSERT ON verifications
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_site_counters();
+
+CREATE TRIGGER update_site_counters_on_verification_update
+AFTER UPDATE ON verifications
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_site_counters();
+
+CREATE TRIGGER update_site_counters_on_verification_delete
+AFTER DELETE ON verifications
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_site_counters();
+
+-- Function to maintain the site-wide song count
+CREATE OR REPLACE FUNCTION update_site_song_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE site_counters SET total_songs = total_songs + 1 WHERE id = 1;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE site_counters SET total_songs = total_songs - 1 WHERE id = 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Trigger to maintain the site-wide song count
+CREATE TRIGGER update_site_song_count_on_song
+AFTER INSERT OR DELETE ON songs
+FOR EACH ROW EXECUTE FUNCTION update_site_song_count();
+
+-- Seed from existing data (same as `flask reconcile-counters`)
+INSERT INTO site_counters (id, total_verifications, total_streams, active_users, total_songs)
+SELECT 1,
+    (SELECT COUNT(*) FROM verifications WHERE status = 'approved'),
+    (SELECT COALESCE(SUM(stream_count), 0) FROM verifications WHERE status = 'approved'),
+    (SELECT COUNT(DISTINCT user_id) FROM verifications),
+    (SELECT COUNT(*) FROM songs);
+
+COMMIT;
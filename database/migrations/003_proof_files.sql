@@ -0,0 +1,49 @@
+-- Migration: reference counts for content-addressed proof uploads
+-- Apply to an existing database created from an earlier schema.sql
+
+BEGIN;
+
+-- Reference counts for content-addressed proof uploads (maintained by trigger)
+CREATE TABLE proof_files (
+    name VARCHAR(255) PRIMARY KEY,
+    refcount INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_proof_files_unreferenced ON proof_files(updated_at) WHERE refcount <= 0;
+
+-- Function to maintain proof file reference counts
+CREATE OR REPLACE FUNCTION update_proof_file_refcount()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.proof_image IS NOT DISTINCT FROM OLD.proof_image THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.proof_image <> '' THEN
+        UPDATE proof_files
+        SET refcount = refcount - 1, updated_at = CURRENT_TIMESTAMP
+        WHERE name = OLD.proof_image;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.proof_image <> '' THEN
+        INSERT INTO proof_files (name, refcount)
+        VALUES (NEW.proof_image, 1)
+        ON CONFLICT (name)
+        DO UPDATE SET refcount = proof_files.refcount + 1, updated_at = CURRENT_TIMESTAMP;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Trigger to maintain proof file reference counts
+CREATE TRIGGER update_proof_file_refcount_on_verification
+AFTER INSERT OR UPDATE OF proof_image OR DELETE ON verifications
+FOR EACH ROW EXECUTE FUNCTION update_proof_file_refcount();
+
+-- Count references held by existing verifications
+INSERT INTO proof_files (name, refcount)
+SELECT proof_image, COUNT(*)
+FROM verifications
+WHERE proof_image <> ''
+GROUP BY proof_image;
+
+COMMIT;
@@ -0,0 +1,154 @@
+-- Migration: batched ingestion (deferred counter deltas, ticket results)
+-- Also makes update_song_stream_count apply stream_count edits on approved
+-- rows, which it previously ignored. Run `flask reconcile-counters` after.
+-- Apply to an existing database created from an earlier schema.sql
+
+BEGIN;
+
+-- Counter deltas deferred to the end of a batch transaction (see apply_count_deltas)
+CREATE UNLOGGED TABLE count_deltas (
+    txid BIGINT NOT NULL,
+    song_id INTEGER,  -- NULL for site_counters deltas
+    stream_delta BIGINT NOT NULL DEFAULT 0,
+    verification_delta BIGINT NOT NULL DEFAULT 0,
+    user_delta BIGINT NOT NULL DEFAULT 0
+);
+
+-- Results of queued verification submissions, polled by ticket ID
+CREATE TABLE ingest_tickets (
+    id UUID PRIMARY KEY,
+    status VARCHAR(20) NOT NULL CHECK (status IN ('done', 'failed')),
+    verification_id INTEGER REFERENCES verifications(id) ON DELETE SET NULL,
+    http_status SMALLINT NOT NULL,
+    message VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_count_deltas_txid ON count_deltas(txid);
+CREATE INDEX idx_ingest_tickets_created_at ON ingest_tickets(created_at);
+
+-- Function to update song total stream count. Inside a batch transaction
+-- (SET LOCAL app.defer_counts = 'on') the delta is queued in count_deltas and
+-- applied once per song by apply_count_deltas() just before commit.
+CREATE OR REPLACE FUNCTION update_song_stream_count()
+RETURNS TRIGGER AS $$
+DECLARE
+    stream_delta BIGINT := 0;
+    target_song_id INTEGER;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'approved' THEN
+        stream_delta := stream_delta - OLD.stream_count;
+        target_song_id := OLD.song_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'approved' THEN
+        stream_delta := stream_delta + NEW.stream_count;
+        target_song_id := NEW.song_id;
+    END IF;
+
+    IF stream_delta <> 0 THEN
+        IF current_setting('app.defer_counts', true) = 'on' THEN
+            INSERT INTO count_deltas (txid, song_id, stream_delta)
+            VALUES (txid_current(), target_song_id, stream_delta);
+        ELSE
+            UPDATE songs
+            SET total_stream_count = total_stream_count + stream_delta
+            WHERE id = target_song_id;
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Function to maintain site-wide verification counters. Runs once per
+-- statement over the transition tables, so multi-row writes update the
+-- single counter row once.
+CREATE OR REPLACE FUNCTION update_site_counters()
+RETURNS TRIGGER AS $$
+DECLARE
+    verification_delta BIGINT := 0;
+    stream_delta BIGINT := 0;
+    user_delta BIGINT := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT verification_delta - COUNT(*), stream_delta - COALESCE(SUM(stream_count), 0)
+        INTO verification_delta, stream_delta
+        FROM old_rows WHERE status = 'approved';
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT verification_delta + COUNT(*), stream_delta + COALESCE(SUM(stream_count), 0)
+        INTO verification_delta, stream_delta
+        FROM new_rows WHERE status = 'approved';
+    END IF;
+
+    -- Active users have at least one verification of any status. Lock the user
+    -- rows so concurrent first submissions by the same user count once.
+    IF TG_OP = 'INSERT' THEN
+        PERFORM 1 FROM users WHERE id IN (SELECT user_id FROM new_rows) ORDER BY id FOR UPDATE;
+        SELECT COUNT(DISTINCT n.user_id) INTO user_delta
+        FROM new_rows n
+        WHERE NOT EXISTS (
+            SELECT 1 FROM verifications v
+            WHERE v.user_id = n.user_id AND v.id NOT IN (SELECT id FROM new_rows)
+        );
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT -COUNT(DISTINCT o.user_id) INTO user_delta
+        FROM old_rows o
+        WHERE NOT EXISTS (SELECT 1 FROM verifications v WHERE v.user_id = o.user_id);
+    END IF;
+
+    IF verification_delta = 0 AND stream_delta = 0 AND user_delta = 0 THEN
+        RETURN NULL;
+    END IF;
+    IF current_setting('app.defer_counts', true) = 'on' THEN
+        INSERT INTO count_deltas (txid, song_id, stream_delta, verification_delta, user_delta)
+        VALUES (txid_current(), NULL, stream_delta, verification_delta, user_delta);
+    ELSE
+        UPDATE site_counters
+        SET total_verifications = total_verifications + verification_delta,
+            total_streams = total_streams + stream_delta,
+            active_users = active_users + user_delta
+        WHERE id = 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Apply the counter deltas queued by the current transaction: one UPDATE per
+-- touched song (locked in id order) and one for site_counters
+CREATE OR REPLACE FUNCTION apply_count_deltas()
+RETURNS VOID AS $$
+BEGIN
+    PERFORM 1 FROM songs
+    WHERE id IN (SELECT song_id FROM count_deltas WHERE txid = txid_current())
+    ORDER BY id
+    FOR UPDATE;
+
+    UPDATE songs s
+    SET total_stream_count = s.total_stream_count + d.stream_delta
+    FROM (
+        SELECT song_id, SUM(stream_delta) AS stream_delta
+        FROM count_deltas
+        WHERE txid = txid_current() AND song_id IS NOT NULL
+        GROUP BY song_id
+    ) d
+    WHERE s.id = d.song_id AND d.stream_delta <> 0;
+
+    UPDATE site_counters c
+    SET total_verifications = c.total_verifications + d.verification_delta,
+        total_streams = c.total_streams + d.stream_delta,
+        active_users = c.active_users + d.user_delta
+    FROM (
+        SELECT SUM(stream_delta) AS stream_delta,
+            SUM(verification_delta) AS verification_delta,
+            SUM(user_delta) AS user_delta
+        FROM count_deltas
+        WHERE txid = txid_current() AND song_id IS NULL
+        HAVING COUNT(*) > 0
+    ) d
+    WHERE c.id = 1;
+
+    DELETE FROM count_deltas WHERE txid = txid_current();
+END;
+$$ language 'plpgsql';
+
+COMMIT;
@@ -0,0 +1,64 @@
+-- Migration: statement-level proof file refcount triggers for bulk imports
+-- Apply to an existing database created from an earlier schema.sql
+
+BEGIN;
+
+DROP TRIGGER IF EXISTS update_proof_file_refcount_on_verification ON verifications;
+
+-- Function to maintain proof file reference counts. Statement-level: each
+-- file's net reference change is summed over the statement and applied once,
+-- so a bulk write sharing one proof image updates its row once, not per row.
+CREATE OR REPLACE FUNCTION update_proof_file_refcount()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO proof_files (name, refcount)
+        SELECT proof_image, COUNT(*) FROM new_rows
+        WHERE proof_image <> ''
+        GROUP BY proof_image ORDER BY proof_image
+        ON CONFLICT (name)
+        DO UPDATE SET refcount = proof_files.refcount + EXCLUDED.refcount, updated_at = CURRENT_TIMESTAMP;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO proof_files (name, refcount)
+        SELECT proof_image, -COUNT(*) FROM old_rows
+        WHERE proof_image <> ''
+        GROUP BY proof_image ORDER BY proof_image
+        ON CONFLICT (name)
+        DO UPDATE SET refcount = proof_files.refcount + EXCLUDED.refcount, updated_at = CURRENT_TIMESTAMP;
+    ELSE
+        INSERT INTO proof_files (name, refcount)
+        SELECT name, SUM(refs) FROM (
+            SELECT n.proof_image AS name, 1 AS refs
+            FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE n.proof_image IS DISTINCT FROM o.proof_image
+            UNION ALL
+            SELECT o.proof_image, -1
+            FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE n.proof_image IS DISTINCT FROM o.proof_image
+        ) changed
+        WHERE name <> ''
+        GROUP BY name HAVING SUM(refs) <> 0 ORDER BY name
+        ON CONFLICT (name)
+        DO UPDATE SET refcount = proof_files.refcount + EXCLUDED.refcount, updated_at = CURRENT_TIMESTAMP;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Triggers to maintain proof file reference counts
+CREATE TRIGGER update_proof_file_refcount_on_verification_insert
+AFTER INSERT ON verifications
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_proof_file_refcount();
+
+CREATE TRIGGER update_proof_file_refcount_on_verification_update
+AFTER UPDATE ON verifications
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_proof_file_refcount();
+
+CREATE TRIGGER update_proof_file_refcount_on_verification_delete
+AFTER DELETE ON verifications
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_proof_file_refcount();
+
+COMMIT;
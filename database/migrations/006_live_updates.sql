@@ -0,0 +1,23 @@
+-- Migration: NOTIFY live leaderboard listeners on verification writes
+-- Apply to an existing database created from an earlier schema.sql
+
+BEGIN;
+
+-- Function to wake live leaderboard listeners (backend/live.py). pg_notify
+-- is delivered at commit and identical payloads in one transaction collapse
+-- into a single notification, so a batch write wakes listeners once.
+CREATE OR REPLACE FUNCTION notify_leaderboard_changes()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('leaderboard_changes', '');
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Trigger to notify live listeners of any verification write
+DROP TRIGGER IF EXISTS notify_leaderboard_changes_on_verification ON verifications;
+CREATE TRIGGER notify_leaderboard_changes_on_verification
+AFTER INSERT OR UPDATE OR DELETE ON verifications
+FOR EACH STATEMENT EXECUTE FUNCTION notify_leaderboard_changes();
+
+COMMIT;
@@ -0,0 +1,165 @@
+-- Migration: append-only verification_events log, partitioned by month
+-- Apply to an existing database created from an earlier schema.sql
+
+BEGIN;
+
+DROP TRIGGER IF EXISTS update_daily_streams_on_verification ON verifications;
+DROP FUNCTION IF EXISTS update_daily_streams();
+
+-- Append-only log of verification changes, partitioned by month. stream_delta
+-- is the change in approved streams, so windowed boards count streams gained
+-- inside the window rather than the full count of anything created in it.
+CREATE TABLE verification_events (
+    id BIGSERIAL,
+    verification_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    song_id INTEGER NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    stream_count INTEGER NOT NULL,
+    stream_delta BIGINT NOT NULL,
+    occurred_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, occurred_at)
+) PARTITION BY RANGE (occurred_at);
+
+-- Catches events for months without a partition until one is created
+CREATE TABLE verification_events_default PARTITION OF verification_events DEFAULT;
+
+CREATE INDEX idx_verification_events_user_song ON verification_events(user_id, song_id, occurred_at);
+
+-- Function to create the monthly verification_events partition holding
+-- `month`. Rows that already landed in the default partition for that month
+-- are moved into it first, so a late run of `flask ensure-event-partitions`
+-- is safe.
+CREATE OR REPLACE FUNCTION create_verification_events_partition(month DATE)
+RETURNS TEXT AS $$
+DECLARE
+    first_day DATE := date_trunc('month', month)::DATE;
+    next_month DATE := (date_trunc('month', month) + INTERVAL '1 month')::DATE;
+    partition_name TEXT := 'verification_events_' || to_char(month, 'YYYY_MM');
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+    EXECUTE format('CREATE TABLE %I (LIKE verification_events INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                   partition_name);
+    EXECUTE format('WITH moved AS (
+                        DELETE FROM verification_events_default
+                        WHERE occurred_at >= %L AND occurred_at < %L
+                        RETURNING *
+                    )
+                    INSERT INTO %I SELECT * FROM moved', first_day, next_month, partition_name);
+    EXECUTE format('ALTER TABLE verification_events ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                   partition_name, first_day, next_month);
+    RETURN partition_name;
+END;
+$$ language 'plpgsql';
+
+-- Function to make sure partitions exist from `first_month` through
+-- `months_ahead` months past the current one
+CREATE OR REPLACE FUNCTION ensure_verification_events_partitions(first_month DATE, months_ahead INTEGER)
+RETURNS SETOF TEXT AS $$
+    SELECT create_verification_events_partition(month::DATE)
+    FROM generate_series(date_trunc('month', first_month),
+                         date_trunc('month', CURRENT_DATE) + make_interval(months => months_ahead),
+                         INTERVAL '1 month') AS month;
+$$ language 'sql';
+
+-- Function to log verification changes and roll their deltas up into
+-- daily_streams by event day. Runs once per statement over the transition
+-- tables, so bulk writes insert their events and rollup rows in one pass.
+CREATE OR REPLACE FUNCTION record_verification_events()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        WITH events AS (
+            INSERT INTO verification_events (verification_id, user_id, song_id, status, stream_count, stream_delta)
+            SELECT id, user_id, song_id, status, stream_count,
+                CASE WHEN status = 'approved' THEN stream_count ELSE 0 END
+            FROM new_rows
+            RETURNING occurred_at, user_id, song_id, stream_delta
+        )
+        INSERT INTO daily_streams (day, user_id, song_id, streams)
+        SELECT DATE(occurred_at), user_id, song_id, SUM(stream_delta) FROM events
+        WHERE stream_delta <> 0
+        GROUP BY 1, 2, 3 ORDER BY 1, 2, 3
+        ON CONFLICT (day, user_id, song_id)
+        DO UPDATE SET streams = daily_streams.streams + EXCLUDED.streams;
+    ELSIF TG_OP = 'DELETE' THEN
+        WITH events AS (
+            INSERT INTO verification_events (verification_id, user_id, song_id, status, stream_count, stream_delta)
+            SELECT id, user_id, song_id, 'deleted', 0,
+                CASE WHEN status = 'approved' THEN -stream_count ELSE 0 END
+            FROM old_rows
+            RETURNING occurred_at, user_id, song_id, stream_delta
+        )
+        INSERT INTO daily_streams (day, user_id, song_id, streams)
+        SELECT DATE(occurred_at), user_id, song_id, SUM(stream_delta) FROM events
+        -- Cascading deletes of a user or song take their rollup rows with them
+        WHERE stream_delta <> 0
+            AND EXISTS (SELECT 1 FROM users WHERE users.id = events.user_id)
+            AND EXISTS (SELECT 1 FROM songs WHERE songs.id = events.song_id)
+        GROUP BY 1, 2, 3 ORDER BY 1, 2, 3
+        ON CONFLICT (day, user_id, song_id)
+        DO UPDATE SET streams = daily_streams.streams + EXCLUDED.streams;
+    ELSE
+        -- Only changes a submission or moderation makes are logged
+        WITH events AS (
+            INSERT INTO verification_events (verification_id, user_id, song_id, status, stream_count, stream_delta)
+            SELECT n.id, n.user_id, n.song_id, n.status, n.stream_count,
+                CASE WHEN n.status = 'approved' THEN n.stream_count ELSE 0 END
+                - CASE WHEN o.status = 'approved' THEN o.stream_count ELSE 0 END
+            FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE n.stream_count <> o.stream_count
+                OR n.status IS DISTINCT FROM o.status
+                OR n.proof_image IS DISTINCT FROM o.proof_image
+            RETURNING occurred_at, user_id, song_id, stream_delta
+        )
+        INSERT INTO daily_streams (day, user_id, song_id, streams)
+        SELECT DATE(occurred_at), user_id, song_id, SUM(stream_delta) FROM events
+        WHERE stream_delta <> 0
+        GROUP BY 1, 2, 3 ORDER BY 1, 2, 3
+        ON CONFLICT (day, user_id, song_id)
+        DO UPDATE SET streams = daily_streams.streams + EXCLUDED.streams;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Triggers to log verification changes
+CREATE TRIGGER record_verification_events_on_insert
+AFTER INSERT ON verifications
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION record_verification_events();
+
+CREATE TRIGGER record_verification_events_on_update
+AFTER UPDATE ON verifications
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION record_verification_events();
+
+CREATE TRIGGER record_verification_events_on_delete
+AFTER DELETE ON verifications
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION record_verification_events();
+
+-- Partitions from the oldest verification through three months ahead
+SELECT ensure_verification_events_partitions(COALESCE(MIN(created_at)::DATE, CURRENT_DATE), 3)
+FROM verifications;
+
+-- Seed one event per existing verification at its creation time; history
+-- before this migration is not recoverable, and this keeps the existing
+-- windowed boards unchanged
+INSERT INTO verification_events (verification_id, user_id, song_id, status, stream_count, stream_delta, occurred_at)
+SELECT id, user_id, song_id, status, stream_count,
+    CASE WHEN status = 'approved' THEN stream_count ELSE 0 END,
+    COALESCE(created_at, CURRENT_TIMESTAMP)
+FROM verifications;
+
+-- Rebuild the rollup from the events (same as `flask backfill-rollups`)
+DELETE FROM daily_streams;
+INSERT INTO daily_streams (day, user_id, song_id, streams)
+SELECT DATE(occurred_at), user_id, song_id, SUM(stream_delta)
+FROM verification_events
+WHERE stream_delta <> 0
+GROUP BY DATE(occurred_at), user_id, song_id;
+
+COMMIT;
@@ -0,0 +1,26 @@
+-- Migration: rank snapshots for rank-change and trend queries
+-- Apply to an existing database created from an earlier schema.sql
+
+BEGIN;
+
+-- Rank changes on the all-time boards' top N (song_id 0 = All Songs). A row is
+-- written only when a user's position or count changes; rank NULL marks
+-- leaving the top N. A user's rank at time T is their latest row at or before T.
+CREATE TABLE rank_snapshots (
+    song_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    taken_at TIMESTAMP NOT NULL,
+    rank INTEGER,
+    stream_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (song_id, user_id, taken_at)
+);
+
+-- One row per snapshot run: the sample times of rank history charts
+CREATE TABLE rank_snapshot_runs (
+    taken_at TIMESTAMP PRIMARY KEY DEFAULT CURRENT_TIMESTAMP,
+    top_n INTEGER NOT NULL
+);
+
+CREATE INDEX idx_rank_snapshots_taken_at ON rank_snapshots(taken_at);
+
+COMMIT;
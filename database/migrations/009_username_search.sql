@@ -0,0 +1,13 @@
+-- Migration: indexes for username search
+-- Apply to an existing database created from an earlier schema.sql
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Username search (/api/search/users): prefix matches, then substring matches.
+-- Trigrams of Hangul names need a UTF-8 LC_CTYPE for the database (not C)
+CREATE INDEX idx_users_username_prefix ON users(lower(username) text_pattern_ops);
+CREATE INDEX idx_users_username_trgm ON users USING GIN (username gin_trgm_ops);
+
+COMMIT;
@@ -0,0 +1,52 @@
+-- Migration: send the changed verification ids with live leaderboard notifications
+-- Apply to an existing database created from an earlier schema.sql
+
+BEGIN;
+
+-- Function to tell listeners (backend/live.py) which verifications changed.
+-- Runs once per statement and sends the changed ids, comma separated, so
+-- every worker can re-read just those rows. pg_notify payloads must stay
+-- under 8000 bytes: a statement touching more than 500 rows sends an empty
+-- payload instead, which makes listeners reload everything.
+CREATE OR REPLACE FUNCTION notify_leaderboard_changes()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed INTEGER[];
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        SELECT array_agg(id) INTO changed FROM (SELECT id FROM old_rows LIMIT 501) rows;
+    ELSE
+        SELECT array_agg(id) INTO changed FROM (SELECT id FROM new_rows LIMIT 501) rows;
+    END IF;
+    IF changed IS NOT NULL THEN
+        PERFORM pg_notify('leaderboard_changes',
+            CASE WHEN cardinality(changed) > 500 THEN '' ELSE array_to_string(changed, ',') END);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Replaces the single INSERT OR UPDATE OR DELETE trigger: transition tables
+-- need one trigger per event
+DROP TRIGGER IF EXISTS notify_leaderboard_changes_on_verification ON verifications;
+
+-- Triggers to notify live listeners of verification writes
+DROP TRIGGER IF EXISTS notify_leaderboard_changes_on_insert ON verifications;
+CREATE TRIGGER notify_leaderboard_changes_on_insert
+AFTER INSERT ON verifications
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_leaderboard_changes();
+
+DROP TRIGGER IF EXISTS notify_leaderboard_changes_on_update ON verifications;
+CREATE TRIGGER notify_leaderboard_changes_on_update
+AFTER UPDATE ON verifications
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_leaderboard_changes();
+
+DROP TRIGGER IF EXISTS notify_leaderboard_changes_on_delete ON verifications;
+CREATE TRIGGER notify_leaderboard_changes_on_delete
+AFTER DELETE ON verifications
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_leaderboard_changes();
+
+COMMIT;
@@ -0,0 +1,10 @@
+-- Migration: index for re-reading one (user, song) pair's daily_streams buckets
+-- Apply to an existing database created from an earlier schema.sql
+
+BEGIN;
+
+-- The in-process today/week/month boards re-read the buckets of the pairs a
+-- write touched
+CREATE INDEX IF NOT EXISTS idx_daily_streams_user_song ON daily_streams(user_id, song_id, day);
+
+COMMIT;
@@ -0,0 +1,9 @@
+#!/bin/bash
+# Replication role for the local replica in docker-compose.yml
+set -e
+
+psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" <<-SQL
+    CREATE ROLE replicator WITH REPLICATION LOGIN PASSWORD 'replicator';
+SQL
+
+echo "host replication replicator all scram-sha-256" >> "$PGDATA/pg_hba.conf"
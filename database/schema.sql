@@ -2,10 +2,21 @@
 -- PostgreSQL DDL
 
 -- Drop existing tables if they exist
+DROP TABLE IF EXISTS rank_snapshot_runs CASCADE;
+DROP TABLE IF EXISTS rank_snapshots CASCADE;
+DROP TABLE IF EXISTS site_counters CASCADE;
+DROP TABLE IF EXISTS proof_files CASCADE;
+DROP TABLE IF EXISTS count_deltas CASCADE;
+DROP TABLE IF EXISTS ingest_tickets CASCADE;
+DROP TABLE IF EXISTS daily_streams CASCADE;
+DROP TABLE IF EXISTS verification_events CASCADE;
 DROP TABLE IF EXISTS verifications CASCADE;
 DROP TABLE IF EXISTS songs CASCADE;
 DROP TABLE IF EXISTS users CASCADE;
 
+-- Trigram matching for username search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Users table
 CREATE TABLE users (
     id SERIAL PRIMARY KEY,
@@ -41,13 +52,108 @@ CREATE TABLE verifications (
     UNIQUE(user_id, song_id)
 );
 
+-- Daily rollup of approved stream deltas by event day for the today/week/month
+-- leaderboards (maintained from verification_events)
+CREATE TABLE daily_streams (
+    day DATE NOT NULL,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    song_id INTEGER NOT NULL REFERENCES songs(id) ON DELETE CASCADE,
+    streams BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, user_id, song_id)
+);
+
+-- Append-only log of verification changes, partitioned by month. stream_delta
+-- is the change in approved streams, so windowed boards count streams gained
+-- inside the window rather than the full count of anything created in it.
+CREATE TABLE verification_events (
+    id BIGSERIAL,
+    verification_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    song_id INTEGER NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    stream_count INTEGER NOT NULL,
+    stream_delta BIGINT NOT NULL,
+    occurred_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, occurred_at)
+) PARTITION BY RANGE (occurred_at);
+
+-- Catches events for months without a partition until one is created
+CREATE TABLE verification_events_default PARTITION OF verification_events DEFAULT;
+
+-- Rank changes on the all-time boards' top N (song_id 0 = All Songs). A row is
+-- written only when a user's position or count changes; rank NULL marks
+-- leaving the top N. A user's rank at time T is their latest row at or before T.
+CREATE TABLE rank_snapshots (
+    song_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    taken_at TIMESTAMP NOT NULL,
+    rank INTEGER,
+    stream_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (song_id, user_id, taken_at)
+);
+
+-- One row per snapshot run: the sample times of rank history charts
+CREATE TABLE rank_snapshot_runs (
+    taken_at TIMESTAMP PRIMARY KEY DEFAULT CURRENT_TIMESTAMP,
+    top_n INTEGER NOT NULL
+);
+
+-- Site-wide counters for /api/stats (single row, maintained by triggers)
+CREATE TABLE site_counters (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    total_verifications BIGINT NOT NULL DEFAULT 0,
+    total_streams BIGINT NOT NULL DEFAULT 0,
+    active_users BIGINT NOT NULL DEFAULT 0,
+    total_songs BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO site_counters (id) VALUES (1);
+
+-- Reference counts for content-addressed proof uploads (maintained by trigger)
+CREATE TABLE proof_files (
+    name VARCHAR(255) PRIMARY KEY,
+    refcount INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Counter deltas deferred to the end of a batch transaction (see apply_count_deltas)
+CREATE UNLOGGED TABLE count_deltas (
+    txid BIGINT NOT NULL,
+    song_id INTEGER,  -- NULL for site_counters deltas
+    stream_delta BIGINT NOT NULL DEFAULT 0,
+    verification_delta BIGINT NOT NULL DEFAULT 0,
+    user_delta BIGINT NOT NULL DEFAULT 0
+);
+
+-- Results of queued verification submissions, polled by ticket ID
+CREATE TABLE ingest_tickets (
+    id UUID PRIMARY KEY,
+    status VARCHAR(20) NOT NULL CHECK (status IN ('done', 'failed')),
+    verification_id INTEGER REFERENCES verifications(id) ON DELETE SET NULL,
+    http_status SMALLINT NOT NULL,
+    message VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Indexes for better query performance
 CREATE INDEX idx_users_username ON users(username);
+-- Username search (/api/search/users): prefix matches, then substring matches.
+-- Trigrams of Hangul names need a UTF-8 LC_CTYPE for the database (not C)
+CREATE INDEX idx_users_username_prefix ON users(lower(username) text_pattern_ops);
+CREATE INDEX idx_users_username_trgm ON users USING GIN (username gin_trgm_ops);
 CREATE INDEX idx_verifications_user_id ON verifications(user_id);
 CREATE INDEX idx_verifications_song_id ON verifications(song_id);
 CREATE INDEX idx_verifications_status ON verifications(status);
 CREATE INDEX idx_verifications_created_at ON verifications(created_at DESC);
 CREATE INDEX idx_songs_title ON songs(title);
+CREATE INDEX idx_daily_streams_song_day ON daily_streams(song_id, day);
+-- Re-reading one (user, song) pair's buckets for the in-process windowed boards
+CREATE INDEX idx_daily_streams_user_song ON daily_streams(user_id, song_id, day);
+CREATE INDEX idx_rank_snapshots_taken_at ON rank_snapshots(taken_at);
+CREATE INDEX idx_verification_events_user_song ON verification_events(user_id, song_id, occurred_at);
+CREATE INDEX idx_proof_files_unreferenced ON proof_files(updated_at) WHERE refcount <= 0;
+CREATE INDEX idx_count_deltas_txid ON count_deltas(txid);
+CREATE INDEX idx_ingest_tickets_created_at ON ingest_tickets(created_at);
 
 -- Function to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -68,30 +174,35 @@ CREATE TRIGGER update_songs_updated_at BEFORE UPDATE ON songs
 CREATE TRIGGER update_verifications_updated_at BEFORE UPDATE ON verifications
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
--- Function to update song total stream count
+-- Function to update song total stream count. Inside a batch transaction
+-- (SET LOCAL app.defer_counts = 'on') the delta is queued in count_deltas and
+-- applied once per song by apply_count_deltas() just before commit.
 CREATE OR REPLACE FUNCTION update_song_stream_count()
 RETURNS TRIGGER AS $$
+DECLARE
+    stream_delta BIGINT := 0;
+    target_song_id INTEGER;
 BEGIN
-    IF TG_OP = 'INSERT' AND NEW.status = 'approved' THEN
-        UPDATE songs
-        SET total_stream_count = total_stream_count + NEW.stream_count
-        WHERE id = NEW.song_id;
-    ELSIF TG_OP = 'UPDATE' THEN
-        IF OLD.status != 'approved' AND NEW.status = 'approved' THEN
-            UPDATE songs
-            SET total_stream_count = total_stream_count + NEW.stream_count
-            WHERE id = NEW.song_id;
-        ELSIF OLD.status = 'approved' AND NEW.status != 'approved' THEN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'approved' THEN
+        stream_delta := stream_delta - OLD.stream_count;
+        target_song_id := OLD.song_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'approved' THEN
+        stream_delta := stream_delta + NEW.stream_count;
+        target_song_id := NEW.song_id;
+    END IF;
+
+    IF stream_delta <> 0 THEN
+        IF current_setting('app.defer_counts', true) = 'on' THEN
+            INSERT INTO count_deltas (txid, song_id, stream_delta)
+            VALUES (txid_current(), target_song_id, stream_delta);
+        ELSE
             UPDATE songs
-            SET total_stream_count = total_stream_count - OLD.stream_count
-            WHERE id = NEW.song_id;
+            SET total_stream_count = total_stream_count + stream_delta
+            WHERE id = target_song_id;
         END IF;
-    ELSIF TG_OP = 'DELETE' AND OLD.status = 'approved' THEN
-        UPDATE songs
-        SET total_stream_count = total_stream_count - OLD.stream_count
-        WHERE id = OLD.song_id;
     END IF;
-    RETURN NEW;
+    RETURN NULL;
 END;
 $$ language 'plpgsql';
 
@@ -100,6 +211,347 @@ CREATE TRIGGER update_song_count_on_verification
 AFTER INSERT OR UPDATE OR DELETE ON verifications
 FOR EACH ROW EXECUTE FUNCTION update_song_stream_count();
 
+-- Function to create the monthly verification_events partition holding
+-- `month`. Rows that already landed in the default partition for that month
+-- are moved into it first, so a late run of `flask ensure-event-partitions`
+-- is safe.
+CREATE OR REPLACE FUNCTION create_verification_events_partition(month DATE)
+RETURNS TEXT AS $$
+DECLARE
+    first_day DATE := date_trunc('month', month)::DATE;
+    next_month DATE := (date_trunc('month', month) + INTERVAL '1 month')::DATE;
+    partition_name TEXT := 'verification_events_' || to_char(month, 'YYYY_MM');
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+    EXECUTE format('CREATE TABLE %I (LIKE verification_events INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                   partition_name);
+    EXECUTE format('WITH moved AS (
+                        DELETE FROM verification_events_default
+                        WHERE occurred_at >= %L AND occurred_at < %L
+                        RETURNING *
+                    )
+                    INSERT INTO %I SELECT * FROM moved', first_day, next_month, partition_name);
+    EXECUTE format('ALTER TABLE verification_events ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                   partition_name, first_day, next_month);
+    RETURN partition_name;
+END;
+$$ language 'plpgsql';
+
+-- Function to make sure partitions exist from `first_month` through
+-- `months_ahead` months past the current one
+CREATE OR REPLACE FUNCTION ensure_verification_events_partitions(first_month DATE, months_ahead INTEGER)
+RETURNS SETOF TEXT AS $$
+    SELECT create_verification_events_partition(month::DATE)
+    FROM generate_series(date_trunc('month', first_month),
+                         date_trunc('month', CURRENT_DATE) + make_interval(months => months_ahead),
+                         INTERVAL '1 month') AS month;
+$$ language 'sql';
+
+-- Function to log verification changes and roll their deltas up into
+-- daily_streams by event day. Runs once per statement over the transition
+-- tables, so bulk writes insert their events and rollup rows in one pass.
+CREATE OR REPLACE FUNCTION record_verification_events()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        WITH events AS (
+            INSERT INTO verification_events (verification_id, user_id, song_id, status, stream_count, stream_delta)
+            SELECT id, user_id, song_id, status, stream_count,
+                CASE WHEN status = 'approved' THEN stream_count ELSE 0 END
+            FROM new_rows
+            RETURNING occurred_at, user_id, song_id, stream_delta
+        )
+        INSERT INTO daily_streams (day, user_id, song_id, streams)
+        SELECT DATE(occurred_at), user_id, song_id, SUM(stream_delta) FROM events
+        WHERE stream_delta <> 0
+        GROUP BY 1, 2, 3 ORDER BY 1, 2, 3
+        ON CONFLICT (day, user_id, song_id)
+        DO UPDATE SET streams = daily_streams.streams + EXCLUDED.streams;
+    ELSIF TG_OP = 'DELETE' THEN
+        WITH events AS (
+            INSERT INTO verification_events (verification_id, user_id, song_id, status, stream_count, stream_delta)
+            SELECT id, user_id, song_id, 'deleted', 0,
+                CASE WHEN status = 'approved' THEN -stream_count ELSE 0 END
+            FROM old_rows
+            RETURNING occurred_at, user_id, song_id, stream_delta
+        )
+        INSERT INTO daily_streams (day, user_id, song_id, streams)
+        SELECT DATE(occurred_at), user_id, song_id, SUM(stream_delta) FROM events
+        -- Cascading deletes of a user or song take their rollup rows with them
+        WHERE stream_delta <> 0
+            AND EXISTS (SELECT 1 FROM users WHERE users.id = events.user_id)
+            AND EXISTS (SELECT 1 FROM songs WHERE songs.id = events.song_id)
+        GROUP BY 1, 2, 3 ORDER BY 1, 2, 3
+        ON CONFLICT (day, user_id, song_id)
+        DO UPDATE SET streams = daily_streams.streams + EXCLUDED.streams;
+    ELSE
+        -- Only changes a submission or moderation makes are logged
+        WITH events AS (
+            INSERT INTO verification_events (verification_id, user_id, song_id, status, stream_count, stream_delta)
+            SELECT n.id, n.user_id, n.song_id, n.status, n.stream_count,
+                CASE WHEN n.status = 'approved' THEN n.stream_count ELSE 0 END
+                - CASE WHEN o.status = 'approved' THEN o.stream_count ELSE 0 END
+            FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE n.stream_count <> o.stream_count
+                OR n.status IS DISTINCT FROM o.status
+                OR n.proof_image IS DISTINCT FROM o.proof_image
+            RETURNING occurred_at, user_id, song_id, stream_delta
+        )
+        INSERT INTO daily_streams (day, user_id, song_id, streams)
+        SELECT DATE(occurred_at), user_id, song_id, SUM(stream_delta) FROM events
+        WHERE stream_delta <> 0
+        GROUP BY 1, 2, 3 ORDER BY 1, 2, 3
+        ON CONFLICT (day, user_id, song_id)
+        DO UPDATE SET streams = daily_streams.streams + EXCLUDED.streams;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Triggers to log verification changes
+CREATE TRIGGER record_verification_events_on_insert
+AFTER INSERT ON verifications
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION record_verification_events();
+
+CREATE TRIGGER record_verification_events_on_update
+AFTER UPDATE ON verifications
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION record_verification_events();
+
+CREATE TRIGGER record_verification_events_on_delete
+AFTER DELETE ON verifications
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION record_verification_events();
+
+-- Function to maintain site-wide verification counters. Runs once per
+-- statement over the transition tables, so multi-row writes update the
+-- single counter row once.
+CREATE OR REPLACE FUNCTION update_site_counters()
+RETURNS TRIGGER AS $$
+DECLARE
+    verification_delta BIGINT := 0;
+    stream_delta BIGINT := 0;
+    user_delta BIGINT := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT verification_delta - COUNT(*), stream_delta - COALESCE(SUM(stream_count), 0)
+        INTO verification_delta, stream_delta
+        FROM old_rows WHERE status = 'approved';
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT verification_delta + COUNT(*), stream_delta + COALESCE(SUM(stream_count), 0)
+        INTO verification_delta, stream_delta
+        FROM new_rows WHERE status = 'approved';
+    END IF;
+
+    -- Active users have at least one verification of any status. Lock the user
+    -- rows so concurrent first submissions by the same user count once.
+    IF TG_OP = 'INSERT' THEN
+        PERFORM 1 FROM users WHERE id IN (SELECT user_id FROM new_rows) ORDER BY id FOR UPDATE;
+        SELECT COUNT(DISTINCT n.user_id) INTO user_delta
+        FROM new_rows n
+        WHERE NOT EXISTS (
+            SELECT 1 FROM verifications v
+            WHERE v.user_id = n.user_id AND v.id NOT IN (SELECT id FROM new_rows)
+        );
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT -COUNT(DISTINCT o.user_id) INTO user_delta
+        FROM old_rows o
+        WHERE NOT EXISTS (SELECT 1 FROM verifications v WHERE v.user_id = o.user_id);
+    END IF;
+
+    IF verification_delta = 0 AND stream_delta = 0 AND user_delta = 0 THEN
+        RETURN NULL;
+    END IF;
+    IF current_setting('app.defer_counts', true) = 'on' THEN
+        INSERT INTO count_deltas (txid, song_id, stream_delta, verification_delta, user_delta)
+        VALUES (txid_current(), NULL, stream_delta, verification_delta, user_delta);
+    ELSE
+        UPDATE site_counters
+        SET total_verifications = total_verifications + verification_delta,
+            total_streams = total_streams + stream_delta,
+            active_users = active_users + user_delta
+        WHERE id = 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Triggers to maintain site-wide verification counters (transition tables
+-- allow only one event per trigger)
+CREATE TRIGGER update_site_counters_on_verification_insert
+AFTER INSERT ON verifications
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_site_counters();
+
+CREATE TRIGGER update_site_counters_on_verification_update
+AFTER UPDATE ON verifications
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_site_counters();
+
+CREATE TRIGGER update_site_counters_on_verification_delete
+AFTER DELETE ON verifications
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_site_counters();
+
+-- Apply the counter deltas queued by the current transaction: one UPDATE per
+-- touched song (locked in id order) and one for site_counters
+CREATE OR REPLACE FUNCTION apply_count_deltas()
+RETURNS VOID AS $$
+BEGIN
+    PERFORM 1 FROM songs
+    WHERE id IN (SELECT song_id FROM count_deltas WHERE txid = txid_current())
+    ORDER BY id
+    FOR UPDATE;
+
+    UPDATE songs s
+    SET total_stream_count = s.total_stream_count + d.stream_delta
+    FROM (
+        SELECT song_id, SUM(stream_delta) AS stream_delta
+        FROM count_deltas
+        WHERE txid = txid_current() AND song_id IS NOT NULL
+        GROUP BY song_id
+    ) d
+    WHERE s.id = d.song_id AND d.stream_delta <> 0;
+
+    UPDATE site_counters c
+    SET total_verifications = c.total_verifications + d.verification_delta,
+        total_streams = c.total_streams + d.stream_delta,
+        active_users = c.active_users + d.user_delta
+    FROM (
+        SELECT SUM(stream_delta) AS stream_delta,
+            SUM(verification_delta) AS verification_delta,
+            SUM(user_delta) AS user_delta
+        FROM count_deltas
+        WHERE txid = txid_current() AND song_id IS NULL
+        HAVING COUNT(*) > 0
+    ) d
+    WHERE c.id = 1;
+
+    DELETE FROM count_deltas WHERE txid = txid_current();
+END;
+$$ language 'plpgsql';
+
+-- Function to maintain the site-wide song count
+CREATE OR REPLACE FUNCTION update_site_song_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE site_counters SET total_songs = total_songs + 1 WHERE id = 1;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE site_counters SET total_songs = total_songs - 1 WHERE id = 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Trigger to maintain the site-wide song count
+CREATE TRIGGER update_site_song_count_on_song
+AFTER INSERT OR DELETE ON songs
+FOR EACH ROW EXECUTE FUNCTION update_site_song_count();
+
+-- Function to maintain proof file reference counts. Statement-level: each
+-- file's net reference change is summed over the statement and applied once,
+-- so a bulk write sharing one proof image updates its row once, not per row.
+CREATE OR REPLACE FUNCTION update_proof_file_refcount()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO proof_files (name, refcount)
+        SELECT proof_image, COUNT(*) FROM new_rows
+        WHERE proof_image <> ''
+        GROUP BY proof_image ORDER BY proof_image
+        ON CONFLICT (name)
+        DO UPDATE SET refcount = proof_files.refcount + EXCLUDED.refcount, updated_at = CURRENT_TIMESTAMP;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO proof_files (name, refcount)
+        SELECT proof_image, -COUNT(*) FROM old_rows
+        WHERE proof_image <> ''
+        GROUP BY proof_image ORDER BY proof_image
+        ON CONFLICT (name)
+        DO UPDATE SET refcount = proof_files.refcount + EXCLUDED.refcount, updated_at = CURRENT_TIMESTAMP;
+    ELSE
+        INSERT INTO proof_files (name, refcount)
+        SELECT name, SUM(refs) FROM (
+            SELECT n.proof_image AS name, 1 AS refs
+            FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE n.proof_image IS DISTINCT FROM o.proof_image
+            UNION ALL
+            SELECT o.proof_image, -1
+            FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE n.proof_image IS DISTINCT FROM o.proof_image
+        ) changed
+        WHERE name <> ''
+        GROUP BY name HAVING SUM(refs) <> 0 ORDER BY name
+        ON CONFLICT (name)
+        DO UPDATE SET refcount = proof_files.refcount + EXCLUDED.refcount, updated_at = CURRENT_TIMESTAMP;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Triggers to maintain proof file reference counts
+CREATE TRIGGER update_proof_file_refcount_on_verification_insert
+AFTER INSERT ON verifications
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_proof_file_refcount();
+
+CREATE TRIGGER update_proof_file_refcount_on_verification_update
+AFTER UPDATE ON verifications
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_proof_file_refcount();
+
+CREATE TRIGGER update_proof_file_refcount_on_verification_delete
+AFTER DELETE ON verifications
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_proof_file_refcount();
+
+-- Function to tell listeners (backend/live.py) which verifications changed.
+-- Runs once per statement and sends the changed ids, comma separated, so
+-- every worker can re-read just those rows. pg_notify payloads must stay
+-- under 8000 bytes: a statement touching more than 500 rows sends an empty
+-- payload instead, which makes listeners reload everything.
+CREATE OR REPLACE FUNCTION notify_leaderboard_changes()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed INTEGER[];
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        SELECT array_agg(id) INTO changed FROM (SELECT id FROM old_rows LIMIT 501) rows;
+    ELSE
+        SELECT array_agg(id) INTO changed FROM (SELECT id FROM new_rows LIMIT 501) rows;
+    END IF;
+    IF changed IS NOT NULL THEN
+        PERFORM pg_notify('leaderboard_changes',
+            CASE WHEN cardinality(changed) > 500 THEN '' ELSE array_to_string(changed, ',') END);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Triggers to notify live listeners of verification writes
+CREATE TRIGGER notify_leaderboard_changes_on_insert
+AFTER INSERT ON verifications
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_leaderboard_changes();
+
+CREATE TRIGGER notify_leaderboard_changes_on_update
+AFTER UPDATE ON verifications
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_leaderboard_changes();
+
+CREATE TRIGGER notify_leaderboard_changes_on_delete
+AFTER DELETE ON verifications
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_leaderboard_changes();
+
+-- Monthly event partitions for the current month and the next three;
+-- `flask ensure-event-partitions` keeps them ahead
+SELECT ensure_verification_events_partitions(CURRENT_DATE, 3);
+
 -- Insert sample NMIXX songs
 INSERT INTO songs (title, album, release_date, cover_image) VALUES
 ('O.O', 'AD MARE', '2022-02-22', 'https://via.placeholder.com/300x300/ff006e/ffffff?text=O.O'),
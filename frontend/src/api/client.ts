@@ -9,6 +9,32 @@ export const apiClient = axios.create({
   },
 })
 
+// Read-your-writes with a read replica: after a write the API returns the time
+// until which this client's reads must go to the primary. The cookie it also
+// sets is not sent cross-origin, so the deadline is echoed back as a header.
+const READ_PRIMARY_HEADER = 'X-Read-Primary-Until'
+const READ_PRIMARY_KEY = 'nmixx_read_primary_until'
+// Keeps echoing a little past the deadline in case this clock runs ahead of the server's
+const READ_PRIMARY_SKEW_SECONDS = 30
+
+apiClient.interceptors.response.use((response) => {
+  const until = response.headers[READ_PRIMARY_HEADER.toLowerCase()]
+  if (until) {
+    sessionStorage.setItem(READ_PRIMARY_KEY, until)
+  }
+  return response
+})
+
+apiClient.interceptors.request.use((config) => {
+  const until = sessionStorage.getItem(READ_PRIMARY_KEY)
+  if (until && Number(until) + READ_PRIMARY_SKEW_SECONDS > Date.now() / 1000) {
+    config.headers[READ_PRIMARY_HEADER] = until
+  } else if (until) {
+    sessionStorage.removeItem(READ_PRIMARY_KEY)
+  }
+  return config
+})
+
 export interface Song {
   id: number
   title: string
@@ -30,12 +56,75 @@ export interface LeaderboardEntry {
   createdAt: string
 }
 
+export interface LeaderboardPage {
+  entries: LeaderboardEntry[]
+  total: number
+  nextCursor: string | null
+}
+
+export interface LeaderboardRank {
+  rank: number
+  total: number
+  entry: LeaderboardEntry
+  entries: LeaderboardEntry[]
+}
+
+export interface RankChange {
+  username: string
+  rank: number
+  previousRank: number | null
+  change: number | null
+  streamCount: number
+  previousStreamCount: number | null
+}
+
+export interface RankChanges {
+  songId: number | null
+  since: string
+  entries: RankChange[]
+}
+
+export interface RankHistory {
+  username: string
+  songId: number | null
+  points: { takenAt: string; rank: number | null; streamCount: number | null }[]
+}
+
+export interface UserSearchResult {
+  id: number
+  username: string
+  rank: number | null
+  streamCount: number
+}
+
+export interface UserSearch {
+  query: string
+  songId: number | null
+  results: UserSearchResult[]
+}
+
+export interface ProofImages {
+  thumb: string
+  preview: string
+  full: string
+}
+
+const UPLOADS_URL = '/image/melon/uploads'
+
+// Resized, metadata-free WebP derivative; original uploads are not served
+export const proofImageUrl = (
+  proofImage: string,
+  proofImages: ProofImages | null | undefined,
+  size: keyof ProofImages
+) => `${UPLOADS_URL}/${proofImages?.[size] ?? `${proofImage.replace(/\.[^./]*$/, '')}.${size}.webp`}`
+
 export interface UserVerification {
   id: number
   songId: number
   songTitle: string
   streamCount: number
   proofImage: string
+  proofImages?: ProofImages | null
   status: string
   verifiedAt: string
   createdAt: string
@@ -68,17 +157,108 @@ export const songsApi = {
 }
 
 export const leaderboardApi = {
-  get: async (
+  getPage: async (
     filter: 'all' | 'today' | 'week' | 'month' = 'all',
-    songId?: number
-  ): Promise<LeaderboardEntry[]> => {
-    const params: any = { filter }
+    songId?: number,
+    limit: number = 100,
+    cursor?: string
+  ): Promise<LeaderboardPage> => {
+    const params: any = { filter, limit }
     if (songId) {
       params.songId = songId
     }
+    if (cursor) {
+      params.cursor = cursor
+    }
     const response = await apiClient.get('/leaderboard', { params })
     return response.data
   },
+
+  getRank: async (
+    username: string,
+    filter: 'all' | 'today' | 'week' | 'month' = 'all',
+    songId?: number,
+    around: number = 0
+  ): Promise<LeaderboardRank> => {
+    const params: any = { username, filter, around }
+    if (songId) {
+      params.songId = songId
+    }
+    const response = await apiClient.get('/leaderboard/rank', { params })
+    return response.data
+  },
+
+  // All-time ranks against the snapshot `hours` ago; pass username for one user
+  getChanges: async (
+    songId?: number,
+    hours: number = 24,
+    username?: string
+  ): Promise<RankChanges> => {
+    const params: any = { hours }
+    if (songId) {
+      params.songId = songId
+    }
+    if (username) {
+      params.username = username
+    }
+    const response = await apiClient.get('/leaderboard/changes', { params })
+    return response.data
+  },
+
+  // from/to are YYYY-MM-DD (KST); defaults to the last 7 days
+  getHistory: async (
+    username: string,
+    songId?: number,
+    from?: string,
+    to?: string
+  ): Promise<RankHistory> => {
+    const params: any = { username }
+    if (songId) {
+      params.songId = songId
+    }
+    if (from) {
+      params.from = from
+    }
+    if (to) {
+      params.to = to
+    }
+    const response = await apiClient.get('/leaderboard/history', { params })
+    return response.data
+  },
+}
+
+export interface IngestTicket {
+  ticketId: string
+  status: 'pending' | 'done' | 'failed'
+  message?: string
+  error?: string
+  httpStatus?: number
+  verification?: UserVerification & { username: string; songTitle: string }
+}
+
+const TICKET_POLL_INTERVAL = 250
+const TICKET_POLL_TIMEOUT = 30000
+
+// Queued submissions answer 202 with a ticket; wait for the batch writer's result
+const waitForTicket = async (ticketId: string) => {
+  const deadline = Date.now() + TICKET_POLL_TIMEOUT
+  while (Date.now() < deadline) {
+    await new Promise((resolve) => setTimeout(resolve, TICKET_POLL_INTERVAL))
+    const response = await apiClient.get<IngestTicket>(`/verifications/tickets/${ticketId}`)
+    const ticket = response.data
+    if (ticket.status === 'done') {
+      return ticket
+    }
+    if (ticket.status === 'failed') {
+      // Same shape as an axios error so callers read error.response.data.error
+      throw Object.assign(new Error(ticket.error), {
+        response: { status: ticket.httpStatus, data: { error: ticket.error } },
+      })
+    }
+  }
+  throw Object.assign(new Error('timeout'), {
+    response: { status: 504, data: { error: '인증 처리가 지연되고 있습니다. 잠시 후 마이페이지에서 확인해주세요' } },
+  })
 }
 
 export const verificationsApi = {
@@ -88,6 +268,9 @@ export const verificationsApi = {
         'Content-Type': 'multipart/form-data',
       },
     })
+    if (response.status === 202) {
+      return waitForTicket(response.data.ticketId)
+    }
     return response.data
   },
 
@@ -104,6 +287,76 @@ export const statsApi = {
   },
 }
 
+export interface LeaderboardDiff {
+  changed: LeaderboardEntry[]
+  removed: number[]
+  total: number
+}
+
+export interface LiveHandlers {
+  onSnapshot?: (page: { entries: LeaderboardEntry[]; total: number }) => void
+  onDiff?: (diff: LeaderboardDiff) => void
+  onStats?: (stats: Stats) => void
+}
+
+// Delay (plus up to the same again, spread across clients) before reopening a refused live stream
+const LIVE_REFUSED_RETRY_MS = 30000
+
+export const liveApi = {
+  // Server-Sent Events; EventSource reconnects on its own and the server sends
+  // a fresh snapshot on every (re)connect. limit 0 streams stats only.
+  // Returns a function that closes the stream.
+  subscribeLeaderboard: (
+    params: { filter?: 'all' | 'today' | 'week' | 'month'; songId?: number; limit?: number },
+    handlers: LiveHandlers
+  ) => {
+    const query = new URLSearchParams({
+      filter: params.filter ?? 'all',
+      limit: String(params.limit ?? 100),
+    })
+    if (params.songId) {
+      query.set('songId', String(params.songId))
+    }
+    let source: EventSource
+    let retryTimer: ReturnType<typeof setTimeout> | undefined
+    const connect = () => {
+      source = new EventSource(`${API_BASE_URL}/stream/leaderboard?${query}`)
+      const listen = <T>(event: string, handler?: (data: T) => void) => {
+        if (handler) {
+          source.addEventListener(event, (e) => handler(JSON.parse((e as MessageEvent).data)))
+        }
+      }
+      listen('snapshot', handlers.onSnapshot)
+      listen('diff', handlers.onDiff)
+      listen('stats', handlers.onStats)
+      source.onerror = () => {
+        // The browser reconnects dropped streams itself, but not refused ones
+        // (503 when the server is at its stream limit); try again later
+        if (source.readyState === EventSource.CLOSED) {
+          retryTimer = setTimeout(connect, LIVE_REFUSED_RETRY_MS * (1 + Math.random()))
+        }
+      }
+    }
+    connect()
+    return () => {
+      clearTimeout(retryTimer)
+      source.close()
+    }
+  },
+}
+
+export const searchApi = {
+  // Prefix matches first, then substrings (3+ characters); ranks are all-time
+  users: async (q: string, songId?: number, limit: number = 20): Promise<UserSearch> => {
+    const params: any = { q, limit }
+    if (songId) {
+      params.songId = songId
+    }
+    const response = await apiClient.get('/search/users', { params })
+    return response.data
+  },
+}
+
 export const authApi = {
   login: async (username: string, pin: string) => {
     const response = await apiClient.post('/auth/login', { username, pin })
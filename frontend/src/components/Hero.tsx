@@ -1,6 +1,6 @@
 import { motion } from 'framer-motion'
 import { useEffect, useState } from 'react'
-import { statsApi, Stats } from '../api/client'
+import { liveApi, statsApi, Stats } from '../api/client'
 import './Hero.css'
 
 const Hero = () => {
@@ -16,6 +16,8 @@ const Hero = () => {
       }
     }
     fetchStats()
+    // Stats-only live stream keeps the counters current
+    return liveApi.subscribeLeaderboard({ limit: 0 }, { onStats: setStats })
   }, [])
 
   const formatNumber = (num: number): string => {
@@ -1,6 +1,7 @@
 import { useState, useEffect } from 'react'
 import { motion } from 'framer-motion'
-import { leaderboardApi, songsApi } from '../api/client'
+import { leaderboardApi, liveApi, searchApi, songsApi } from '../api/client'
+import type { UserSearchResult } from '../api/client'
 import type { Song } from '../App'
 import './Leaderboard.css'
 
@@ -23,9 +24,13 @@ const Leaderboard = ({ currentUsername, onProofClick }: LeaderboardProps) => {
   const [filter, setFilter] = useState<'all' | 'today' | 'week' | 'month'>('all')
   const [selectedSongId, setSelectedSongId] = useState<number | undefined>(undefined)
   const [data, setData] = useState<LeaderboardEntry[]>([])
+  const [total, setTotal] = useState(0)
+  const [currentUserEntry, setCurrentUserEntry] = useState<LeaderboardEntry | null>(null)
   const [songs, setSongs] = useState<Song[]>([])
   const [loading, setLoading] = useState(true)
   const [searchQuery, setSearchQuery] = useState('')
+  const [searchResults, setSearchResults] = useState<UserSearchResult[]>([])
+  const [searchEntries, setSearchEntries] = useState<LeaderboardEntry[]>([])
 
   const DISPLAY_LIMIT = 100
 
@@ -48,8 +53,9 @@ const Leaderboard = ({ currentUsername, onProofClick }: LeaderboardProps) => {
     const fetchLeaderboard = async () => {
       try {
         setLoading(true)
-        const leaderboardData = await leaderboardApi.get(filter, selectedSongId)
-        setData(leaderboardData)
+        const page = await leaderboardApi.getPage(filter, selectedSongId, DISPLAY_LIMIT)
+        setData(page.entries)
+        setTotal(page.total)
       } catch (error) {
         console.error('Failed to fetch leaderboard:', error)
       } finally {
@@ -60,6 +66,89 @@ const Leaderboard = ({ currentUsername, onProofClick }: LeaderboardProps) => {
     fetchLeaderboard()
   }, [filter, selectedSongId])
 
+  // Live updates: the stream's snapshot replaces the page, diffs patch it
+  useEffect(() => {
+    const close = liveApi.subscribeLeaderboard(
+      { filter, songId: selectedSongId, limit: DISPLAY_LIMIT },
+      {
+        onSnapshot: (page) => {
+          setData(page.entries)
+          setTotal(page.total)
+        },
+        onDiff: (diff) => {
+          setData((entries) => {
+            const changed = new Map(diff.changed.map((entry) => [entry.id, entry]))
+            const removed = new Set(diff.removed)
+            const kept = entries.filter((entry) => !changed.has(entry.id) && !removed.has(entry.id))
+            return [...kept, ...changed.values()]
+              .sort((a, b) => a.rank - b.rank)
+              .slice(0, DISPLAY_LIMIT)
+          })
+          setTotal(diff.total)
+        },
+      }
+    )
+    return close
+  }, [filter, selectedSongId])
+
+  // Search the whole board on the server: the loaded page only holds the top 100
+  useEffect(() => {
+    const query = searchQuery.trim()
+    if (!query) {
+      setSearchResults([])
+      setSearchEntries([])
+      return
+    }
+
+    let cancelled = false
+    const timer = setTimeout(async () => {
+      try {
+        const { results } = await searchApi.users(query, selectedSongId)
+        const firstRanked = results.find((result) => result.rank !== null)
+        let entries: LeaderboardEntry[] = []
+        if (firstRanked) {
+          // Show the board from the first match down
+          const around = await leaderboardApi.getRank(firstRanked.username, filter, selectedSongId, 50)
+          entries = around.entries.filter((entry) => entry.rank >= around.rank)
+        }
+        if (!cancelled) {
+          setSearchResults(results)
+          setSearchEntries(entries)
+        }
+      } catch (error) {
+        // 404 when the match has no entry in this time window
+        if (!cancelled) {
+          setSearchEntries([])
+        }
+      }
+    }, 250)
+
+    return () => {
+      cancelled = true
+      clearTimeout(timer)
+    }
+  }, [searchQuery, filter, selectedSongId])
+
+  // Fetch current user's rank only when a specific song is selected
+  useEffect(() => {
+    if (!currentUsername || !selectedSongId) {
+      setCurrentUserEntry(null)
+      return
+    }
+
+    const fetchRank = async () => {
+      try {
+        const result = await leaderboardApi.getRank(currentUsername, filter, selectedSongId)
+        setCurrentUserEntry(result.entry)
+      } catch (error) {
+        // 404 when the user has no entry on this board
+        setCurrentUserEntry(null)
+      }
+    }
+
+    fetchRank()
+  }, [currentUsername, filter, selectedSongId])
+
   const formatNumber = (num: number) => {
     return new Intl.NumberFormat('ko-KR').format(num)
   }
@@ -91,34 +180,13 @@ const Leaderboard = ({ currentUsername, onProofClick }: LeaderboardProps) => {
       return data.slice(0, DISPLAY_LIMIT)
     }
 
-    // Search mode - find matching entries
-    const matchingIndices = data
-      .map((entry, index) => ({ entry, index }))
-      .filter(({ entry }) => entry.username.toLowerCase().includes(searchQuery.toLowerCase()))
-
-    if (matchingIndices.length === 0) {
-      return []
-    }
-
-    // Get the first match
-    const firstMatchIndex = matchingIndices[0].index
-
-    // Show 100 entries starting from the match (match at top + 99 below)
-    const startIndex = firstMatchIndex
-    const endIndex = Math.min(data.length, startIndex + DISPLAY_LIMIT)
-
-    return data.slice(startIndex, endIndex)
+    // Search mode - the board from the first matching user down
+    return searchEntries
   }
 
   const topEntries = getDisplayEntries()
-  const searchResultCount = searchQuery
-    ? data.filter(entry => entry.username.toLowerCase().includes(searchQuery.toLowerCase())).length
-    : 0
-
-  // Find current user's entry only when a specific song is selected
-  const currentUserEntry = currentUsername && selectedSongId
-    ? data.find(entry => entry.username === currentUsername)
-    : null
+  const searchMatches = new Set(searchResults.map((result) => result.username))
+  const searchResultCount = searchQuery ? searchResults.length : 0
 
   return (
     <section className="leaderboard-section container">
@@ -130,15 +198,15 @@ const Leaderboard = ({ currentUsername, onProofClick }: LeaderboardProps) => {
       >
         <div>
           <h2 className="section-title">Leaderboard</h2>
-          {!searchQuery && data.length > DISPLAY_LIMIT && (
+          {!searchQuery && total > DISPLAY_LIMIT && (
             <p style={{ color: 'rgba(255,255,255,0.6)', fontSize: '0.9rem', marginTop: '0.5rem' }}>
-              Showing Top {DISPLAY_LIMIT} of {data.length} entries
+              Showing Top {DISPLAY_LIMIT} of {total} entries
             </p>
           )}
           {searchQuery && (
             <p style={{ color: 'rgba(255,255,255,0.6)', fontSize: '0.9rem', marginTop: '0.5rem' }}>
               {searchResultCount > 0
-                ? `Found ${searchResultCount} result${searchResultCount !== 1 ? 's' : ''} for "${searchQuery}" (showing nearby 100 entries)`
+                ? `Found ${searchResultCount} result${searchResultCount !== 1 ? 's' : ''} for "${searchQuery}" (showing the board from the first ranked match)`
                 : `No results found for "${searchQuery}"`
               }
             </p>
@@ -256,7 +324,7 @@ const Leaderboard = ({ currentUsername, onProofClick }: LeaderboardProps) => {
           <>
             {topEntries.map((entry, index) => {
               const isCurrentUser = currentUsername && entry.username === currentUsername
-              const isSearchMatch = searchQuery && entry.username.toLowerCase().includes(searchQuery.toLowerCase())
+              const isSearchMatch = searchQuery && searchMatches.has(entry.username)
               return (
               <motion.div
                 key={entry.id}
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react'
 import { motion } from 'framer-motion'
-import { usersApi, type UserVerification } from '../api/client'
+import { usersApi, proofImageUrl, type UserVerification } from '../api/client'
 import type { Song } from '../App'
 import './MyPage.css'
 
@@ -160,8 +160,9 @@ const MyPage = ({ username, songs, onEditClick }: MyPageProps) => {
                     {verification.proofImage && (
                       <div className="proof-thumbnail">
                         <img
-                          src={`/image/melon/uploads/${verification.proofImage}`}
+                          src={proofImageUrl(verification.proofImage, verification.proofImages, 'thumb')}
                           alt="인증 스크린샷"
+                          loading="lazy"
                           onError={(e) => {
                             const target = e.target as HTMLImageElement
                             target.style.display = 'none'
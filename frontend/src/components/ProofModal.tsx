@@ -1,5 +1,5 @@
 import { motion, AnimatePresence } from 'framer-motion'
-import { verificationsApi, usersApi, type UserVerification } from '../api/client'
+import { verificationsApi, usersApi, proofImageUrl, type ProofImages, type UserVerification } from '../api/client'
 import { useState, useEffect } from 'react'
 import './ProofModal.css'
 
@@ -16,6 +16,7 @@ interface VerificationDetail {
   songTitle: string
   streamCount: number
   proofImage: string
+  proofImages?: ProofImages | null
   status: string
   verifiedAt: string
   createdAt: string
@@ -244,7 +245,7 @@ const ProofModal = ({ isOpen, onClose, verificationId, isAllSongs = false }: Pro
                   <div className="proof-image-container">
                     <div className="proof-image-wrapper">
                       <motion.img
-                        src={`/image/melon/uploads/${verification.proofImage}`}
+                        src={proofImageUrl(verification.proofImage, verification.proofImages, 'preview')}
                         alt="스트리밍 인증 스크린샷"
                         className="proof-image"
                         initial={{ opacity: 0, scale: 0.95 }}
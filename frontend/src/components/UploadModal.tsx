@@ -1,7 +1,7 @@
 import { useState, useCallback, useEffect } from 'react'
 import { motion } from 'framer-motion'
 import { useDropzone } from 'react-dropzone'
-import { verificationsApi, type UserVerification } from '../api/client'
+import { verificationsApi, proofImageUrl, type UserVerification } from '../api/client'
 import { authUtils } from '../utils/auth'
 import type { Song } from '../App'
 import './UploadModal.css'
@@ -42,7 +42,7 @@ const UploadModal = ({
     if (isEditMode && existingVerification) {
       setStreamCount(existingVerification.streamCount.toString())
       if (existingVerification.proofImage) {
-        setPreviewUrl(`/image/melon/uploads/${existingVerification.proofImage}`)
+        setPreviewUrl(proofImageUrl(existingVerification.proofImage, existingVerification.proofImages, 'preview'))
       }
     }
   }, [isEditMode, existingVerification])